@@ -0,0 +1,53 @@
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def load_network(size):
+    """
+    Returns a network holding size facts of four wmes each (their type
+    included), spread over 10000 kinds.
+    """
+    net = ReteNetwork()
+    net.add_facts(Fact(kind=f'kind{i % 10000}', value=i, weight=i % 7)
+                  for i in range(size))
+    return net
+
+
+def make_rule(k):
+    @Production(Fact(kind=f'kind{k}', value=V('x'), weight=3))
+    def rule(x):
+        pass
+    return rule
+
+
+def scan(net, rules):
+    """
+    Primes the alpha memories of the rules' conditions the way they used to
+    be: by testing the condition against every wme.
+    """
+    for rule in rules:
+        for conds in rule.get_rete_conds():
+            for cond in conds:
+                for w in net.working_memory:
+                    cond.test(w)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    net = load_network(250000)
+    print(f'{len(net.working_memory)} wmes loaded in '
+          f'{time.perf_counter() - start:.1f} s')
+
+    start = time.perf_counter()
+    for k in range(1000):
+        net.add_production(make_rule(k))
+    elapsed = time.perf_counter() - start
+    print(f'1000 productions added in {elapsed:.2f} s, '
+          f'{len(net.agenda)} matches')
+
+    start = time.perf_counter()
+    scan(net, [make_rule(k) for k in range(1000, 1002)])
+    elapsed = (time.perf_counter() - start) / 2
+    print(f'scanning working memory: {elapsed:.2f} s per production, '
+          f'{elapsed * 1000:.0f} s for 1000')
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def build_network(size):
+    @Production(Fact(value=V('value')))
+    def idle(value):
+        pass
+
+    @Production(Fact(value=V('value'), hot=True), priority=2)
+    def hot(value):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(idle)
+    net.add_production(hot)
+    for i in range(size):
+        net.add_fact(Fact(value=i, hot=i % 100 == 0))
+    return net
+
+
+async def bench(size, cycles=1000):
+    net = build_network(size)
+    start = time.perf_counter()
+    await net.run(cycles)
+    return (time.perf_counter() - start) / cycles
+
+
+if __name__ == '__main__':
+    for size in (1000, 10000, 100000):
+        per_cycle = asyncio.run(bench(size))
+        print(f'{size} facts: {per_cycle * 1e6:.1f} us per fired rule')
@@ -0,0 +1,48 @@
+import time
+from itertools import product
+from timeit import timeit
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.common import WME
+
+
+def build_network(kinds):
+    # one rule per kind, all conditions are (var, const, const) or
+    # (var, const, var)
+    net = ReteNetwork()
+    for k in range(kinds):
+        @Production(Fact(kind=f'kind{k}', value=V('x')))
+        def rule(x):
+            pass
+        net.add_production(rule)
+    return net
+
+
+def probed_keys(net, wme):
+    """
+    The lookups add_wme used to do: the eight wildcard combinations.
+    """
+    return [net.alpha_hash[key] for key in product([wme.identifier, '#*#'],
+                                                   [wme.attribute, '#*#'],
+                                                   [wme.value, '#*#'])
+            if key in net.alpha_hash]
+
+
+def indexed_keys(net, wme):
+    return [amem for amem in map(net.alpha_hash.get, net.alpha_keys(wme))
+            if amem is not None]
+
+
+if __name__ == '__main__':
+    net = build_network(100)
+    print(f'masks in use: {sorted(net.alpha_masks)}')
+    wme = WME('f-0', 'kind', 'kind7')
+    number = 200000
+    for name, keys in (('probed', probed_keys), ('indexed', indexed_keys)):
+        elapsed = timeit(lambda: keys(net, wme), number=number) / number
+        print(f'{name}: {elapsed * 1e9:.0f} ns per wme')
+
+    start = time.perf_counter()
+    for i in range(20000):
+        net.add_fact(Fact(kind=f'kind{i % 100}', value=i))
+    print(f'20000 facts: {time.perf_counter() - start:.2f} s')
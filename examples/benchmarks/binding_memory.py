@@ -0,0 +1,75 @@
+import gc
+import sys
+import tracemalloc
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.beta import BetaMemory
+
+
+def build_network(depth):
+    # a chain of facts, each joined to the previous one and binding a new
+    # variable, so bindings grow with the depth of the rule
+    pattern = Fact(k0=V('x0'), k1=V('x1'))
+    for i in range(1, depth):
+        pattern = pattern & Fact(**{f'k{i}': V(f'x{i}'),
+                                    f'k{i + 1}': V(f'x{i + 1}')})
+
+    @Production(pattern)
+    def chain(x0):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(chain)
+    return net
+
+
+def count_tokens(net):
+    return sum(len(node.items) for node in net.beta_nodes()
+               if isinstance(node, BetaMemory))
+
+
+def binding_bytes(net):
+    """
+    Returns the size of the distinct binding objects held by the tokens,
+    following shared parent bindings.
+    """
+    seen = {}
+    for node in net.beta_nodes():
+        if isinstance(node, BetaMemory):
+            for token in node.items:
+                binding = token.binding
+                while binding is not None and id(binding) not in seen:
+                    seen[id(binding)] = sys.getsizeof(binding) + sum(
+                        sys.getsizeof(getattr(binding, slot, ()))
+                        for slot in ('values',))
+                    binding = getattr(binding, 'parent', None)
+    return sum(seen.values())
+
+
+def bench(depth, size):
+    """
+    Returns the number of tokens, the bytes allocated per token when loading
+    size chains into a rule of the given depth, and the part of them used by
+    bindings.
+    """
+    net = build_network(depth)
+    facts = [Fact(**{f'k{i}': n, f'k{i + 1}': n})
+             for n in range(size) for i in range(depth)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for fact in facts:
+        net.add_fact(fact)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tokens = count_tokens(net)
+    return (tokens, (after - before) / tokens,
+            binding_bytes(net) / tokens)
+
+
+if __name__ == '__main__':
+    for depth in (4, 8, 16):
+        tokens, per_token, per_binding = bench(depth, 200)
+        print(f'depth {depth}: {tokens} tokens, {per_token:.0f} bytes '
+              f'per token (wmes included), {per_binding:.0f} in bindings')
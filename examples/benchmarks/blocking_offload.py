@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+from reactive_deliberative import (Fact, Production, ReactiveDeliberative,
+                                   V)
+
+
+def make_rule(blocking):
+    # a rule body that blocks for 20 ms, like a database insert would
+    @Production(V('row') << Fact(kind='row', state='new'), writes=('state',),
+                blocking=blocking)
+    def write_row(net, row):
+        time.sleep(0.02)
+        row['state'] = 'written'
+        net.update_fact(row)
+    return write_row
+
+
+async def bench(blocking, rows):
+    """
+    Writes rows while a task measures how late the event loop wakes it up.
+    """
+    rd = ReactiveDeliberative(concurrency=8, threads=8)
+    rd.add_production(make_rule(blocking))
+    lags = []
+
+    async def ticker():
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    tick = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    for i in range(rows):
+        rd.network.add_fact(Fact(kind='row', id=i, state='new'))
+    while any(fact.get('state') == 'new'
+              for fact in rd.network.facts.values()):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+    offloader = rd.network.offloader
+    rd.close()
+    print(f'blocking={blocking}: {rows} rows in {elapsed:.2f} s, loop lag '
+          f'{max(lags) * 1e3:.1f} ms max, {offloader.max_queued} queued '
+          f'at most')
+
+
+if __name__ == '__main__':
+    loop = asyncio.get_event_loop()
+    for blocking in (False, True):
+        loop.run_until_complete(bench(blocking, 100))
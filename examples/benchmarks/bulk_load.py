@@ -0,0 +1,56 @@
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def build_network():
+    # group comes first so the patterns join on it right away
+    @Production(Fact(group=V('g'), kind='item', name=V('n')) &
+                Fact(group=V('g'), kind='group', owner=V('o')))
+    def owned(n, o):
+        pass
+
+    @Production(Fact(group=V('g'), kind='group') &
+                ~Fact(group=V('g'), kind='item'))
+    def empty_group(g):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(owned)
+    net.add_production(empty_group)
+    return net
+
+
+def make_facts(size):
+    facts = [Fact(kind='group', group=g, owner='o{}'.format(g))
+             for g in range(size // 10)]
+    facts += [Fact(kind='item', group=i % (size // 5), name=i)
+              for i in range(size)]
+    return facts
+
+
+def matches(net):
+    return sorted((m.pnode.production.id, repr(m.wmes)) for m in net.agenda)
+
+
+def bench(size):
+    net = build_network()
+    start = time.perf_counter()
+    for fact in make_facts(size):
+        net.add_fact(fact)
+    sequential = time.perf_counter() - start
+
+    bulk_net = build_network()
+    start = time.perf_counter()
+    bulk_net.add_facts(make_facts(size))
+    bulk = time.perf_counter() - start
+
+    assert matches(net) == matches(bulk_net)
+    return sequential, bulk, len(net.agenda)
+
+
+if __name__ == '__main__':
+    for size in (1000, 10000, 50000):
+        sequential, bulk, count = bench(size)
+        print(f'{size} facts, {count} matches: add_fact {sequential:.2f}s, '
+              f'add_facts {bulk:.2f}s')
@@ -0,0 +1,38 @@
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def bench(total, live):
+    """
+    Asserts total facts while keeping only the last live ones in the
+    network, so the memories are under constant churn.
+    """
+    @Production(V('fact') << Fact(kind='order', side='buy'))
+    def buy(fact):
+        pass
+
+    @Production(Fact(kind='order', side=V('side')) &
+                Fact(kind='limit', side=V('side')))
+    def limited(side):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(buy)
+    net.add_production(limited)
+    net.add_fact(Fact(kind='limit', side='sell'))
+    facts = []
+    start = time.perf_counter()
+    for i in range(total):
+        fact = Fact(kind='order', side='buy' if i % 2 else 'sell')
+        net.add_fact(fact)
+        facts.append(fact)
+        if len(facts) > live:
+            net.remove_fact(facts.pop(0))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for live in (100, 1000, 10000):
+        elapsed = bench(100000, live)
+        print(f'100000 asserts with {live} live facts: {elapsed:.2f} s')
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, Scheduler, V
+
+
+def build_network(jobs):
+    """
+    A rule that waits 10 ms, like an HTTP request would, and then marks its
+    job done.
+    """
+    @Production(V('job') << Fact(kind='job', state='todo'), writes=('state',))
+    async def fetch(net, job):
+        await asyncio.sleep(0.01)
+        job['state'] = 'done'
+        net.update_fact(job)
+
+    net = ReteNetwork()
+    net.add_production(fetch)
+    for i in range(jobs):
+        net.add_fact(Fact(kind='job', id=i, state='todo'))
+    return net
+
+
+async def serial(net):
+    while len(net.agenda):
+        await net.run()
+
+
+if __name__ == '__main__':
+    loop = asyncio.get_event_loop()
+    for limit in (1, 4, 16, 64):
+        net = build_network(200)
+        start = time.perf_counter()
+        if limit == 1:
+            loop.run_until_complete(serial(net))
+        else:
+            loop.run_until_complete(Scheduler(net, limit).run())
+        print(f'limit {limit}: 200 jobs in {time.perf_counter() - start:.2f} s')
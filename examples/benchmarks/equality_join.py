@@ -0,0 +1,36 @@
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def build_network(indexing):
+    # key comes first so the quote and halt patterns join on it right away
+    @Production(Fact(key=V('key'), kind='order') &
+                Fact(key=V('key'), kind='quote') &
+                ~Fact(key=V('key'), kind='halt'))
+    def matched(key):
+        pass
+
+    net = ReteNetwork(indexing=indexing)
+    net.add_production(matched)
+    return net
+
+
+def bench(indexing, size):
+    net = build_network(indexing)
+    start = time.perf_counter()
+    for i in range(size):
+        net.add_fact(Fact(kind='order', key=i))
+        net.add_fact(Fact(kind='quote', key=i))
+    for i in range(0, size, 10):
+        net.add_fact(Fact(kind='halt', key=i))
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(1 for _ in net.matches)
+
+
+if __name__ == '__main__':
+    for size in (250, 500, 1000):
+        for indexing in (False, True):
+            elapsed, matches = bench(indexing, size)
+            print(f'size={size} indexing={indexing}: {elapsed:.3f} s, '
+                  f'{matches} matches')
@@ -0,0 +1,32 @@
+import time
+
+from reactive_deliberative import Fact, ReteNetwork
+
+
+def build_network(size):
+    net = ReteNetwork()
+    for i in range(size):
+        net.add_fact(Fact(state="idle", index=i))
+    return net
+
+
+def bench_update(net, repeat=1000):
+    """
+    Measures the working memory cost of update_fact, the network has no
+    productions so no alpha or beta memories are involved.
+    """
+    fact = Fact(state="idle", index=-1)
+    net.add_fact(fact)
+    start = time.perf_counter()
+    for i in range(repeat):
+        fact['state'] = 'active' if i % 2 else 'idle'
+        net.update_fact(fact)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == '__main__':
+    for size in (1000, 10000, 100000, 300000):
+        net = build_network(size)
+        per_update = bench_update(net)
+        print(f'{len(net.working_memory)} wmes: '
+              f'{per_update * 1e6:.1f} us per update_fact')
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from reactive_deliberative import (Fact, Production, ReactiveDeliberative,
+                                   ReteNetwork, V)
+
+
+async def spin(net, seconds):
+    """
+    The loop as it used to be when nothing could fire: yield and check again.
+    """
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        await net.run()
+        net.seconds_until_ready()
+        await asyncio.sleep(0)
+
+
+async def bench(changes, gap):
+    rd = ReactiveDeliberative()
+
+    # matches stay on the agenda until their facts change, so the rule
+    # consumes its fact to leave the engine idle
+    @Production(V('fact') << Fact(light=V('color')))
+    def seen(net, fact, color):
+        del fact['light']
+        net.update_fact(fact)
+
+    rd.add_production(seen)
+    await asyncio.sleep(0.1)
+    rd.network.stats.reset()
+
+    cpu = time.process_time()
+    start = time.perf_counter()
+    for i in range(changes):
+        await asyncio.sleep(gap)
+        rd.add_fact(i, 'light')
+    await asyncio.sleep(gap)
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+
+    stats = rd.network.stats
+    print(f'event driven: {cpu / wall:.1%} cpu, '
+          f'{stats.counts["ready_latency"]} firings, '
+          f'ready latency {stats.per_call("ready_latency") * 1e6:.0f} us '
+          f'mean, {stats.longest["ready_latency"] * 1e6:.0f} us max')
+
+    rd.task.cancel()
+    cpu = time.process_time()
+    start = time.perf_counter()
+    await spin(ReteNetwork(), wall)
+    print(f'busy spin: {(time.process_time() - cpu) / wall:.1%} cpu')
+
+
+if __name__ == '__main__':
+    asyncio.get_event_loop().run_until_complete(bench(50, 0.02))
@@ -0,0 +1,59 @@
+import time
+from timeit import timeit
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.join_node import JoinNode
+
+
+def build_network(size):
+    # a chain of four facts, each joined to the previous one on its key
+    @Production(Fact(a=V('a'), b=V('b')) &
+                Fact(b=V('b'), c=V('c')) &
+                Fact(c=V('c'), d=V('d')) &
+                Fact(d=V('d'), e=V('e')))
+    def chain(a, e):
+        pass
+
+    net = ReteNetwork(indexing=False)
+    net.add_production(chain)
+    start = time.perf_counter()
+    for i in range(size):
+        net.add_fact(Fact(a=i, b=i))
+        net.add_fact(Fact(b=i, c=i))
+        net.add_fact(Fact(c=i, d=i))
+        net.add_fact(Fact(d=i, e=i))
+    return net, time.perf_counter() - start
+
+
+def join_calls(net, number=200000):
+    """
+    Times the compiled join test and binding builder of the join node that
+    joins the last fact on d against the generic methods, on a token and a
+    wme it accepts.
+    """
+    node = [n for n in net.beta_nodes()
+            if type(n) == JoinNode and V('d') in dict(n.vars)][-1]
+    token, wme = next((t, w) for t in node.parent.items
+                      for w in node.amem.items if node.perform_join_test(t, w))
+    return {
+        'generic': (
+            timeit(lambda: JoinNode.perform_join_test(node, token, wme),
+                   number=number) / number,
+            timeit(lambda: JoinNode.make_binding(node, token, wme),
+                   number=number) / number),
+        'compiled': (
+            timeit(lambda: node.perform_join_test(token, wme),
+                   number=number) / number,
+            timeit(lambda: node.make_binding(token, wme),
+                   number=number) / number),
+    }
+
+
+if __name__ == '__main__':
+    for size in (100, 400):
+        net, elapsed = build_network(size)
+        print(f'{size} chains, no indexing: {elapsed:.3f} s, '
+              f'{len(net.agenda)} matches')
+    for name, (test, bind) in join_calls(net).items():
+        print(f'{name}: join test {test * 1e9:.0f} ns, '
+              f'make_binding {bind * 1e9:.0f} ns')
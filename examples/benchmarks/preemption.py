@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from reactive_deliberative import (EventTrigger, Fact, Production,
+                                   ReactiveDeliberative, V)
+from reactive_deliberative.py_rete.stats import Histogram
+
+
+def make_rule(size, batch_size):
+    @Production(V('job') << Fact(kind='load', state='todo'))
+    async def load(net, job):
+        facts = (Fact(kind='item', i=i, group=i % 100) for i in range(size))
+        if batch_size is None:
+            net.add_facts(facts)
+        else:
+            await net.load_facts(facts, batch_size)
+        job['state'] = 'done'
+        net.update_fact(job)
+    return load
+
+
+async def bench(size, batch_size):
+    """
+    Loads size facts in a rule while a forced reactive action is signalled
+    every 5 ms, and returns the histogram of the time from each signal to
+    the start of the action.
+    """
+    rd = ReactiveDeliberative()
+    rd.add_production(make_rule(size, batch_size))
+    event = asyncio.Event()
+    signalled = []
+    latencies = Histogram()
+
+    async def action():
+        latencies.add(time.perf_counter() - signalled[-1])
+
+    rd.add_trigger(EventTrigger(event), action, force=True)
+    job = Fact(kind='load', state='todo')
+    rd.network.add_fact(job)
+    start = time.perf_counter()
+    while job['state'] == 'todo':
+        signalled.append(time.perf_counter())
+        event.set()
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stats = rd.network.stats
+    rd.close()
+    return elapsed, latencies, stats
+
+
+if __name__ == '__main__':
+    loop = asyncio.get_event_loop()
+    for batch_size in (None, 5000, 500):
+        elapsed, latencies, stats = loop.run_until_complete(
+            bench(50000, batch_size))
+        requests = stats.histograms['preemption_latency']
+        print(f'batch size {batch_size}: load {elapsed:.2f} s, '
+              f'{latencies.total} actions, signal to action p50 '
+              f'{latencies.percentile(50) * 1e3:.2f} ms, p99 '
+              f'{latencies.percentile(99) * 1e3:.2f} ms; request to lock '
+              f'p99 {requests.percentile(99) * 1e6:.0f} us')
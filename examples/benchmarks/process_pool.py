@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from reactive_deliberative import Fact, Production, ReteNetwork, Scheduler, V
+
+
+def work(seed, rounds=300000):
+    # pure Python number crunching, the GIL keeps threads from sharing it
+    x = seed
+    for i in range(rounds):
+        x = (x * 1103515245 + 12345) % 2147483648
+    return x
+
+
+@Production(V('series') << Fact(kind='series', state='raw', seed=V('seed')),
+            writes=('state', 'result'))
+def crunch(net, series, seed):
+    series['result'] = work(seed)
+    series['state'] = 'done'
+    net.update_fact(series)
+
+
+@Production(V('series') << Fact(kind='series', state='raw', seed=V('seed')),
+            writes=('state', 'result'), process=True)
+def crunch_in_process(net, series, seed):
+    series['result'] = work(seed)
+    series['state'] = 'done'
+    net.update_fact(series)
+
+
+def build_network(rule, size):
+    net = ReteNetwork()
+    net.add_production(rule)
+    for i in range(size):
+        net.add_fact(Fact(kind='series', state='raw', seed=i))
+    return net
+
+
+def results(net):
+    return sorted(fact['result'] for fact in net.facts.values())
+
+
+async def run(net, limit):
+    await Scheduler(net, limit).run()
+
+
+if __name__ == '__main__':
+    size = 32
+    loop = asyncio.get_event_loop()
+    print(f'{os.cpu_count()} cpus')
+
+    net = build_network(crunch, size)
+    start = time.perf_counter()
+    loop.run_until_complete(run(net, 1))
+    inline = time.perf_counter() - start
+    expected = results(net)
+    net.remove_production(crunch)
+    print(f'inline: {size} series in {inline:.2f} s')
+
+    for workers in (1, 2, 4, 8):
+        net = build_network(crunch_in_process, size)
+        with ProcessPoolExecutor(workers) as processes:
+            net.offloader.processes = processes
+            # start the workers before timing
+            list(processes.map(work, range(workers), [1] * workers))
+            start = time.perf_counter()
+            loop.run_until_complete(run(net, workers))
+            elapsed = time.perf_counter() - start
+        assert results(net) == expected
+        net.remove_production(crunch_in_process)
+        print(f'{workers} processes: {elapsed:.2f} s, '
+              f'{inline / elapsed:.1f}x')
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+
+from reactive_deliberative import Fact, Filter, Production, ReteNetwork
+from reactive_deliberative import ShardedNetwork, V
+
+fills = []
+
+
+@Production(Fact(kind='quote', instrument=V('instrument'), price=V('price')) &
+            Fact(kind='order', instrument=V('instrument'), limit=V('limit')) &
+            Filter(lambda price, limit: price <= limit))
+def fill(instrument, price, limit):
+    fills.append((instrument, price, limit))
+
+
+def build_facts(instruments, size):
+    facts = []
+    for i in range(instruments):
+        for j in range(size):
+            facts.append(Fact(kind='quote', instrument=i, price=j))
+            facts.append(Fact(kind='order', instrument=i, limit=j))
+    return facts
+
+
+def by_instrument(fact):
+    return fact['instrument']
+
+
+if __name__ == '__main__':
+    instruments, size, firings = 64, 40, 2000
+    facts = build_facts(instruments, size)
+    print(f'{os.cpu_count()} cpus, {len(facts)} facts')
+    loop = asyncio.get_event_loop()
+
+    net = ReteNetwork()
+    net.add_production(fill)
+    start = time.perf_counter()
+    net.add_facts(build_facts(instruments, size))
+    load = time.perf_counter() - start
+    matches = len(net.agenda)
+    start = time.perf_counter()
+    loop.run_until_complete(net.run(firings))
+    fire = time.perf_counter() - start
+    print(f'unsharded: {matches} matches, load {load:.2f} s, '
+          f'{firings / fire:.0f} firings/s')
+
+    for shards in (1, 2, 4):
+        with ShardedNetwork([fill], shards=shards,
+                            partition=by_instrument) as sharded:
+            start = time.perf_counter()
+            sharded.add_facts(build_facts(instruments, size))
+            load = time.perf_counter() - start
+            assert len(sharded) == matches
+            fills.clear()
+            start = time.perf_counter()
+            loop.run_until_complete(sharded.run(firings))
+            fire = time.perf_counter() - start
+            assert len(fills) == firings
+        print(f'{shards} shards: {matches} matches, load {load:.2f} s, '
+              f'{firings / fire:.0f} firings/s')
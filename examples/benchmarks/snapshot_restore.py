@@ -0,0 +1,90 @@
+import gc
+import os
+import tempfile
+import time
+
+from reactive_deliberative import Fact, Filter, Production, ReteNetwork, V
+
+
+@Production(Fact(group=V('g'), kind='item', name=V('n')) &
+            Fact(group=V('g'), kind='group', owner=V('o')) &
+            Filter(lambda n: n % 3 != 0))
+def owned(n, o):
+    pass
+
+
+@Production(Fact(group=V('g'), kind='group') &
+            ~Fact(group=V('g'), kind='item'))
+def empty_group(g):
+    pass
+
+
+def build_network():
+    net = ReteNetwork()
+    net.add_production(owned)
+    net.add_production(empty_group)
+    return net
+
+
+def make_facts(size):
+    facts = [Fact(kind='group', group=g, owner='o{}'.format(g))
+             for g in range(size // 10)]
+    facts += [Fact(kind='item', group=i % (size // 5), name=i)
+              for i in range(size)]
+    return facts
+
+
+def matches(net):
+    return sorted((m.pnode.production.id, repr(m.wmes)) for m in net.agenda)
+
+
+def bench(size, path):
+    """
+    Times adding the facts one by one, all at once, writing a snapshot and
+    restoring it. The garbage of the previous network is collected before
+    each, so its collection is not timed.
+    """
+    net = build_network()
+    gc.collect()
+    start = time.perf_counter()
+    for fact in make_facts(size):
+        net.add_fact(fact)
+    replay = time.perf_counter() - start
+    net.remove_production(owned)
+    net.remove_production(empty_group)
+
+    net = build_network()
+    gc.collect()
+    start = time.perf_counter()
+    net.add_facts(make_facts(size))
+    bulk = time.perf_counter() - start
+
+    gc.collect()
+    start = time.perf_counter()
+    net.snapshot(path)
+    snapshot = time.perf_counter() - start
+    expected = matches(net)
+    net.remove_production(owned)
+    net.remove_production(empty_group)
+
+    net = build_network()
+    gc.collect()
+    start = time.perf_counter()
+    net.restore(path)
+    restore = time.perf_counter() - start
+    assert matches(net) == expected
+    net.remove_production(owned)
+    net.remove_production(empty_group)
+    return replay, bulk, snapshot, restore, len(expected)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'network.snapshot')
+        for size in (1000, 10000, 50000):
+            replay, bulk, snapshot, restore, count = bench(size, path)
+            print(f'{size} facts, {count} matches: add_fact {replay:.2f}s, '
+                  f'add_facts {bulk:.2f}s, restore {restore:.2f}s '
+                  f'({replay / restore:.1f}x, {bulk / restore:.1f}x), '
+                  f'snapshot {snapshot:.2f}s, '
+                  f'{os.path.getsize(path) / 1e6:.1f} MB')
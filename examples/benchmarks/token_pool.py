@@ -0,0 +1,48 @@
+import gc
+import time
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def bench(pooling, pause_gc, facts, rounds):
+    """
+    Updates every fact rounds times, each update retracting and asserting
+    the tokens of a three-way join, and returns the time taken, the token
+    counters and the number of garbage collections.
+    """
+    @Production(Fact(kind='order', account=V('a'), qty=V('q')) &
+                Fact(kind='account', id=V('a'), desk=V('d')) &
+                Fact(kind='desk', id=V('d')))
+    def routed(a, q, d):
+        pass
+
+    net = ReteNetwork(pooling=pooling, pause_gc=pause_gc)
+    net.add_production(routed)
+    for d in range(10):
+        net.add_fact(Fact(kind='desk', id=d))
+    for a in range(100):
+        net.add_fact(Fact(kind='account', id=a, desk=a % 10))
+    orders = [Fact(kind='order', account=i % 100, qty=0)
+              for i in range(facts)]
+    net.add_facts(orders)
+
+    net.stats.reset()
+    collections = sum(s['collections'] for s in gc.get_stats())
+    start = time.perf_counter()
+    for r in range(rounds):
+        for order in orders:
+            order['qty'] = r
+            order['account'] = (order['account'] + 1) % 100
+            net.update_fact(order)
+    elapsed = time.perf_counter() - start
+    collections = sum(s['collections'] for s in gc.get_stats()) - collections
+    return elapsed, dict(net.stats.counts), collections
+
+
+if __name__ == '__main__':
+    for pooling, pause_gc in ((False, False), (True, False), (True, True)):
+        elapsed, counts, collections = bench(pooling, pause_gc, 1000, 10)
+        print(f'pooling {pooling}, pause_gc {pause_gc}: {elapsed:.2f} s, '
+              f'{collections} gc runs, '
+              f'{counts.get("tokens", 0)} tokens created, '
+              f'{counts.get("tokens_reused", 0)} reused')
@@ -3,14 +3,10 @@ import datetime
 
 from moex_iss_dumper import MoexIssDumper
 from reactive_deliberative import Production, V, Fact
-from reactive_deliberative import ReactiveDeliberative
+from reactive_deliberative import FileTrigger, ReactiveDeliberative
 
 
-async def external_upload_predicate():
-    return await dumper.external_upload_predicate()
-
-
-async def external_upload_action():
+async def external_upload_action(paths):
     return await dumper.external_upload_action()
 
 
@@ -39,8 +35,9 @@ async def get_from_url(net, fact):
     net.update_fact(fact)
 
 
-@Production(V('fact') << Fact(state="write_to_csv"), priority=2, timeout=1)
-async def write_to_csv(net, fact):
+@Production(V('fact') << Fact(state="write_to_csv"), priority=2, timeout=1,
+            blocking=True)
+def write_to_csv(net, fact):
     dumper.write_to_csv(f'{dumper.dump_dir}/{dumper.current_date_str}.csv')
     fact['state'] = 'transform'
     net.update_fact(fact)
@@ -53,8 +50,9 @@ async def transform(net, fact):
     net.update_fact(fact)
 
 
-@Production(V('fact') << Fact(state="write_to_db"), priority=2, timeout=1)
-async def write_to_db(net, fact):
+@Production(V('fact') << Fact(state="write_to_db"), priority=2, timeout=1,
+            blocking=True)
+def write_to_db(net, fact):
     dumper.write_to_db()
     print(f'date {dumper.current_date} finished')
     dumper.current_date += datetime.timedelta(days=1)
@@ -79,5 +77,6 @@ if __name__ == '__main__':
     rd.add_production(transform)
     rd.add_production(write_to_db)
 
-    rd.add_reactive_action(external_upload_predicate, external_upload_action)
+    rd.add_trigger(FileTrigger(external_directory, existing=True),
+                   external_upload_action, force=True)
     rd.run()
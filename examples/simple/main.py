@@ -10,7 +10,7 @@ async def counter_predicate():
     global i
     i += 1
     await asyncio.sleep(0)
-    return i == 10000000
+    return i == 1000
 
 
 async def counter_reactive():
@@ -49,5 +49,6 @@ if __name__ == '__main__':
     rd.add_production(make_red)
     rd.add_production(make_green)
     rd.add_production(make_red_high_priority)
-    rd.add_reactive_action(counter_predicate, counter_reactive, force=False)
+    rd.add_reactive_action(counter_predicate, counter_reactive, force=False,
+                           interval=0.01)
     rd.run()
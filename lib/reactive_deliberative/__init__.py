@@ -8,4 +8,17 @@ from reactive_deliberative.py_rete.conditions import Filter  # noqa F401
 from reactive_deliberative.py_rete.fact import Fact  # noqa F401
 from reactive_deliberative.py_rete.network import ReteNetwork  # noqa F401
 from reactive_deliberative.py_rete.production import Production  # noqa F401
+from reactive_deliberative.py_rete.scheduler import Scheduler  # noqa F401
+from reactive_deliberative.py_rete.sharding import ShardedNetwork  # noqa F401
+from reactive_deliberative.py_rete.strategies import LexStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import MeaStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import RandomStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import RecencyStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import Strategy  # noqa F401
 from reactive_deliberative.reactive_deliberative import ReactiveDeliberative  # noqa F401
+from reactive_deliberative.triggers import EventTrigger  # noqa F401
+from reactive_deliberative.triggers import FactTrigger  # noqa F401
+from reactive_deliberative.triggers import FileTrigger  # noqa F401
+from reactive_deliberative.triggers import PollTrigger  # noqa F401
+from reactive_deliberative.triggers import QueueTrigger  # noqa F401
+from reactive_deliberative.triggers import Trigger  # noqa F401
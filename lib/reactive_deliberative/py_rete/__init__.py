@@ -6,3 +6,10 @@ from reactive_deliberative.py_rete.conditions import Filter  # noqa F401
 from reactive_deliberative.py_rete.fact import Fact  # noqa F401
 from reactive_deliberative.py_rete.network import ReteNetwork  # noqa F401
 from reactive_deliberative.py_rete.production import Production  # noqa F401
+from reactive_deliberative.py_rete.scheduler import Scheduler  # noqa F401
+from reactive_deliberative.py_rete.sharding import ShardedNetwork  # noqa F401
+from reactive_deliberative.py_rete.strategies import LexStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import MeaStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import RandomStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import RecencyStrategy  # noqa F401
+from reactive_deliberative.py_rete.strategies import Strategy  # noqa F401
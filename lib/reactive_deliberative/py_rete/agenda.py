@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from bisect import insort
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.strategies import RandomStrategy
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import Iterable
+    from typing import Iterator
+    from typing import List
+    from typing import Optional
+    from typing import Set
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import Match
+    from reactive_deliberative.py_rete.production import Production
+    from reactive_deliberative.py_rete.strategies import Strategy
+
+
+class Activations:
+    """
+    The matches of one production on the agenda. Matches know their position
+    in the list, so adding, removing and picking one at random all take
+    constant time. For ordered strategies the matches are also kept in a
+    heap of (key, seq, match) entries, removed matches are dropped lazily.
+    A match has at most one entry (`Match.in_heap`), so a match put back
+    after being held reuses its entry if it is still in the heap.
+    """
+    __slots__ = ['production', 'matches', 'heap']
+
+    def __init__(self, production: Production, ordered: bool = False) -> None:
+        self.production = production
+        self.matches: List[Match] = []
+        self.heap: Optional[List[Tuple[Any, int, Match]]] = (
+            [] if ordered else None)
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def __iter__(self) -> Iterator[Match]:
+        return iter(self.matches)
+
+    def add(self, match: Match, key: Any = None) -> None:
+        match.index = len(self.matches)
+        self.matches.append(match)
+        if self.heap is not None and not match.in_heap:
+            heappush(self.heap, (key, match.seq, match))
+            match.in_heap = True
+
+    def remove(self, match: Match) -> None:
+        last = self.matches.pop()
+        if last is not match:
+            last.index = match.index
+            self.matches[match.index] = last
+        match.index = -1
+        heap = self.heap
+        # an empty heap is left when the last match goes, since the
+        # activations are then dropped by the agenda
+        if heap is not None and (
+                not self.matches or len(heap) > 2 * len(self.matches) + 8):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Drops the entries of the removed matches from the heap.
+        """
+        heap = []
+        for entry in self.heap:
+            if entry[2].index >= 0:
+                heap.append(entry)
+            else:
+                entry[2].in_heap = False
+        heapify(heap)
+        self.heap = heap
+
+    def best(self) -> Optional[Tuple[Any, int, Match]]:
+        """
+        Returns the heap entry of the match with the smallest key.
+        """
+        heap = self.heap
+        while heap and heap[0][2].index < 0:
+            heappop(heap)[2].in_heap = False
+        return heap[0] if heap else None
+
+    def rebuild(self, strategy: Strategy) -> None:
+        """
+        Recomputes the heap for a new strategy.
+        """
+        for entry in self.heap or ():
+            entry[2].in_heap = False
+        if strategy.ordered:
+            self.heap = [(strategy.key(match), match.seq, match)
+                         for match in self.matches]
+            heapify(self.heap)
+            for match in self.matches:
+                match.in_heap = True
+        else:
+            self.heap = None
+
+
+class Agenda:
+    """
+    The conflict set of a network, kept up to date by the pnodes as tokens are
+    added and deleted instead of being rebuilt on every cycle. Matches are
+    bucketed by the priority of their production, then by production id.
+
+    A production that fired with a timeout leaves the priority levels until
+    its cooldown expires. Cooling productions are kept in a min-heap keyed by
+    the monotonic time at which they are ready again, and `wake` puts them
+    back, so selecting a match never checks time per match or per production.
+
+    Within the highest priority level, the strategy picks the match to fire
+    (see `reactive_deliberative.py_rete.strategies`). Matches are numbered in
+    the order they enter the agenda (`Match.seq`).
+
+    A match can be held off the agenda, e.g., while it fires concurrently
+    with others (see `Scheduler`), and released afterwards. Held matches
+    still count in the size of the agenda, and one that is removed while
+    held is dropped.
+
+    The priority of a production must not change while it is in a network.
+
+    on_ready, if set, is called when the agenda goes from having no match
+    that can be selected to having one, e.g., to wake up a loop waiting for
+    matches.
+    """
+
+    def __init__(self, strategy: Optional[Strategy] = None) -> None:
+        self.strategy = strategy if strategy is not None else RandomStrategy()
+        self.counter = 0
+        self.levels: Dict[float, Dict[str, Activations]] = {}
+        # Negated priorities in ascending order, so the highest comes first.
+        self.priorities: List[float] = []
+        self.cooling: Dict[str, Activations] = {}
+        self.ready_at: Dict[str, float] = {}
+        self.schedule: List[Tuple[float, str]] = []
+        self.held: Set[Match] = set()
+        self.size = 0
+        self.on_ready: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Match]:
+        for priority in self.priorities:
+            for activations in self.levels[-priority].values():
+                yield from activations
+        for activations in self.cooling.values():
+            yield from activations
+        yield from self.held
+
+    def set_strategy(self, strategy: Strategy) -> None:
+        self.strategy = strategy
+        for level in self.levels.values():
+            for activations in level.values():
+                activations.rebuild(strategy)
+        for activations in self.cooling.values():
+            activations.rebuild(strategy)
+
+    def __link(self, activations: Activations) -> None:
+        priority = activations.production.priority
+        level = self.levels.get(priority)
+        if level is None:
+            level = self.levels[priority] = {}
+            idle = not self.priorities
+            insort(self.priorities, -priority)
+            if idle and self.on_ready is not None:
+                self.on_ready()
+        level[activations.production.id] = activations
+
+    def __unlink(self, activations: Activations) -> None:
+        priority = activations.production.priority
+        level = self.levels[priority]
+        del level[activations.production.id]
+        if not level:
+            del self.levels[priority]
+            self.priorities.remove(-priority)
+
+    def add(self, match: Match) -> None:
+        self.counter += 1
+        match.seq = self.counter
+        self.__insert(match)
+        self.size += 1
+
+    def __insert(self, match: Match) -> None:
+        production = match.pnode.production
+        activations = self.cooling.get(production.id)
+        if activations is None:
+            level = self.levels.get(production.priority)
+            if level is not None:
+                activations = level.get(production.id)
+            if activations is None:
+                activations = Activations(production, self.strategy.ordered)
+                self.__link(activations)
+        if self.strategy.ordered:
+            activations.add(match, self.strategy.key(match))
+        else:
+            activations.add(match)
+
+    def remove(self, match: Match) -> None:
+        if match.index < 0:
+            self.held.discard(match)
+            self.size -= 1
+            return
+        production = match.pnode.production
+        activations = self.cooling.get(production.id)
+        if activations is None:
+            activations = self.levels[production.priority][production.id]
+            activations.remove(match)
+            if not activations:
+                self.__unlink(activations)
+        else:
+            activations.remove(match)
+        self.size -= 1
+
+    def hold(self, match: Match) -> None:
+        """
+        Takes a match off the agenda until it is released.
+        """
+        self.remove(match)
+        self.held.add(match)
+        self.size += 1
+
+    def release(self, match: Match) -> None:
+        """
+        Puts a held match back on the agenda, with its seq, unless it was
+        removed in the meantime.
+        """
+        if match in self.held:
+            self.held.remove(match)
+            self.__insert(match)
+
+    def restore(self, matches: Iterable[Match], counter: int,
+                cooling: Iterable[Tuple[Production, float]] = ()) -> None:
+        """
+        Puts matches that keep their seq on an empty agenda, in order, e.g.,
+        when a network is restored from a snapshot. counter is the seq of the
+        last match added, and cooling gives the productions cooling down with
+        the monotonic time at which they are ready again.
+        """
+        for production, ready_at in cooling:
+            self.cool_down(production, ready_at)
+        for match in matches:
+            self.__insert(match)
+            self.size += 1
+        self.counter = counter
+
+    def cool_down(self, production: Production, ready_at: float) -> None:
+        """
+        Takes the matches of the production off the priority levels until the
+        monotonic time ready_at.
+        """
+        if production.id not in self.cooling:
+            level = self.levels.get(production.priority)
+            activations = level.get(production.id) if level else None
+            if activations is None:
+                activations = Activations(production, self.strategy.ordered)
+            else:
+                self.__unlink(activations)
+            self.cooling[production.id] = activations
+        self.ready_at[production.id] = ready_at
+        heappush(self.schedule, (ready_at, production.id))
+
+    def wake(self, now: float) -> None:
+        """
+        Puts back the productions whose cooldown expired at the monotonic time
+        now.
+        """
+        schedule = self.schedule
+        while schedule and schedule[0][0] <= now:
+            ready_at, prod_id = heappop(schedule)
+            if self.ready_at.get(prod_id) != ready_at:
+                continue
+            del self.ready_at[prod_id]
+            activations = self.cooling.pop(prod_id)
+            if activations:
+                self.__link(activations)
+
+    def next_ready_time(self) -> Optional[float]:
+        """
+        Returns the monotonic time at which the next cooling production is
+        ready again, or None if no production is cooling down.
+        """
+        schedule = self.schedule
+        while schedule and self.ready_at.get(schedule[0][1]) != schedule[0][0]:
+            heappop(schedule)
+        return schedule[0][0] if schedule else None
+
+    def has_ready(self) -> bool:
+        """
+        Returns whether there is a match that can be selected.
+        """
+        return bool(self.priorities)
+
+    def select(self) -> Optional[Match]:
+        """
+        Lets the strategy pick a match among the matches of the highest
+        priority. Call `wake` first so expired cooldowns are taken into
+        account.
+        """
+        if not self.priorities:
+            return None
+        return self.strategy.select(self.levels[-self.priorities[0]])
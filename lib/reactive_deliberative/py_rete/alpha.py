@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+from operator import attrgetter
 from typing import TYPE_CHECKING
 
+from reactive_deliberative.py_rete.index import HashIndex
+from reactive_deliberative.py_rete.ordered_set import LinkedSet
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
+
 if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict
     from typing import List
     from typing import Optional
+    from typing import Tuple
     from reactive_deliberative.py_rete.join_node import JoinNode
     from reactive_deliberative.py_rete.common import WME
 
@@ -18,17 +25,52 @@ class AlphaMemory:
         exist, then it addes it. It also right activates all of its successors,
         which correspond to beta nodes.
         """
-        self.items: List[WME] = items if items else []
-        self.successors: List[JoinNode] = successors if successors else []
+        self.items: OrderedSet = OrderedSet(items) if items else OrderedSet()
+        self.successors: LinkedSet = (LinkedSet(successors) if successors
+                                      else LinkedSet())
         self.reference_count = 0
+        self.indexes: Dict[Tuple[str, ...], HashIndex] = {}
+
+    def get_index(self, fields: Tuple[str, ...]) -> HashIndex:
+        """
+        Returns an index of the items keyed by the values of the given wme
+        fields, building it from the current items the first time.
+        """
+        if fields not in self.indexes:
+            getter = attrgetter(*fields)
+            if len(fields) == 1:
+                self.indexes[fields] = HashIndex(lambda w: (getter(w),),
+                                                 self.items)
+            else:
+                self.indexes[fields] = HashIndex(getter, self.items)
+        return self.indexes[fields]
+
+    def remove(self, wme: WME) -> None:
+        """
+        Removes the wme from the items and from the indexes.
+        """
+        self.items.remove(wme)
+        for index in self.indexes.values():
+            index.remove(wme)
+
+    def add(self, wme: WME) -> None:
+        """
+        Adds the wme to the items and to the indexes, without activating the
+        successors.
+        """
+        self.items.append(wme)
+        for index in self.indexes.values():
+            index.add(wme)
+        wme.amems.append(self)
 
     def activation(self, wme: WME) -> None:
         """
         Adds the wme to the alpha memory and then right activates the children
         in the beta network. Note, these are activated in reversed order to
-        prevent duplicate matches.
+        prevent duplicate matches. The successors are copied first because
+        activating a child can relink other join nodes into this memory; those
+        have already seen the wme through their left activation.
         """
-        self.items.append(wme)
-        wme.amems.append(self)
-        for child in reversed(self.successors):
+        self.add(wme)
+        for child in list(reversed(self.successors)):
             child.right_activation(wme)
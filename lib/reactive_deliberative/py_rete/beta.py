@@ -2,13 +2,21 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from reactive_deliberative.py_rete.common import Token
+from reactive_deliberative.py_rete.codegen import compile_binding_key
+from reactive_deliberative.py_rete.common import EMPTY_LAYOUT
+from reactive_deliberative.py_rete.index import HashIndex
+from reactive_deliberative.py_rete.ordered_set import LinkedSet
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
+from reactive_deliberative.py_rete.tokens import TokenFactory
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Any
     from typing import List
     from typing import Dict
     from typing import Optional
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import Binding
+    from reactive_deliberative.py_rete.common import BindingLayout
+    from reactive_deliberative.py_rete.common import Token
     from reactive_deliberative.py_rete.common import V
     from reactive_deliberative.py_rete.common import WME
     from reactive_deliberative.py_rete.alpha import AlphaMemory
@@ -17,14 +25,19 @@ if TYPE_CHECKING:  # pragma: no cover
 
 class ReteNode:
     """
-    Base BetaNode class, tracks parent and children.
+    Base BetaNode class, tracks parent and children. The layout is the one
+    of the bindings the node passes on to its children, by default the same
+    as its parent.
     """
 
     def __init__(self, children: Optional[List[ReteNode]] = None,
                  parent: Optional[ReteNode] = None, **kwargs):
         super().__init__(**kwargs)
-        self.children: List[ReteNode] = children if children else []
+        self.children: LinkedSet = (LinkedSet(children) if children
+                                    else LinkedSet())
         self.parent: Optional[ReteNode] = parent
+        self.layout: BindingLayout = (parent.layout if parent is not None
+                                      else EMPTY_LAYOUT)
 
     def find_nearest_ancestor_with_same_amem(self, amem: AlphaMemory
                                              ) -> Optional[JoinNode]:
@@ -35,16 +48,48 @@ class BetaMemory(ReteNode):
     """
     A memory node for the beta network. Contains items (tokens) and a list of
     `all_children`, which is used in conjunction with `children` to support
-    left unlinking.
+    left unlinking. Its tokens are created by the token factory of the
+    network.
     """
 
-    def __init__(self, items: Optional[List[Token]] = None, **kwargs):
+    def __init__(self, items: Optional[List[Token]] = None,
+                 token_factory: Optional[TokenFactory] = None, **kwargs):
         """
         Similar to alpha memory, but items is a set of tokens instead of wmes.
         """
         super().__init__(**kwargs)
-        self.items: List[Token] = items if items else []
+        self.token_factory: TokenFactory = (
+            token_factory if token_factory is not None else TokenFactory())
+        self.items: OrderedSet = OrderedSet(items) if items else OrderedSet()
         self.all_children: List[ReteNode] = []
+        self.indexes: Dict[Tuple[V, ...], HashIndex] = {}
+
+    def get_index(self, variables: Tuple[V, ...]) -> HashIndex:
+        """
+        Returns an index of the items keyed by the values the tokens bind to
+        the given variables, building it from the current items the first
+        time. All the tokens in the memory must bind these variables.
+        """
+        if variables not in self.indexes:
+            self.indexes[variables] = HashIndex(
+                compile_binding_key(variables, self.layout), self.items)
+        return self.indexes[variables]
+
+    def add(self, token: Token) -> None:
+        """
+        Adds the token to the items and to the indexes.
+        """
+        self.items.append(token)
+        for index in self.indexes.values():
+            index.add(token)
+
+    def remove(self, token: Token) -> None:
+        """
+        Removes the token from the items and from the indexes.
+        """
+        self.items.remove(token)
+        for index in self.indexes.values():
+            index.remove(token)
 
     def find_nearest_ancestor_with_same_amem(self, amem: AlphaMemory
                                              ) -> Optional[JoinNode]:
@@ -52,12 +97,12 @@ class BetaMemory(ReteNode):
 
     def left_activation(self, token: Optional[Token] = None,
                         wme: Optional[WME] = None,
-                        binding: Optional[Dict[V, Any]] = None):
+                        binding: Optional[Binding] = None):
         """
         Creates a new token based on the incoming token/wme, adds it to the
         memory (items) then activates the children with the token.
         """
-        new_token = Token(token, wme, node=self, binding=binding)
-        self.items.append(new_token)
+        new_token = self.token_factory.token(token, wme, self, binding)
+        self.add(new_token)
         for child in self.children:
             child.left_activation(new_token)
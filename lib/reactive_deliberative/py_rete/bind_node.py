@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 import inspect
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 from reactive_deliberative.py_rete.beta import ReteNode
-from reactive_deliberative.py_rete.common import V
+from reactive_deliberative.py_rete.codegen import compile_call
+from reactive_deliberative.py_rete.common import Binding
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Any
-    from typing import Dict
     from reactive_deliberative.py_rete.network import ReteNetwork
 
 
@@ -17,7 +17,10 @@ class BindNode(ReteNode):
     A beta network class. This class stores a code snipit, with variables in
     it. It gets all the bindings from the incoming token, updates them with the
     current bindings, binds the result to the target variable (to), then
-    activates its children with the updated bindings.
+    activates its children with the updated bindings. The arguments of the
+    function are inspected once, when the node is built (see `compile_call`),
+    and the target variable gets a slot after those of the parent unless the
+    parent already binds it.
     """
 
     def __init__(self, children, parent, func, to, rete: ReteNetwork):
@@ -30,23 +33,31 @@ class BindNode(ReteNode):
         self.func = func
         self.bind = to
         self._rete_net = rete
+        if to not in self.layout:
+            self.layout = self.layout.extend((to,))
+        self.call = compile_call(func, inspect.getfullargspec(func)[0], rete,
+                                 parent.layout)
 
-    def get_function_result(self, binding: Dict[V, Any]):
+    def get_function_result(self, binding: Binding):
         """
-        Given a binding that maps variables to values, this instantiates the
-        arguments for the function and executes it.
+        Given a binding that maps variables to values, this calls the function
+        with the values bound to its arguments. The calls are counted (and
+        timed) in the stats of the network.
         """
-        args = inspect.getfullargspec(self.func)[0]
-        args = {arg: self._rete_net if arg == 'net' else
-        self._rete_net.facts[binding[V(arg)]] if
-        binding[V(arg)] in self._rete_net.facts else
-        binding[V(arg)] for arg in args}
-        return self.func(**args)
+        stats = self._rete_net.stats
+        stats.counts['bind'] += 1
+        if not stats.timing:
+            return self.call(binding)
+        start = perf_counter()
+        try:
+            return self.call(binding)
+        finally:
+            stats.seconds['bind'] += perf_counter() - start
 
     def left_activation(self, token, wme, binding):
         """
-        Copies and updates the bindings with the results of the function
-        execution. It then left_activates children with this binding.
+        Extends the bindings with the results of the function execution. It
+        then left_activates children with this binding.
         """
         result = self.get_function_result(binding)
 
@@ -54,8 +65,7 @@ class BindNode(ReteNode):
             if binding[self.bind] != result:
                 return
         else:
-            binding = binding.copy()
-            binding[self.bind] = result
+            binding = Binding(binding, self.layout, (result,))
 
         for child in self.children:
             child.left_activation(token, wme, binding)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.common import Binding
+from reactive_deliberative.py_rete.common import V
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Callable
+    from typing import Collection
+    from typing import Dict
+    from typing import Iterable
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import BindingLayout
+    from reactive_deliberative.py_rete.common import Token
+    from reactive_deliberative.py_rete.common import WME
+    from reactive_deliberative.py_rete.network import ReteNetwork
+
+WME_FIELDS = ('identifier', 'attribute', 'value')
+
+
+def define(name: str, args: str, lines: List[str],
+           namespace: Dict[str, Any]) -> Callable:
+    """
+    Compiles a function with the given body lines, the namespace holds the
+    constants the body refers to.
+    """
+    source = "def {}({}):\n".format(name, args)
+    source += "".join("    {}\n".format(line) for line in lines)
+    exec(compile(source, "<py_rete {}>".format(name), "exec"), namespace)
+    return namespace[name]
+
+
+def compile_alpha_keys(masks: Iterable[Tuple[bool, bool, bool]]
+                       ) -> Callable[[WME], Tuple[Tuple[Any, Any, Any], ...]]:
+    """
+    Returns a function giving the keys of the alpha memories a wme can
+    belong to, one per mask. A mask tells which of the identifier, attribute
+    and value an alpha memory tests for a constant, the other fields are
+    wildcards ('#*#'). The keys come in the order of the former probes, most
+    specific first.
+    """
+    keys = []
+    for mask in sorted(set(masks), reverse=True):
+        keys.append("({}, )".format(", ".join(
+            "wme.{}".format(field) if constant else "W"
+            for field, constant in zip(WME_FIELDS, mask))))
+    return define("alpha_keys", "wme", [
+        "return ({})".format("".join(key + ", " for key in keys))],
+                  {'W': '#*#'})
+
+
+def binding_value(layout: BindingLayout, v: V, binding: str = "b") -> str:
+    """
+    Returns an expression reading the value of v from a binding of the given
+    layout by its slot, e.g., `b.parent.values[0]`.
+    """
+    hops, index = layout.locate(v)
+    return "{}{}.values[{}]".format(binding, ".parent" * hops, index)
+
+
+def compile_join_test(variables: List[Tuple[V, str]],
+                      layout: BindingLayout, skip: Collection[V] = ()
+                      ) -> Callable[[Token, WME], bool]:
+    """
+    Returns a function equivalent to JoinNode.perform_join_test for the
+    given (variable, field) pairs and tokens whose bindings have the given
+    layout. The variables of the layout are read from their slots, the
+    others are not bound by the tokens and need no test. Variables in skip
+    are not tested, e.g., because an index already guarantees they are
+    equal.
+    """
+    tests = []
+    for v, field in variables:
+        if v in skip or v not in layout:
+            continue
+        assert field in WME_FIELDS
+        tests.append("{} == wme.{}".format(binding_value(layout, v), field))
+    if not tests:
+        return define("join_test", "token, wme", ["return True"], {})
+    return define("join_test", "token, wme", [
+        "b = token.binding",
+        "return " + " and ".join(tests)], {})
+
+
+def compile_make_binding(fields: List[str], layout: BindingLayout
+                         ) -> Callable[[Token, WME], Binding]:
+    """
+    Returns a function equivalent to JoinNode.make_binding, the new binding
+    has the given layout and holds the given fields of the wme in its slots.
+    When there are no fields, the binding of the token is returned as is.
+    """
+    if not fields:
+        return define("make_binding", "token, wme",
+                      ["return token.binding"], {})
+    assert all(field in WME_FIELDS for field in fields)
+    values = "".join("wme.{}, ".format(field) for field in fields)
+    return define("make_binding", "token, wme", [
+        "return Binding(token.binding, layout, ({}))".format(values)],
+                  {'Binding': Binding, 'layout': layout})
+
+
+def compile_binding_key(variables: Iterable[V], layout: BindingLayout
+                        ) -> Callable[[Token], Tuple[Any, ...]]:
+    """
+    Returns a function computing the tuple of the values bound to variables
+    by a token whose binding has the given layout.
+    """
+    values = "".join("{}, ".format(binding_value(layout, v))
+                     for v in variables)
+    return define("binding_key", "token", [
+        "b = token.binding",
+        "return ({})".format(values)], {})
+
+
+def compile_call(func: Callable, args: Iterable[str], net: ReteNetwork,
+                 layout: Optional[BindingLayout] = None,
+                 match_args: bool = False,
+                 deferred: bool = False) -> Callable[[Any], Any]:
+    """
+    Returns a function that calls func with the given argument names
+    resolved from a binding: `net` is the network, any other argument is the
+    value bound to the variable of the same name, or the fact when the value
+    is the id of a fact of the network. The variables are created once and
+    each value is looked up once, from its slot when the layout of the
+    bindings is given.
+
+    With match_args, the returned function takes a token instead of its
+    binding and a `wmes` argument gets the wmes of the token.
+
+    With deferred, the returned function does not call func but returns it
+    with its keyword arguments, e.g., to call it in another thread.
+    """
+    namespace = {'func': func, 'net': net}
+    if match_args:
+        param = "token"
+        lines = ["binding = token.binding", "facts = net.facts"]
+    else:
+        param = "binding"
+        lines = ["facts = net.facts"]
+    params = []
+    for i, arg in enumerate(args):
+        if arg == 'net':
+            params.append("net=net")
+            continue
+        if match_args and arg == 'wmes':
+            params.append("wmes=token.wmes")
+            continue
+        if layout is not None and V(arg) in layout:
+            lines.append("x{} = {}".format(
+                i, binding_value(layout, V(arg), "binding")))
+        else:
+            namespace["v{}".format(i)] = V(arg)
+            lines.append("x{0} = binding[v{0}]".format(i))
+        params.append("{0}=facts.get(x{1}, x{1})".format(arg, i))
+    if deferred:
+        lines.append("return func, dict({})".format(", ".join(params)))
+    else:
+        lines.append("return func({})".format(", ".join(params)))
+    return define("call", param, lines, namespace)
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
+
 if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Dict
     from typing import Hashable
+    from typing import Iterator
     from typing import List
     from typing import Optional
+    from typing import Tuple
     from reactive_deliberative.py_rete.alpha import AlphaMemory
     from reactive_deliberative.py_rete.beta import ReteNode
     from reactive_deliberative.py_rete.pnode import PNode
@@ -34,11 +41,130 @@ class V:
     def __repr__(self):
         return "V({})".format(self.name)
 
+    def __reduce__(self):
+        # frozen slots cannot be set by the default unpickling
+        return V, (self.name,)
+
+
+class BindingLayout:
+    """
+    The variables bound by the bindings a beta node passes on, each resolved
+    to an integer slot when the network is built. A layout extends the layout
+    of its parent node with the variables the node binds (names), whose slots
+    start after those of the parent.
+    """
+    __slots__ = ['parent', 'names', 'start', 'slots']
+
+    def __init__(self, parent: Optional[BindingLayout] = None,
+                 names: Tuple[V, ...] = ()) -> None:
+        self.parent = parent
+        self.names = names
+        self.slots: Dict[V, int] = dict(parent.slots) if parent else {}
+        self.start = len(self.slots)
+        for i, v in enumerate(names):
+            self.slots[v] = self.start + i
+
+    def __contains__(self, v: object) -> bool:
+        return v in self.slots
+
+    def __repr__(self) -> str:
+        return "BindingLayout({})".format(list(self.slots))
+
+    def extend(self, names: Tuple[V, ...]) -> BindingLayout:
+        """
+        Returns the layout of the bindings that add the given (unbound)
+        variables to the bindings of this layout, itself if there are none.
+        """
+        if not names:
+            return self
+        return BindingLayout(self, names)
+
+    def locate(self, v: V) -> Tuple[int, int]:
+        """
+        Returns how many parents to follow from a binding of this layout to
+        reach the one holding the value of v, and the index of the value in
+        it.
+        """
+        slot = self.slots[v]
+        hops = 0
+        layout = self
+        while slot < layout.start:
+            layout = layout.parent
+            hops += 1
+        return hops, slot - layout.start
+
+
+class Binding(Mapping):
+    """
+    The values a token binds to variables. A binding only holds the values of
+    the variables its node binds and shares the rest with the binding of its
+    parent token, so extending a binding does not copy it. It can be read as
+    a read-only dict of variables to values.
+    """
+    __slots__ = ['parent', 'layout', 'values']
+
+    def __init__(self, parent: Optional[Binding], layout: BindingLayout,
+                 values: Tuple[Any, ...]) -> None:
+        self.parent = parent
+        self.layout = layout
+        self.values = values
+
+    def __getitem__(self, v: V) -> Any:
+        slot = self.layout.slots[v]
+        binding = self
+        while slot < binding.layout.start:
+            binding = binding.parent
+        return binding.values[slot - binding.layout.start]
+
+    def __contains__(self, v: object) -> bool:
+        return v in self.layout.slots
+
+    def __iter__(self) -> Iterator[V]:
+        return iter(self.layout.slots)
+
+    def __len__(self) -> int:
+        return len(self.layout.slots)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+EMPTY_LAYOUT = BindingLayout()
+EMPTY_BINDING = Binding(None, EMPTY_LAYOUT, ())
+
+# Shared by the tokens that have no children, join results or ncc results
+# yet, the sets are only allocated when the first item is added.
+NO_ITEMS = ()
+
 
-@dataclass(eq=True, frozen=True)
 class Match:
-    pnode: PNode
-    token: Token
+    """
+    An activation of a production, i.e., one of the tokens of its pnode. A
+    match is created once when the token reaches the pnode and is kept on the
+    agenda until the token is deleted. The index is the position of the match
+    in its agenda bucket and seq numbers the matches in the order they
+    entered the agenda. in_heap tells whether the heap of its production
+    holds an entry for it (see `Activations`).
+    """
+    __slots__ = ['pnode', 'token', 'index', 'seq', 'in_heap']
+
+    def __init__(self, pnode: PNode, token: Token) -> None:
+        self.pnode = pnode
+        self.token = token
+        self.index = -1
+        self.seq = 0
+        self.in_heap = False
+
+    def __repr__(self) -> str:
+        return "Match(pnode={}, token={})".format(self.pnode, self.token)
+
+    @property
+    def wmes(self) -> Tuple[Optional[WME], ...]:
+        """
+        The wmes of the match, in the order of the conditions. The tuple is
+        cached by the token, reading it again does not copy it.
+        """
+        return self.token.wmes
 
     async def fire(self):
         return await self.pnode.production.fire(self.token)
@@ -50,7 +176,7 @@ class WME:
     essentially comprised of a collection of these elements.
     """
     __slots__ = ['identifier', 'attribute', 'value', 'amems', 'tokens',
-                 'negative_join_results']
+                 'negative_join_results', 'timetag']
 
     def __init__(self, identifier: Hashable, attribute: Hashable, value:
     Hashable) -> None:
@@ -66,8 +192,10 @@ class WME:
         self.attribute = attribute
         self.value = value
         self.amems: List[AlphaMemory] = []  # the ones containing this WME
-        self.tokens: List[Token] = []  # the ones containing this WME
-        self.negative_join_results: List[NegativeJoinResult] = []
+        self.tokens: OrderedSet = OrderedSet()  # the ones containing this WME
+        self.negative_join_results: OrderedSet = OrderedSet()
+        # set when the wme is added to a network, higher is more recent
+        self.timetag = 0
 
     def __hash__(self):
         return hash((self.identifier, self.attribute, self.value))
@@ -90,40 +218,65 @@ class Token:
     """
     Tokens represent matches within the alpha and beta memories. The parent
     corresponds to the match that was extended to create the current token.
+
+    The children of a token are allocated when its first child is created,
+    and the join and ncc results only by the negative and ncc nodes that use
+    them; until then they are the empty NO_ITEMS tuple. Deleted tokens can be
+    reused (see `TokenFactory`).
     """
     __slots__ = ['parent', 'wme', 'node', 'children', 'join_results',
-                 'ncc_results', 'owner', 'binding']
+                 'ncc_results', 'owner', 'binding', '_wmes']
 
     def __init__(self, parent: Optional[Token],
                  wme: Optional[WME],
                  node: Optional[ReteNode] = None,
-                 binding: Optional[dict] = None
+                 binding: Optional[Binding] = None
                  ) -> None:
         """
         :type wme: WME
         :type parent: Token
-        :type binding: dict
+        :type binding: Binding
         """
+        # the ones with parent = this token
+        self.children: OrderedSet = NO_ITEMS
         self.parent = parent
         self.wme = wme
         # points to memory this token is in
         self.node = node
-        # the ones with parent = this token
-        self.children: List[Token] = []
         # used only on tokens in negative nodes
-        self.join_results: List[NegativeJoinResult] = []
-        self.ncc_results: List[Token] = []
+        self.join_results: OrderedSet = NO_ITEMS
         # Ncc
+        self.ncc_results: OrderedSet = NO_ITEMS
         self.owner: Optional[Token] = None
-        self.binding = binding if binding else {}  # {"$x": "B1"}
-
-        if self.parent:
-            self.parent.children.append(self)
-        if self.wme:
-            self.wme.tokens.append(self)
+        self.binding = (binding if binding is not None
+                        else EMPTY_BINDING)  # {V("x"): "B1"}
+        self._wmes: Optional[Tuple[Optional[WME], ...]] = None
+
+        if parent:
+            siblings = parent.children
+            if siblings is NO_ITEMS:
+                siblings = parent.children = OrderedSet()
+            siblings.append(self)
+        if wme:
+            wme.tokens.append(self)
+
+    def clear(self) -> None:
+        """
+        Drops the references of a deleted token so it can be reused (see
+        `TokenFactory`), which initializes it again.
+        """
+        self.children = NO_ITEMS
+        self.parent = None
+        self.wme = None
+        self.node = None
+        self.join_results = NO_ITEMS
+        self.ncc_results = NO_ITEMS
+        self.owner = None
+        self.binding = None
+        self._wmes = None
 
     def __repr__(self) -> str:
-        return "<Token %s>" % self.wmes
+        return "<Token %s>" % (list(self.wmes),)
 
     def __eq__(self, other: object) -> bool:
         return id(self) == id(other)
@@ -162,25 +315,43 @@ class Token:
         plt.show()
 
     @property
-    def wmes(self) -> List[Optional[WME]]:
-        ret = [self.wme]
-        t = self
-        while t.parent and not t.parent.is_root():
-            t = t.parent
-            ret.insert(0, t.wme)
-        return ret
+    def wmes(self) -> Tuple[Optional[WME], ...]:
+        """
+        The wmes matched by the token and its ancestors, in the order of the
+        conditions (None for negated conditions). They are collected in one
+        pass up the parent chain, stopping at the nearest ancestor whose wmes
+        are known, and cached since a token does not change once created.
+
+        This is a tuple, shared by every read, where it used to be a new
+        list; use list(token.wmes) to get a list to change.
+        """
+        wmes = self._wmes
+        if wmes is None:
+            prefix = ()
+            suffix = [self.wme]
+            t = self
+            while t.parent and not t.parent.is_root():
+                t = t.parent
+                if t._wmes is not None:
+                    prefix = t._wmes
+                    break
+                suffix.append(t.wme)
+            suffix.reverse()
+            wmes = self._wmes = prefix + tuple(suffix)
+        return wmes
 
     def delete_descendents_of_token(self) -> None:
         """
         Helper function to delete all the descendent tokens.
         """
         while self.children:
-            self.children[0].delete_token_and_descendents()
+            self.children.first().delete_token_and_descendents()
 
     def delete_token_and_descendents(self) -> None:
         """
         Deletes a token and its descendents, but has special cases that make
-        this difficult to understand in isolation.
+        this difficult to understand in isolation. Tokens of beta memories are
+        released to the token factory of their memory once deleted.
 
         TODO:
             - Add optimization for right unlinking (pg 87 of Doorenbois
@@ -192,18 +363,14 @@ class Token:
         from reactive_deliberative.py_rete.ncc_node import NccPartnerNode
         from reactive_deliberative.py_rete.negative_node import NegativeNode
         from reactive_deliberative.py_rete.beta import BetaMemory
-        from reactive_deliberative.py_rete.pnode import PNode
         from reactive_deliberative.py_rete.join_node import JoinNode
 
         while self.children:
-            self.children[0].delete_token_and_descendents()
+            self.children.first().delete_token_and_descendents()
 
         if (isinstance(self.node, BetaMemory) and not
         isinstance(self.node, NccPartnerNode)):
-            self.node.items.remove(self)
-
-            if isinstance(self.node, PNode):
-                self.node.new = [e for e in self.node.new if e != self]
+            self.node.remove(self)
 
         if self.wme:
             self.wme.tokens.remove(self)
@@ -237,6 +404,9 @@ class Token:
                     bchild.left_activation(self.owner, None,
                                            self.owner.binding)
 
+        if isinstance(self.node, BetaMemory):
+            self.node.token_factory.release(self)
+
 
 @dataclass(eq=True, frozen=True)
 class NegativeJoinResult:
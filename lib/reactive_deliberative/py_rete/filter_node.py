@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import inspect
+from time import perf_counter
 from typing import TYPE_CHECKING
 
 from reactive_deliberative.py_rete.beta import ReteNode
-from reactive_deliberative.py_rete.common import V
+from reactive_deliberative.py_rete.codegen import compile_call
 
 if TYPE_CHECKING:  # pragma: no cover
     from typing import List
@@ -16,7 +17,9 @@ class FilterNode(ReteNode):
     """
     A beta network node. Takes a function, passes variables in as kwargs, and
     executes it. If the code evaluates to True (boolean), then it activates the
-    children with the token/wme.
+    children with the token/wme. The arguments of the function are inspected
+    once, when the node is built (see `compile_call`), and read from the
+    slots of the bindings.
     """
 
     def __init__(self, children: List[ReteNode],
@@ -26,19 +29,27 @@ class FilterNode(ReteNode):
         super().__init__(children=children, parent=parent)
         self.func = func
         self._rete_net = rete
+        self.call = compile_call(func, inspect.getfullargspec(func)[0], rete,
+                                 parent.layout)
 
     def get_function_result(self, token, wme, binding):
-        args = inspect.getfullargspec(self.func)[0]
-        args = {arg: self._rete_net if arg == 'net' else
-        self._rete_net.facts[binding[V(arg)]] if
-        binding[V(arg)] in self._rete_net.facts else
-        binding[V(arg)] for arg in args}
-
-        return self.func(**args)
+        """
+        Calls the function with the values bound to its arguments, the calls
+        are counted (and timed) in the stats of the network.
+        """
+        stats = self._rete_net.stats
+        stats.counts['filter'] += 1
+        if not stats.timing:
+            return self.call(binding)
+        start = perf_counter()
+        try:
+            return self.call(binding)
+        finally:
+            stats.seconds['filter'] += perf_counter() - start
 
     def left_activation(self, token, wme, binding):
         """
-        :type binding: dict
+        :type binding: Binding
         :type wme: WME
         :type token: Token
         """
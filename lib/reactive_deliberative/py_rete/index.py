@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import Hashable
+    from typing import Iterable
+
+
+class HashIndex:
+    """
+    Groups the items of a memory by a key computed from each item, so the
+    items that can pass an equality join test are found with a lookup instead
+    of a scan. Items within a bucket keep their insertion order.
+    """
+
+    def __init__(self, key: Callable[[Any], Hashable],
+                 items: Iterable[Any] = ()) -> None:
+        self.key = key
+        self.buckets: Dict[Hashable, Dict[Any, None]] = {}
+        self.extend(items)
+
+    def add(self, item: Any) -> None:
+        key = self.key(item)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {}
+        bucket[item] = None
+
+    def extend(self, items: Iterable[Any]) -> None:
+        """
+        Adds the items in order, like calling `add` on each.
+        """
+        key = self.key
+        buckets = self.buckets
+        for item in items:
+            k = key(item)
+            bucket = buckets.get(k)
+            if bucket is None:
+                bucket = buckets[k] = {}
+            bucket[item] = None
+
+    def remove(self, item: Any) -> None:
+        key = self.key(item)
+        bucket = self.buckets[key]
+        del bucket[item]
+        if not bucket:
+            del self.buckets[key]
+
+    def get(self, key: Hashable) -> Iterable[Any]:
+        return self.buckets.get(key, ())
@@ -4,14 +4,21 @@ from typing import TYPE_CHECKING
 
 from reactive_deliberative.py_rete.alpha import AlphaMemory
 from reactive_deliberative.py_rete.beta import ReteNode
+from reactive_deliberative.py_rete.codegen import compile_join_test
+from reactive_deliberative.py_rete.codegen import compile_make_binding
+from reactive_deliberative.py_rete.common import Binding
 from reactive_deliberative.py_rete.common import Token
 from reactive_deliberative.py_rete.common import V
 from reactive_deliberative.py_rete.common import WME
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Dict
-    from typing import Any
+    from typing import List
+    from typing import Optional
+    from typing import Set
+    from typing import Tuple
+    from reactive_deliberative.py_rete.beta import BetaMemory
     from reactive_deliberative.py_rete.conditions import Cond
+    from reactive_deliberative.py_rete.index import HashIndex
 
 
 class JoinNode(ReteNode):
@@ -33,6 +40,18 @@ class JoinNode(ReteNode):
     the wmes from the alpha memory instead (essentially the opposite direction
     as above). Similarly, for matches, updated bindings are created and
     children are activated.
+
+    When the variables of the condition are already bound by the tokens on the
+    left side, both sides can be indexed on them (see `build_indexes`), so
+    each activation only visits the items with equal values instead of all
+    of them.
+
+    The variables of the condition that are not bound on the left side are
+    new variables: their values are put in the slots of a binding that
+    extends the binding of the token (see `BindingLayout`).
+
+    Once the node is built, `compile` replaces `perform_join_test` and
+    `make_binding` with functions generated for its condition.
     """
 
     def __init__(self, amem: AlphaMemory, condition: Cond, **kwargs):
@@ -42,6 +61,48 @@ class JoinNode(ReteNode):
         self.nearest_ancestor_with_same_amem = None
         self.vars = [(v, field) for field, v in self.condition.vars if
                      isinstance(v, V)]
+        new_vars = {v: field for v, field in self.vars
+                    if v not in self.parent.layout}
+        self.new_vars: List[Tuple[V, str]] = list(new_vars.items())
+        self.layout = self.parent.layout.extend(tuple(new_vars))
+        self.left_index: Optional[HashIndex] = None
+        self.right_index: Optional[HashIndex] = None
+        self.indexed_vars: Set[V] = set()
+
+    @property
+    def left_memory(self) -> BetaMemory:
+        """
+        The memory holding the tokens that are joined with the alpha memory.
+        """
+        return self.parent
+
+    def build_indexes(self) -> None:
+        """
+        Indexes the left memory and the alpha memory on the variables of the
+        condition that are bound by the tokens on the left side. Does nothing
+        if there are no such variables.
+        """
+        index_vars = [(v, field) for v, field in self.vars
+                      if v in self.parent.layout]
+        if not index_vars:
+            return
+        self.indexed_vars = {v for v, _ in index_vars}
+        self.left_index = self.left_memory.get_index(
+            tuple(v for v, _ in index_vars))
+        self.right_index = self.amem.get_index(
+            tuple(field for _, field in index_vars))
+
+    def compile(self) -> None:
+        """
+        Generates the join test and binding builder of the node. The test
+        reads the wme fields and the slots of the token binding directly and
+        skips the variables the indexes already compare, the binding of the
+        token is reused if the condition binds no new variable.
+        """
+        self.perform_join_test = compile_join_test(
+            self.vars, self.parent.layout, self.indexed_vars)
+        self.make_binding = compile_make_binding(
+            [field for _, field in self.new_vars], self.layout)
 
     @property
     def amem_recently_nonempty(self) -> bool:
@@ -79,7 +140,11 @@ class JoinNode(ReteNode):
             self.relink_to_beta_memory()
             if not self.parent.items:
                 self.amem.successors.remove(self)
-        for token in self.parent.items:
+        if self.left_index is None:
+            tokens = self.parent.items
+        else:
+            tokens = self.left_index.get(self.right_index.key(wme))
+        for token in tokens:
             if self.perform_join_test(token, wme):
                 binding = self.make_binding(token, wme)
                 for child in self.children:
@@ -90,13 +155,9 @@ class JoinNode(ReteNode):
         while ancestor and ancestor.right_unlinked:
             ancestor = ancestor.nearest_ancestor_with_same_amem
         if ancestor:
-            try:
-                loc = self.amem.successors.index(ancestor)
-            except ValueError:
-                loc = -1
-            self.amem.successors.insert(loc + 1, self)
+            self.amem.successors.insert_after(ancestor, self)
         else:
-            self.amem.successors.insert(0, self)
+            self.amem.successors.insert_first(self)
 
     def relink_to_beta_memory(self):
         self.parent.children.append(self)
@@ -109,7 +170,11 @@ class JoinNode(ReteNode):
             self.relink_to_alpha_memory()
             if not self.amem.items:
                 self.parent.children.remove(self)
-        for wme in self.amem.items:
+        if self.right_index is None:
+            wmes = self.amem.items
+        else:
+            wmes = self.right_index.get(self.left_index.key(token))
+        for wme in wmes:
             if self.perform_join_test(token, wme):
                 binding = self.make_binding(token, wme)
                 for child in self.children:
@@ -126,14 +191,11 @@ class JoinNode(ReteNode):
                 return False
         return True
 
-    def make_binding(self, token: Token, wme: WME) -> Dict[V, Any]:
+    def make_binding(self, token: Token, wme: WME) -> Binding:
         """
         Makes updated bindings that result from joining token and wme.
         """
-        new_binding = {v: getattr(wme, field) for v, field in self.vars}
-        if new_binding:
-            binding = token.binding.copy()
-            binding.update(new_binding)
-            return binding
-        else:
+        if not self.new_vars:
             return token.binding
+        return Binding(token.binding, self.layout,
+                       tuple(getattr(wme, field) for _, field in self.new_vars))
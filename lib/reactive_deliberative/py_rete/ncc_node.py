@@ -5,14 +5,13 @@ from typing import TYPE_CHECKING
 from reactive_deliberative.py_rete.alpha import AlphaMemory
 from reactive_deliberative.py_rete.beta import BetaMemory
 from reactive_deliberative.py_rete.common import Token
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
 
 if TYPE_CHECKING:  # pragma: no cover
     from typing import Optional
     from typing import List
-    from typing import Dict
-    from typing import Any
     from reactive_deliberative.py_rete.beta import ReteNode
-    from reactive_deliberative.py_rete.common import V
+    from reactive_deliberative.py_rete.common import Binding
     from reactive_deliberative.py_rete.common import WME
 
 
@@ -34,11 +33,14 @@ class NccNode(BetaMemory):
     def find_nearest_ancestor_with_same_amem(self, amem: AlphaMemory):
         return self.partner.parent.find_nearest_ancestor_with_same_amem(amem)
 
-    def left_activation(self, token: Token, wme: WME, binding: Dict[V, Any]):
-        new_token = Token(token, wme, self, binding)
-        self.items.append(new_token)
-        for result in self.partner.new_result_buffer:
-            self.partner.new_result_buffer.remove(result)
+    def left_activation(self, token: Token, wme: WME, binding: Binding):
+        new_token = self.token_factory.token(token, wme, self, binding)
+        new_token.ncc_results = OrderedSet()
+        self.add(new_token)
+        buffer = self.partner.new_result_buffer
+        while buffer:
+            result = buffer.first()
+            buffer.remove(result)
             new_token.ncc_results.append(result)
             result.owner = new_token
         if not new_token.ncc_results:
@@ -61,17 +63,23 @@ class NccPartnerNode:
         self.parent = parent
         self.ncc_node = ncc_node
         self.number_of_conditions = number_of_conditions
-        self.new_result_buffer = new_result_buffer if new_result_buffer else []
+        self.new_result_buffer = (OrderedSet(new_result_buffer)
+                                  if new_result_buffer else OrderedSet())
 
-    def left_activation(self, token: Token, wme: WME, binding: Dict[V, Any]):
+    def left_activation(self, token: Token, wme: WME, binding: Binding):
         new_result = Token(token, wme, self, binding)
         owners_t = token
         owners_w = wme
         for i in range(self.number_of_conditions):
             owners_w = owners_t.wme
             owners_t = owners_t.parent
-        for token in self.ncc_node.items:
-            if token.parent == owners_t and token.wme == owners_w:
+        # The owner is a child of owners_t, which is much cheaper to scan than
+        # the items of the ncc node.
+        candidates = (self.ncc_node.items if owners_t is None
+                      else owners_t.children)
+        for token in candidates:
+            if (token.node is self.ncc_node and token.parent == owners_t and
+                    token.wme == owners_w):
                 token.ncc_results.append(new_result)
                 new_result.owner = token
                 token.delete_descendents_of_token()
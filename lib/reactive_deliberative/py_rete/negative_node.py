@@ -5,13 +5,12 @@ from typing import TYPE_CHECKING
 from reactive_deliberative.py_rete.alpha import AlphaMemory
 from reactive_deliberative.py_rete.beta import BetaMemory
 from reactive_deliberative.py_rete.common import NegativeJoinResult
-from reactive_deliberative.py_rete.common import Token
 from reactive_deliberative.py_rete.join_node import JoinNode
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Dict
-    from typing import Any
-    from reactive_deliberative.py_rete.common import V
+    from reactive_deliberative.py_rete.common import Binding
+    from reactive_deliberative.py_rete.common import Token
     from reactive_deliberative.py_rete.common import WME
 
 
@@ -20,29 +19,41 @@ class NegativeNode(BetaMemory, JoinNode):  # type: ignore
     A beta network class that only passes on tokens when there is no match. The
     left activation is called by the parent beta node.  The right activation is
     called from the alpha network (amem).  Test are similar to those that
-    appear in JoinNode
+    appear in JoinNode. The node binds no variable, the tokens it passes on
+    keep the bindings of their parents.
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.new_vars = []
+        self.layout = self.parent.layout
 
     def find_nearest_ancestor_with_same_amem(self, amem: AlphaMemory):
         if self.amem == amem:
             return self
         return self.parent.find_nearest_ancestor_with_same_amem(amem)
 
+    @property
+    def left_memory(self) -> BetaMemory:
+        return self
+
     @property
     def right_unlinked(self) -> bool:
         return len(self.items) == 0
 
-    def left_activation(self, token: Token, wme: WME, binding: Dict[V, Any]):
+    def left_activation(self, token: Token, wme: WME, binding: Binding):
         if not self.items:
             self.relink_to_alpha_memory()
 
-        new_token = Token(parent=token, wme=wme, node=self, binding=binding)
-        self.items.append(new_token)
+        new_token = self.token_factory.token(token, wme, self, binding)
+        new_token.join_results = OrderedSet()
+        self.add(new_token)
 
-        for wme in self.amem.items:
+        if self.right_index is None:
+            wmes = self.amem.items
+        else:
+            wmes = self.right_index.get(self.left_index.key(new_token))
+        for wme in wmes:
             if self.perform_join_test(new_token, wme):
                 jr = NegativeJoinResult(new_token, wme)
                 new_token.join_results.append(jr)
@@ -53,7 +64,11 @@ class NegativeNode(BetaMemory, JoinNode):  # type: ignore
                 child.left_activation(new_token, None, binding)
 
     def right_activation(self, wme: WME):
-        for token in self.items:
+        if self.left_index is None:
+            tokens = self.items
+        else:
+            tokens = self.left_index.get(self.right_index.key(wme))
+        for token in tokens:
             if self.perform_join_test(token, wme):
                 if not token.join_results:
                     # TODO: TEST THIS - Chris
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-import random
-from datetime import datetime
-from itertools import product
+import gc
+from contextlib import contextmanager
+from time import monotonic
 from typing import TYPE_CHECKING
 
+from reactive_deliberative.py_rete.agenda import Agenda
 from reactive_deliberative.py_rete.alpha import AlphaMemory
 from reactive_deliberative.py_rete.beta import BetaMemory
 from reactive_deliberative.py_rete.beta import ReteNode
 from reactive_deliberative.py_rete.bind_node import BindNode
+from reactive_deliberative.py_rete.codegen import compile_alpha_keys
+from reactive_deliberative.py_rete.common import EMPTY_BINDING
 from reactive_deliberative.py_rete.common import Match
 from reactive_deliberative.py_rete.common import V
 from reactive_deliberative.py_rete.common import WME
@@ -23,10 +26,21 @@ from reactive_deliberative.py_rete.join_node import JoinNode
 from reactive_deliberative.py_rete.ncc_node import NccNode
 from reactive_deliberative.py_rete.ncc_node import NccPartnerNode
 from reactive_deliberative.py_rete.negative_node import NegativeNode
+from reactive_deliberative.py_rete.offload import Offloader
+from reactive_deliberative.py_rete.ordered_set import LinkedSet
 from reactive_deliberative.py_rete.pnode import PNode
+from reactive_deliberative.py_rete.preemption import Preemption
 from reactive_deliberative.py_rete.production import Production
+from reactive_deliberative.py_rete.snapshot import read_snapshot
+from reactive_deliberative.py_rete.snapshot import write_snapshot
+from reactive_deliberative.py_rete.stats import Stats
+from reactive_deliberative.py_rete.strategies import Strategy
+from reactive_deliberative.py_rete.tokens import TokenFactory
+from reactive_deliberative.py_rete.transaction import Transaction
+from reactive_deliberative.py_rete.working_memory import WorkingMemory
 
 if TYPE_CHECKING:  # pragma: no cover
+    from typing import Callable
     from typing import Optional
     from typing import Generator
     from typing import Dict
@@ -35,64 +49,224 @@ if TYPE_CHECKING:  # pragma: no cover
     from typing import Set
     from typing import Union
     from typing import Hashable
+    from typing import Iterable
 
 
 class ReteNetwork:
     """
     A Rete Network to store all the facts and productions to compute matches.
+
+    With indexing enabled (the default), join and negative nodes index their
+    memories on the variables they test for equality. Turning it off makes
+    every join scan its memories, which is useful to compare results.
+
+    The strategy picks which of the highest priority matches fires, it
+    defaults to a RandomStrategy (see `reactive_deliberative.py_rete.
+    strategies` for deterministic ones).
+
+    The stats count the work done by the network, e.g., the calls to filter
+    and bind functions or the tokens allocated; set `stats.timing` to also
+    measure the duration of the calls.
+
+    on_ready, if set, is called when the agenda gets a match that can fire
+    after having none. The time from that moment to the start of the next
+    firing is recorded in the stats as 'ready_latency'.
+
+    The functions of blocking productions are run in threads by the
+    offloader (see `Offloader`), set `offloader.executor` to pick the pool.
+
+    preemption, if set, lets other tasks take over between firings and at
+    the checkpoints of long firings (see `Preemption` and `checkpoint`).
+
+    With pooling, deleted tokens are recycled (see `TokenFactory`), and with
+    pause_gc, the cyclic garbage collector is paused while changes are
+    propagated (see `propagation`). Both are off by default; they suit
+    workloads with a lot of churn, as long as matches are not kept after
+    their tokens are deleted.
     """
 
-    def __init__(self):
+    def __init__(self, indexing: bool = True,
+                 strategy: Optional[Strategy] = None,
+                 pooling: bool = False, pause_gc: bool = False):
         self.alpha_hash: Dict[
             Tuple[Hashable, Hashable, Hashable], AlphaMemory] = {}
+        # number of alpha memories per mask of constant fields
+        self.alpha_masks: Dict[Tuple[bool, bool, bool], int] = {}
+        self.alpha_keys = compile_alpha_keys(())
         self.beta_root = ReteNode()
         self.buf = None
         self.pnodes: List[PNode] = []
-        self.working_memory: Set[WME] = set()
+        self.working_memory: WorkingMemory = WorkingMemory()
         self.facts: Dict[str, Fact] = {}
         self.fact_counter: int = 0
         self.production_counter: int = 0
         self.productions: Set[Production] = set()
         self.execution_timestamps = {}
+        self.agenda = Agenda(strategy)
+        self.agenda.on_ready = self.__agenda_ready
+        self.on_ready: Optional[Callable[[], None]] = None
+        self.ready_since: Optional[float] = None
+        self.timetag_counter = 0
+        self.indexing = indexing
+        self.pending: Optional[Transaction] = None
+        self.stats = Stats()
+        self.token_factory = TokenFactory(self.stats, pool=pooling)
+        self.pause_gc = pause_gc
+        self.offloader = Offloader(self)
+        self.preemption: Optional[Preemption] = None
 
-    @staticmethod
-    def __filter_by_priority(matches: list[Match]):
-        if len(matches) == 0:
-            return []
-        highest_priority = max(matches, key=lambda x: x.pnode.production.priority).pnode.production.priority
-        return [match for match in matches if match.pnode.production.priority == highest_priority]
-
-    def __filter_by_timeout(self, matches: list[Match]):
-        if len(matches) == 0:
-            return []
-        return [
-            match
-            for match in matches
-            if match.pnode.production.id not in self.execution_timestamps or
-               abs(self.now - self.execution_timestamps[match.pnode.production.id]) > match.pnode.production.timeout
-        ]
+    @property
+    def strategy(self) -> Strategy:
+        return self.agenda.strategy
+
+    @strategy.setter
+    def strategy(self, strategy: Strategy) -> None:
+        self.agenda.set_strategy(strategy)
 
     async def run(self, n: int = 1) -> None:
         """
-        First n rules, chosen at random. After each rule is fired the facts are
-        updated and new matches computed.
+        First n rules, chosen by the strategy among the highest priority
+        matches on the agenda. After each rule is fired the facts are updated and new
+        matches computed. A production with a timeout stays off the agenda
+        for that many seconds after it fires. Returns early if a preemption
+        is requested.
         """
+        preemption = self.preemption
         while n > 0:
-            matches = list(self.matches)
-            matches = self.__filter_by_timeout(matches)
-            matches = self.__filter_by_priority(matches)
-
-            if len(matches) <= 0:
+            if preemption is not None and preemption.requested:
                 break
+            now = self.now
+            self.agenda.wake(now)
+            match = self.agenda.select()
 
-            match = random.choice(matches)
-
-            prod_id = match.pnode.production.id
-            self.execution_timestamps[prod_id] = self.now
+            if match is None:
+                self.ready_since = None
+                break
 
+            self.begin_firing(match, now)
             await match.fire()
             n -= 1
 
+    def begin_firing(self, match: Match, now: float) -> None:
+        """
+        Records that match fires at the monotonic time now and starts the
+        cooldown of its production, if it has a timeout.
+        """
+        if self.ready_since is not None:
+            self.stats.record('ready_latency', now - self.ready_since)
+            self.ready_since = None
+
+        production = match.pnode.production
+        self.execution_timestamps[production.id] = now
+        if production.timeout > 0:
+            self.agenda.cool_down(production, now + production.timeout)
+
+    async def checkpoint(self) -> None:
+        """
+        A preemption point for productions that take long, e.g., in a loop
+        that changes many facts: waits there while another task preempts the
+        network (see `Preemption.checkpoint`).
+        """
+        if self.preemption is not None:
+            await self.preemption.checkpoint()
+
+    async def load_facts(self, facts: Iterable[Fact],
+                         batch_size: int = 1000) -> None:
+        """
+        Adds facts in batches of batch_size, each one like `add_facts`, with
+        a preemption point between them, so a large load does not hold the
+        network for the whole propagation.
+        """
+        batch = []
+        for fact in facts:
+            batch.append(fact)
+            if len(batch) == batch_size:
+                self.add_facts(batch)
+                batch = []
+                await self.checkpoint()
+        if batch:
+            self.add_facts(batch)
+
+    def __agenda_ready(self) -> None:
+        if self.ready_since is None:
+            self.ready_since = self.now
+        if self.on_ready is not None:
+            self.on_ready()
+
+    def seconds_until_ready(self) -> Optional[float]:
+        """
+        Returns 0 if a match can fire now, the number of seconds until the
+        next production cools down if all the matches are cooling down, and
+        None if there is nothing to wait for.
+        """
+        now = self.now
+        self.agenda.wake(now)
+        if self.agenda.has_ready():
+            return 0
+        ready_at = self.agenda.next_ready_time()
+        if ready_at is None:
+            return None
+        return max(ready_at - now, 0)
+
+    @contextmanager
+    def transaction(self) -> Generator[ReteNetwork, None, None]:
+        """
+        Batches the changes to facts and wmes made in the with block. They
+        are collected instead of being propagated, an assert and a retract of
+        the same wme cancel out, and the net delta is propagated once when
+        the block exits (retracts first), so tokens for intermediate states
+        are never built. Nested transactions join the outermost one.
+
+        Changes are not rolled back: if the block raises, the changes made
+        so far are still propagated.
+        """
+        if self.pending is not None:
+            yield self
+            return
+
+        self.pending = Transaction(self.working_memory)
+        try:
+            yield self
+        finally:
+            pending, self.pending = self.pending, None
+            with self.propagation():
+                for wme in list(pending.removes):
+                    self.remove_wme(wme)
+                for wme in list(pending.adds):
+                    self.add_wme(wme)
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.pending is not None
+
+    @property
+    def pooling(self) -> bool:
+        return self.token_factory.pool
+
+    @pooling.setter
+    def pooling(self, pooling: bool) -> None:
+        self.token_factory.pool = pooling
+        if not pooling:
+            self.token_factory.clear()
+
+    @contextmanager
+    def propagation(self) -> Generator[None, None, None]:
+        """
+        Wraps the propagation of changes through the network. With pause_gc
+        set, the cyclic garbage collector is paused until the outermost
+        propagation ends, so it does not traverse the tokens being linked in
+        the middle of the wave. Does nothing if the collector is already
+        disabled.
+        """
+        if not self.pause_gc or not gc.isenabled():
+            yield
+            return
+        gc.disable()
+        try:
+            yield
+        finally:
+            gc.enable()
+
     def __repr__(self):
         output = 'Productions:\n'
         for p in self.productions:
@@ -175,19 +349,27 @@ class ReteNetwork:
         # nx.draw(G, with_labels=True, font_weight="bold")
         plt.show()
 
-    def add_fact(self, fact: Fact) -> None:
+    def __duplicate_with_ids(self, fact: Fact) -> Fact:
         """
-        Adds a fact to the network.
+        Returns a copy of the fact where nested facts are replaced with their
+        ids. Nested facts that are not in the network yet are added first.
         """
-        if fact.id is not None:
-            raise ValueError("Fact already has an id, cannot add")
-
         copy = fact.duplicate()
         for k in copy:
             if isinstance(copy[k], Fact):
                 if copy[k].id is None:
                     self.add_fact(copy[k])
                 copy[k] = copy[k].id
+        return copy
+
+    def add_fact(self, fact: Fact) -> None:
+        """
+        Adds a fact to the network.
+        """
+        if fact.id is not None:
+            raise ValueError("Fact already has an id, cannot add")
+
+        copy = self.__duplicate_with_ids(fact)
 
         fact.id = "f-{}".format(self.fact_counter)
         copy.id = fact.id
@@ -195,8 +377,33 @@ class ReteNetwork:
 
         self.facts[fact.id] = fact
 
-        for wme in copy.wmes:
-            self.add_wme(wme)
+        with self.propagation():
+            for wme in copy.wmes:
+                self.add_wme(wme)
+
+    def add_facts(self, facts: Iterable[Fact]) -> None:
+        """
+        Adds many facts at once, e.g., to load the initial facts of an agent.
+        The final matches are the same as with one add_fact call per fact.
+
+        When working memory is empty, the wmes are put in the alpha memories
+        without activating them, then the beta network is seeded top-down,
+        each node being fed once from its parent (see `load_wmes`). Otherwise
+        the facts are added in a transaction.
+        """
+        if self.pending is not None or self.working_memory:
+            with self.transaction():
+                for fact in facts:
+                    self.add_fact(fact)
+            return
+
+        self.pending = Transaction(self.working_memory)
+        try:
+            for fact in facts:
+                self.add_fact(fact)
+        finally:
+            pending, self.pending = self.pending, None
+            self.load_wmes(pending.adds)
 
     def remove_fact(self, fact: Fact) -> None:
         """
@@ -207,7 +414,8 @@ class ReteNetwork:
 
         if fact.id in self.facts:
             del self.facts[fact.id]
-            self.remove_wme_by_fact_id(fact.id)
+            with self.propagation():
+                self.remove_wme_by_fact_id(fact.id)
 
         fact.id = None
 
@@ -215,13 +423,40 @@ class ReteNetwork:
         return self.facts[fact_id]
 
     def update_fact(self, fact: Fact) -> None:
-        # TODO: Figure out a fancy way to only update part of the fact
-        self.remove_fact(fact)
-        self.add_fact(fact)
+        """
+        Updates a fact in the network. The new contents of the fact are
+        compared with the wmes asserted for its id and only the wmes that
+        changed, in value or in the type of their value, are retracted and
+        asserted, so tokens built from unchanged attributes are kept. The fact
+        keeps its id.
+        """
+        if fact.id is None or fact.id not in self.facts:
+            raise ValueError("Fact has no id or does not exist in network.")
+
+        copy = self.__duplicate_with_ids(fact)
+        copy.id = fact.id
+        self.facts[fact.id] = fact
+
+        memory = (self.pending if self.pending is not None
+                  else self.working_memory)
+        # wmes are equal when their values are, 1, True and 1.0 included, so
+        # the type of the value is compared too
+        new_wmes = {(wme, type(wme.value)): wme for wme in copy.wmes}
+        old_wmes = {(wme, type(wme.value)): wme
+                    for wme in memory.by_identifier(fact.id)}
+
+        with self.propagation():
+            for key, wme in old_wmes.items():
+                if key not in new_wmes:
+                    self.remove_wme(wme)
+            for key, wme in new_wmes.items():
+                if key not in old_wmes:
+                    self.add_wme(wme)
 
     def remove_wme_by_fact_id(self, identifier: str) -> None:
-        to_remove = [wme for wme in self.working_memory if wme.identifier ==
-                     identifier]
+        memory = (self.pending if self.pending is not None
+                  else self.working_memory)
+        to_remove = list(memory.by_identifier(identifier))
         for wme in to_remove:
             self.remove_wme(wme)
 
@@ -229,32 +464,38 @@ class ReteNetwork:
         for pnode in self.pnodes:
             if pnode.new:
                 t = pnode.pop_new_token()
-                return Match(pnode, t)
+                return pnode.matches[t]
         return None
 
     @property
     def new_matches(self) -> Generator[Match, None, None]:
         for pnode in self.pnodes:
             for t in pnode.new:
-                yield Match(pnode, t)
+                yield pnode.matches[t]
 
     @property
     def matches(self) -> Generator[Match, None, None]:
         for pnode in self.pnodes:
-            for t in pnode.activations:
-                yield Match(pnode, t)
+            yield from pnode.matches.values()
 
     @property
-    def wmes(self) -> Set[WME]:
+    def wmes(self) -> WorkingMemory:
         return self.working_memory
 
     @property
     def now(self) -> float:
-        return datetime.timestamp(datetime.now())
+        """
+        Monotonic time in seconds, used for production timeouts.
+        """
+        return monotonic()
 
-    def add_production(self, prod: Production) -> None:
+    def add_production(self, prod: Production,
+                       agenda: Optional[Agenda] = None) -> None:
         """
-        Adds a production to the ReteNetwork.
+        Adds a production to the ReteNetwork. Its matches go to the agenda of
+        the network, or to the given agenda, which can be any object with the
+        add and remove methods of `Agenda` (e.g., a trigger that is notified
+        of the matches instead of firing them).
         """
         if prod.id is not None:
             raise ValueError("Production already has an id, cannot add")
@@ -268,11 +509,18 @@ class ReteNetwork:
         for conds in prod.get_rete_conds():
             current_node = self.build_or_share_network_for_conditions(
                 self.beta_root, conds, [])
-            p_node = self.build_or_share_p(current_node, prod)
+            p_node = self.build_or_share_p(current_node, prod, len(conds),
+                                           agenda)
 
             self.pnodes.append(p_node)
             prod.p_nodes.append(p_node)
 
+        try:
+            prod.compile()
+        except ValueError:
+            self.remove_production(prod)
+            raise
+
     def remove_production(self, prod: Production) -> None:
         """
         Removes a pnode from the network
@@ -289,11 +537,9 @@ class ReteNetwork:
 
         prod.id = None
         prod.p_nodes = []
+        prod._calls = {}
 
     def add_wme(self, wme: WME) -> None:
-        if wme in self.working_memory:
-            return
-
         if (wme.identifier == '#*#' or
                 wme.attribute == '#*#' or
                 wme.value == '#*#'):
@@ -301,23 +547,35 @@ class ReteNetwork:
                              "the wild card match symbol used internally by "
                              "py_rete.")
 
-        keys = product([wme.identifier, '#*#'],
-                       [wme.attribute, '#*#'],
-                       [wme.value, '#*#'])
+        if self.pending is not None:
+            self.pending.add(wme)
+            return
+
+        if wme in self.working_memory:
+            return
+
+        self.timetag_counter += 1
+        wme.timetag = self.timetag_counter
 
-        for key in keys:
-            if key in self.alpha_hash:
-                self.alpha_hash[key].activation(wme)
+        alpha_hash = self.alpha_hash
+        for key in self.alpha_keys(wme):
+            amem = alpha_hash.get(key)
+            if amem is not None:
+                amem.activation(wme)
 
         self.working_memory.add(wme)
 
     def remove_wme(self, wme: WME) -> None:
-        for stored_wme in self.working_memory:
-            if wme == stored_wme:
-                wme = stored_wme
+        if self.pending is not None:
+            self.pending.remove(wme)
+            return
+
+        stored_wme = self.working_memory.get(wme)
+        if stored_wme is not None:
+            wme = stored_wme
 
         for am in wme.amems:
-            am.items.remove(wme)
+            am.remove(wme)
             if not am.items:
                 for node in am.successors:
                     if (isinstance(node, JoinNode) and
@@ -325,7 +583,7 @@ class ReteNetwork:
                         node.parent.children.remove(node)
 
         while wme.tokens:
-            wme.tokens[0].delete_token_and_descendents()
+            wme.tokens.first().delete_token_and_descendents()
 
         for jr in wme.negative_join_results:
             jr.owner.join_results.remove(jr)
@@ -336,6 +594,24 @@ class ReteNetwork:
 
         self.working_memory.remove(wme)
 
+    def candidate_wmes(self, key: Tuple[Hashable, Hashable, Hashable]
+                       ) -> Iterable[WME]:
+        """
+        Returns the wmes of working memory that can belong to the alpha
+        memory with the given key, found with the narrowest index of working
+        memory for the constant fields of the key: attribute and value,
+        identifier or attribute. Only a key of wildcards needs every wme.
+        """
+        identifier, attribute, value = key
+        memory = self.working_memory
+        if attribute != '#*#' and value != '#*#':
+            return memory.by_attribute_value(attribute, value)
+        if identifier != '#*#':
+            return memory.by_identifier(identifier)
+        if attribute != '#*#':
+            return memory.by_attribute(attribute)
+        return memory
+
     def build_or_share_alpha_memory(self, condition):
         """
         :type condition: Condition
@@ -366,8 +642,9 @@ class ReteNetwork:
 
         self.alpha_hash[key] = AlphaMemory()
         self.alpha_hash[key].key = key
+        self.update_alpha_masks(key, 1)
 
-        for w in self.working_memory:
+        for w in self.candidate_wmes(key):
             if condition.test(w):
                 self.alpha_hash[key].activation(w)
 
@@ -382,6 +659,9 @@ class ReteNetwork:
                 return child
         node = JoinNode(children=[], parent=parent, amem=amem,
                         condition=condition)
+        if self.indexing:
+            node.build_indexes()
+        node.compile()
         parent.children.append(node)
         parent.all_children.append(node)
         amem.successors.append(node)
@@ -401,7 +681,11 @@ class ReteNetwork:
             if (isinstance(child, NegativeNode) and child.amem == amem and
                     child.condition == condition):
                 return child
-        node = NegativeNode(parent=parent, amem=amem, condition=condition)
+        node = NegativeNode(parent=parent, amem=amem, condition=condition,
+                            token_factory=self.token_factory)
+        if self.indexing:
+            node.build_indexes()
+        node.compile()
         parent.children.append(node)
         amem.successors.append(node)
 
@@ -418,13 +702,18 @@ class ReteNetwork:
             # if isinstance(child, BetaMemory):  # Don't include subclasses
             if type(child) == BetaMemory:
                 return child
-        node = BetaMemory(parent=parent)
+        node = BetaMemory(parent=parent, token_factory=self.token_factory)
         parent.children.append(node)
         self.update_new_node_with_matches_from_above(node)
         return node
 
-    def build_or_share_p(self, parent: ReteNode, prod: Production) -> PNode:
-        node = PNode(production=prod, parent=parent)
+    def build_or_share_p(self, parent: ReteNode, prod: Production,
+                         specificity: int = 0,
+                         agenda: Optional[Agenda] = None) -> PNode:
+        if agenda is None:
+            agenda = self.agenda
+        node = PNode(production=prod, parent=parent, agenda=agenda,
+                     specificity=specificity, token_factory=self.token_factory)
         parent.children.append(node)
         self.update_new_node_with_matches_from_above(node)
         return node
@@ -440,9 +729,10 @@ class ReteNetwork:
                 return child
 
         ncc_partner = NccPartnerNode(parent=bottom_of_subnetwork)
-        ncc_node = NccNode(partner=ncc_partner, children=[], parent=parent)
+        ncc_node = NccNode(partner=ncc_partner, children=[], parent=parent,
+                           token_factory=self.token_factory)
         ncc_partner.ncc_node = ncc_node
-        parent.children.insert(0, ncc_node)
+        parent.children.insert_first(ncc_node)
         bottom_of_subnetwork.children.append(ncc_partner)
         ncc_partner.number_of_conditions = ncc.number_of_conditions
         self.update_new_node_with_matches_from_above(ncc_node)
@@ -500,15 +790,26 @@ class ReteNetwork:
                                                 ) -> None:
         parent = new_node.parent
         if parent == self.beta_root:
-            new_node.left_activation(None, None, {})
+            new_node.left_activation(None, None, EMPTY_BINDING)
         elif (isinstance(parent, BetaMemory) and
               not isinstance(parent, (NccNode, NegativeNode))):
             for tok in parent.items:
                 new_node.left_activation(token=tok)
         elif (isinstance(parent, JoinNode) and
               not isinstance(parent, NegativeNode)):
+            if (parent.left_index is not None and
+                    len(parent.left_memory.items) < len(parent.amem.items)):
+                # join the few tokens through the index of the alpha memory
+                # rather than every wme through the index of the tokens
+                for tok in parent.left_memory.items:
+                    for wme in parent.right_index.get(
+                            parent.left_index.key(tok)):
+                        if parent.perform_join_test(tok, wme):
+                            new_node.left_activation(
+                                tok, wme, parent.make_binding(tok, wme))
+                return
             saved_list_of_children = parent.children
-            parent.children = [new_node]
+            parent.children = LinkedSet([new_node])
             for item in parent.amem.items:
                 parent.right_activation(item, new_node=True)
             parent.children = saved_list_of_children
@@ -522,12 +823,145 @@ class ReteNetwork:
                     new_node.left_activation(token, None, token.binding)
         elif isinstance(parent, (BindNode, FilterNode)):
             saved_list_of_children = parent.children
-            parent.children = [new_node]
+            parent.children = LinkedSet([new_node])
             self.update_new_node_with_matches_from_above(parent)
             parent.children = saved_list_of_children
 
+    def beta_nodes(self) -> List[Union[ReteNode, NccPartnerNode]]:
+        """
+        Returns the nodes of the beta network, unlinked join nodes included,
+        ordered so that each node comes after its parent, ncc partners come
+        after their ncc node and the children of an ncc node after its
+        partner.
+        """
+        order = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            seen.add(node)
+            if node.parent is not None:
+                visit(node.parent)
+                if isinstance(node.parent, NccNode):
+                    visit(node.parent.partner)
+            if isinstance(node, NccPartnerNode):
+                visit(node.ncc_node)
+            order.append(node)
+
+        stack = [self.beta_root]
+        while stack:
+            node = stack.pop()
+            visit(node)
+            if type(node) == BetaMemory:
+                stack.extend(node.all_children)
+            elif isinstance(node, ReteNode):
+                stack.extend(node.children)
+        return order[1:]
+
+    def load_wmes(self, wmes: Iterable[WME]) -> None:
+        """
+        Adds wmes to an empty working memory in bulk. The alpha memories are
+        filled without right activations, then the tokens of the beta network
+        are deleted and every memory is seeded again from its parent in one
+        pass, with the children detached so nothing is propagated twice.
+        Finally join and negative nodes are linked or unlinked according to
+        the new contents of their memories.
+        """
+        if self.working_memory:
+            raise ValueError("Working memory must be empty to load wmes.")
+
+        with self.propagation():
+            self.__load_wmes(wmes)
+
+    def __load_wmes(self, wmes: Iterable[WME]) -> None:
+        nodes = self.beta_nodes()
+        saved_children = {}
+        for node in nodes:
+            if isinstance(node, ReteNode):
+                saved_children[node] = node.children
+                node.children = LinkedSet()
+
+        for node in nodes:
+            if isinstance(node, BetaMemory):
+                while node.items:
+                    node.items.first().delete_token_and_descendents()
+
+        for wme in wmes:
+            self.timetag_counter += 1
+            wme.timetag = self.timetag_counter
+            for key in self.alpha_keys(wme):
+                amem = self.alpha_hash.get(key)
+                if amem is not None:
+                    amem.add(wme)
+            self.working_memory.add(wme)
+
+        for node in nodes:
+            if isinstance(node, (BetaMemory, NccPartnerNode)):
+                self.update_new_node_with_matches_from_above(node)
+
+        for node, children in saved_children.items():
+            node.children = children
+        for amem in self.alpha_hash.values():
+            amem.successors = LinkedSet()
+        for node in nodes:
+            if type(node) == BetaMemory:
+                node.children = LinkedSet(
+                    child for child in node.all_children
+                    if child.amem.items or not node.items)
+            elif isinstance(node, NegativeNode):
+                if node.items:
+                    node.relink_to_alpha_memory()
+            elif isinstance(node, JoinNode) and node.parent.items:
+                node.relink_to_alpha_memory()
+
+    def snapshot(self, path: str) -> None:
+        """
+        Writes the state of the network to a file: the facts, the wmes and
+        the alpha memories they are in, the tokens of the beta network with
+        their bindings, the agenda and the execution timestamps. Productions
+        are not written, they are code.
+        """
+        write_snapshot(self, path)
+
+    def restore(self, path: str) -> None:
+        """
+        Restores the state written by `snapshot`, e.g., after a restart. The
+        network must have no facts and be built from the same productions,
+        added in the same order. The file is memory-mapped and the tokens are
+        linked back as they were, nothing is matched again and no filter or
+        bind function is called. Cooldowns and execution timestamps carry
+        on, counting the time between the snapshot and the restore. The
+        matches of productions with an agenda of their own (e.g., a
+        `FactTrigger`) are restored without being handed to it again.
+
+        The facts and bound values are pickled in the snapshot, so restoring
+        one can run arbitrary code: only restore snapshots from a trusted
+        source, e.g., written by this application.
+        """
+        read_snapshot(self, path)
+
     def delete_alpha_memory(self, amem: AlphaMemory):
         del self.alpha_hash[amem.key]
+        self.update_alpha_masks(amem.key, -1)
+
+    def update_alpha_masks(self, key: Tuple[Hashable, Hashable, Hashable],
+                           delta: int) -> None:
+        """
+        Counts an alpha memory with the given key in or out of the mask of
+        its constant fields. When a mask comes into use or goes out of use,
+        the function giving the alpha keys of a wme is compiled again, so a
+        wme is only looked up under the masks of existing alpha memories.
+        """
+        mask = tuple(test != '#*#' for test in key)
+        previous = self.alpha_masks.get(mask, 0)
+        count = previous + delta
+        if count:
+            self.alpha_masks[mask] = count
+        else:
+            del self.alpha_masks[mask]
+        if not previous or not count:
+            self.alpha_keys = compile_alpha_keys(self.alpha_masks)
 
     def delete_node_and_any_unused_ancestors(self, node: ReteNode):
         if isinstance(node, NccNode):
@@ -535,11 +969,11 @@ class ReteNetwork:
 
         if isinstance(node, BetaMemory):
             while node.items:
-                node.items[0].delete_token_and_descendents()
+                node.items.first().delete_token_and_descendents()
 
         if isinstance(node, NccPartnerNode):
             while node.new_result_buffer:
-                node.new_result_buffer[0].delete_token_and_descendents()
+                node.new_result_buffer.first().delete_token_and_descendents()
 
         if isinstance(node, JoinNode) and not isinstance(node, NegativeNode):
             if not node.right_unlinked:
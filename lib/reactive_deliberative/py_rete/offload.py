@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+from copy import deepcopy
+from contextlib import contextmanager
+from importlib import import_module
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.fact import Fact
+from reactive_deliberative.py_rete.production import Production
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Executor
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import Generator
+    from typing import Iterable
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import WME
+    from reactive_deliberative.py_rete.network import ReteNetwork
+
+
+class Changes:
+    """
+    Stands for a network in a production function that runs outside the
+    event loop: the changes to facts and wmes are recorded instead of being
+    made, and `apply` makes them later in one transaction, on the loop. The
+    state of the network cannot be read through it, the network is changed
+    by the loop while the function runs.
+
+    A fact added through it only gets its id when the changes are applied.
+    A fact updated or removed through it can be a copy of the fact of the
+    network with the same id (e.g., made in another process), the fact of
+    the network is then updated or removed. Facts nested in the facts added
+    or updated are mapped back the same way, by id, so the facts of the
+    network keep referring to the facts of the network; a change to a
+    nested fact is only made if the nested fact is updated itself.
+    """
+
+    def __init__(self, network: Optional[ReteNetwork] = None) -> None:
+        self.network = network
+        self.log: List[Tuple[str, Any]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        raise AttributeError("{} of the network cannot be read outside the "
+                             "event loop, only changes can be made"
+                             .format(name))
+
+    def __len__(self) -> int:
+        return len(self.log)
+
+    def add_fact(self, fact: Fact) -> None:
+        self.log.append(('add_fact', fact))
+
+    def add_facts(self, facts: Iterable[Fact]) -> None:
+        for fact in facts:
+            self.log.append(('add_fact', fact))
+
+    def update_fact(self, fact: Fact) -> None:
+        self.log.append(('update_fact', fact))
+
+    def remove_fact(self, fact: Fact) -> None:
+        self.log.append(('remove_fact', fact))
+
+    def add_wme(self, wme: WME) -> None:
+        self.log.append(('add_wme', wme))
+
+    def remove_wme(self, wme: WME) -> None:
+        self.log.append(('remove_wme', wme))
+
+    @contextmanager
+    def transaction(self) -> Generator[Changes, None, None]:
+        # the changes are applied in one transaction anyway
+        yield self
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Returns the fact of the network with the id of value if value is a
+        fact, value otherwise.
+        """
+        if isinstance(value, Fact) and value.id is not None:
+            return self.network.facts.get(value.id, value)
+        return value
+
+    def apply(self) -> None:
+        network = self.network
+        resolve = self.resolve
+        with network.transaction():
+            for method, arg in self.log:
+                if method in ('add_fact', 'update_fact'):
+                    contents = {key: resolve(value)
+                                for key, value in arg.items()}
+                    if method == 'update_fact':
+                        arg = resolve(arg)
+                    arg.clear()
+                    arg.update(contents)
+                elif method == 'remove_fact':
+                    arg = resolve(arg)
+                getattr(network, method)(arg)
+        self.log = []
+
+
+class FunctionRef:
+    """
+    A picklable reference to a module level function, looked up by name in
+    the process it is sent to. The decorator of a production replaces the
+    function in its module, so the function the production wraps is used.
+    """
+
+    def __init__(self, func: Callable) -> None:
+        if '<locals>' in func.__qualname__:
+            raise ValueError("{} is not defined at the top level of a module"
+                             .format(func.__qualname__))
+        self.module = func.__module__
+        self.qualname = func.__qualname__
+
+    def resolve(self, unwrap: bool = True) -> Callable:
+        obj = import_module(self.module)
+        for name in self.qualname.split('.'):
+            obj = getattr(obj, name)
+        if unwrap and isinstance(obj, Production):
+            return obj.__wrapped__
+        return obj
+
+
+def call_in_process(ref: FunctionRef, kwargs: Dict[str, Any]
+                    ) -> Tuple[Any, List[Tuple[str, Any]]]:
+    """
+    Calls the function of a production in a worker process and returns its
+    result and the changes it made through `net`.
+    """
+    changes = None
+    if 'net' in kwargs:
+        changes = kwargs['net'] = Changes()
+    result = ref.resolve()(**kwargs)
+    return result, changes.log if changes is not None else []
+
+
+class Offloader:
+    """
+    Calls the functions of blocking productions (see `Production`) in an
+    executor, a thread pool, so they do not stop the event loop. The
+    arguments are read from the match on the loop, the facts among them are
+    copied (facts shared by several arguments stay shared), `net` is passed
+    as `Changes`, and the changes are applied back on the loop once the
+    function returns. They are dropped if it raises.
+
+    executor defaults to the default executor of the loop, or to the one
+    make_executor returns when it is first needed, if set (e.g., to create a
+    pool only once a blocking production fires). The number of calls
+    waiting for a thread (`queued`, and the most there were, `max_queued`)
+    and being run (`running`) are kept, and the stats record the time calls
+    waited for a thread ('offload_wait').
+
+    The functions of process productions, CPU bound ones, are sent to the
+    processes executor, a process pool, instead. They must be defined at
+    the top level of a module, and get copies of the facts of the match,
+    the wmes as (identifier, attribute, value) tuples and a `Changes`
+    without a network as `net`. If there is no processes executor, the one
+    make_processes returns is used once it is first needed. The changes
+    they return are applied in one transaction. The number of calls sent to
+    processes and not back yet is kept (`in_processes`) and the stats record
+    the time calls took ('process_call').
+    """
+
+    def __init__(self, network: ReteNetwork,
+                 executor: Optional[Executor] = None,
+                 processes: Optional[Executor] = None) -> None:
+        self.network = network
+        self.executor = executor
+        self.processes = processes
+        self.make_executor: Optional[Callable[[], Executor]] = None
+        self.make_processes: Optional[Callable[[], Executor]] = None
+        self.lock = Lock()
+        self.queued = 0
+        self.max_queued = 0
+        self.running = 0
+        self.in_processes = 0
+
+    async def call(self, func: Callable, kwargs: Dict[str, Any],
+                   process: bool = False) -> Any:
+        if process:
+            return await self.call_in_process(func, kwargs)
+
+        memo: Dict[int, Any] = {}
+        for name, value in kwargs.items():
+            if isinstance(value, Fact):
+                kwargs[name] = deepcopy(value, memo)
+        changes = None
+        if 'net' in kwargs:
+            changes = kwargs['net'] = Changes(self.network)
+
+        # whether the call started, or was cancelled before it could
+        state = {'started': False, 'cancelled': False}
+
+        def run():
+            started = monotonic()
+            with self.lock:
+                if state['cancelled']:
+                    return started, None
+                state['started'] = True
+                self.queued -= 1
+                self.running += 1
+            try:
+                return started, func(**kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        with self.lock:
+            self.queued += 1
+            if self.queued > self.max_queued:
+                self.max_queued = self.queued
+        submitted = monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            if self.executor is None and self.make_executor is not None:
+                self.executor = self.make_executor()
+            started, result = await loop.run_in_executor(self.executor, run)
+        except asyncio.CancelledError:
+            with self.lock:
+                if not state['started']:
+                    state['cancelled'] = True
+                    self.queued -= 1
+            raise
+        self.network.stats.record('offload_wait', started - submitted)
+        if changes is not None:
+            changes.apply()
+        return result
+
+    async def call_in_process(self, func: Callable, kwargs: Dict[str, Any]
+                              ) -> Any:
+        if self.processes is None and self.make_processes is not None:
+            self.processes = self.make_processes()
+        if self.processes is None:
+            raise ValueError("No process pool, set the processes executor "
+                             "of the offloader.")
+        if 'net' in kwargs:
+            kwargs['net'] = None
+        if 'wmes' in kwargs:
+            kwargs['wmes'] = tuple(
+                None if wme is None else
+                (wme.identifier, wme.attribute, wme.value)
+                for wme in kwargs['wmes'])
+
+        submitted = monotonic()
+        self.in_processes += 1
+        loop = asyncio.get_running_loop()
+        try:
+            result, log = await loop.run_in_executor(
+                self.processes, call_in_process, FunctionRef(func), kwargs)
+        finally:
+            self.in_processes -= 1
+        self.network.stats.record('process_call', monotonic() - submitted)
+        if log:
+            changes = Changes(self.network)
+            changes.log = log
+            changes.apply()
+        return result
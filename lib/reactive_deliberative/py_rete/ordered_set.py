@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Iterable
+    from typing import Iterator
+    from typing import Optional
+
+
+class OrderedSet(dict):
+    """
+    An insertion-ordered set with constant time append, removal and pop. It is
+    used for the memories of the network (alpha and beta memory items, tokens
+    of a wme, children of a token, new matches of a pnode), where items are
+    added and removed constantly. Items are stored as the keys of the dict.
+    """
+
+    def __init__(self, items: Iterable[Any] = ()) -> None:
+        super().__init__()
+        for item in items:
+            self[item] = None
+
+    def append(self, item: Any) -> None:
+        """
+        Adds the item at the end, does nothing if it is already in the set.
+        """
+        self[item] = None
+
+    def remove(self, item: Any) -> None:
+        """
+        Removes the item, raises a KeyError if it is not in the set.
+        """
+        del self[item]
+
+    def discard(self, item: Any) -> None:
+        """
+        Removes the item if it is in the set.
+        """
+        self.pop(item, None)
+
+    def first(self) -> Any:
+        """
+        Returns the oldest item, raises an IndexError if the set is empty.
+        """
+        for item in self:
+            return item
+        raise IndexError("first from an empty OrderedSet")
+
+    def pop_last(self) -> Any:
+        """
+        Removes and returns the newest item.
+        """
+        return self.popitem()[0]
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, list(self))
+
+
+class LinkedSet:
+    """
+    An ordered set backed by a doubly linked list. Besides constant time
+    append and removal, it supports inserting an item first or right after
+    another item in constant time, which the successors of alpha memories and
+    the children of beta nodes need to keep the activation order that right
+    and left unlinking rely on.
+
+    Iterating (in either direction) tolerates the removal of the current item
+    and visits items appended during the iteration, like iterating a list.
+    """
+    __slots__ = ['_root', '_links']
+
+    def __init__(self, items: Iterable[Any] = ()) -> None:
+        # A link is [prev, next, item], the root link is a sentinel.
+        self._root: list = []
+        self._root[:] = [self._root, self._root, None]
+        self._links = {}
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def __bool__(self) -> bool:
+        return bool(self._links)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._links
+
+    def __iter__(self) -> Iterator[Any]:
+        root = self._root
+        link = root[1]
+        while link is not root:
+            yield link[2]
+            link = link[1]
+
+    def __reversed__(self) -> Iterator[Any]:
+        root = self._root
+        link = root[0]
+        while link is not root:
+            yield link[2]
+            link = link[0]
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, list(self))
+
+    def _link_after(self, prev: list, item: Any) -> None:
+        if item in self._links:
+            return
+        nxt = prev[1]
+        link = [prev, nxt, item]
+        prev[1] = link
+        nxt[0] = link
+        self._links[item] = link
+
+    def append(self, item: Any) -> None:
+        """
+        Adds the item at the end, does nothing if it is already in the set.
+        """
+        self._link_after(self._root[0], item)
+
+    def insert_first(self, item: Any) -> None:
+        """
+        Adds the item at the beginning, does nothing if it is already in the
+        set.
+        """
+        self._link_after(self._root, item)
+
+    def insert_after(self, anchor: Optional[Any], item: Any) -> None:
+        """
+        Adds the item right after anchor, or at the beginning if anchor is not
+        in the set. Does nothing if the item is already in the set.
+        """
+        link = self._links.get(anchor)
+        self._link_after(self._root if link is None else link, item)
+
+    def remove(self, item: Any) -> None:
+        """
+        Removes the item, raises a KeyError if it is not in the set. The
+        removed link keeps its pointers so an iteration standing on it can
+        move on.
+        """
+        prev, nxt, _ = self._links.pop(item)
+        prev[1] = nxt
+        nxt[0] = prev
+
+    def first(self) -> Any:
+        """
+        Returns the first item, raises an IndexError if the set is empty.
+        """
+        if not self._links:
+            raise IndexError("first from an empty LinkedSet")
+        return self._root[1][2]
@@ -3,39 +3,59 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from reactive_deliberative.py_rete.beta import BetaMemory
-from reactive_deliberative.py_rete.common import Token
+from reactive_deliberative.py_rete.common import Match
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
 from reactive_deliberative.py_rete.production import Production
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import List
     from typing import Dict
-    from typing import Any
+    from typing import Optional
+    from reactive_deliberative.py_rete.agenda import Agenda
+    from reactive_deliberative.py_rete.common import Binding
+    from reactive_deliberative.py_rete.common import Token
     from reactive_deliberative.py_rete.common import WME
-    from reactive_deliberative.py_rete.common import V
 
 
 class PNode(BetaMemory):
     """
-    A beta network node that stores the matches for productions.
+    A beta network node that stores the matches for productions. Each token
+    gets a Match that is kept in `matches` and on the agenda of the network
+    until the token is deleted. The specificity (number of conditions) is
+    used by conflict resolution strategies.
     """
 
-    def __init__(self, production: Production, **kwargs):
+    def __init__(self, production: Production,
+                 agenda: Optional[Agenda] = None, specificity: int = 0,
+                 **kwargs):
         super(PNode, self).__init__(**kwargs)
         self.production = production
-        self.new: List[Token] = []
+        self.agenda = agenda
+        self.specificity = specificity
+        self.new: OrderedSet = OrderedSet()
+        self.matches: Dict[Token, Match] = {}
 
-    def left_activation(self, token: Token, wme: WME, binding: Dict[V, Any]):
-        new_token = Token(token, wme, node=self, binding=binding)
-        self.items.append(new_token)
+    def left_activation(self, token: Token, wme: WME, binding: Binding):
+        new_token = self.token_factory.token(token, wme, self, binding)
+        self.add(new_token)
         self.new.append(new_token)
+        match = self.matches[new_token] = Match(self, new_token)
+        if self.agenda is not None:
+            self.agenda.add(match)
+
+    def remove(self, token: Token) -> None:
+        super().remove(token)
+        self.new.discard(token)
+        match = self.matches.pop(token)
+        if self.agenda is not None:
+            self.agenda.remove(match)
 
     def pop_new_token(self):
         if self.new:
-            return self.new.pop()
+            return self.new.pop_last()
 
     def new_activations(self):
         while self.new:
-            t = self.new.pop()
+            t = self.new.pop_last()
             yield t
 
     @property
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.stats import Stats
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import AsyncGenerator
+    from typing import Deque
+    from typing import Optional
+    from typing import Set
+
+
+class Preemption:
+    """
+    Lets a task take the lock under which rules fire at the next preemption
+    point, instead of cancelling the task that fires them and leaving facts
+    half updated.
+
+    The task that fires rules holds the lock with `hold`. `ReteNetwork.run`
+    returns early, and `Scheduler.start` starts nothing, while a preemption
+    is requested, and the lock is released between firings, so those are
+    preemption points. A firing that takes long can add its own with
+    `checkpoint` (e.g., between the batches of `ReteNetwork.load_facts`).
+    `preempt` waits ahead of the tasks waiting in `hold`: when the lock is
+    given up, it is handed to the preempting tasks first, in the order they
+    asked, and it is only released once none is waiting. A holder that gave
+    the lock up at a checkpoint gets it back before the other tasks waiting
+    in `hold`, so they never see a firing half done. The time it waited
+    is recorded in the stats as 'preemption_latency' (see
+    `Stats.histograms`). The lock must only be taken through this object.
+    """
+
+    def __init__(self, lock: Optional[asyncio.Lock] = None,
+                 stats: Optional[Stats] = None) -> None:
+        self.lock = lock if lock is not None else asyncio.Lock()
+        self.stats = stats if stats is not None else Stats()
+        self.holder: Optional[asyncio.Task] = None
+        self.waiting = 0
+        self.preempting = 0
+        self.preemptors: Set[asyncio.Task] = set()
+        # the futures of the tasks waiting to be handed the lock
+        self.preempt_queue: Deque[asyncio.Future] = deque()
+        self.hold_queue: Deque[asyncio.Future] = deque()
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+
+    @property
+    def requested(self) -> bool:
+        return self.waiting > 0
+
+    async def acquire(self, preempting: bool = False) -> None:
+        """
+        Takes the lock if it is free and nobody waits for it, or waits to be
+        handed it (see `release`).
+        """
+        if (not self.lock.locked() and not self.preempt_queue
+                and not self.hold_queue):
+            await self.lock.acquire()
+            return
+        queue = self.preempt_queue if preempting else self.hold_queue
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        await self.__handed(future, queue)
+
+    async def __handed(self, future: asyncio.Future,
+                       queue: Deque[asyncio.Future]) -> None:
+        """
+        Waits until future, queued in queue, is handed the lock.
+        """
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                queue.remove(future)
+            else:
+                # handed the lock just before being cancelled
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """
+        Hands the lock, still locked, to the first preempting task waiting
+        for it, or else to the first task waiting in `hold`, or else
+        releases it.
+        """
+        for queue in (self.preempt_queue, self.hold_queue):
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.lock.release()
+
+    @asynccontextmanager
+    async def hold(self) -> AsyncGenerator[None, None]:
+        """
+        Holds the lock to fire rules, giving it up at the checkpoints of the
+        current task while a preemption is requested. A preempting task
+        already holds it.
+        """
+        if asyncio.current_task() in self.preemptors:
+            yield
+            return
+        await self.acquire()
+        task = self.holder = asyncio.current_task()
+        try:
+            yield
+        finally:
+            # a checkpoint cancelled while waiting to get the lock back
+            # leaves it to others
+            if self.holder is task:
+                self.holder = None
+                self.release()
+
+    @asynccontextmanager
+    async def preempt(self) -> AsyncGenerator[None, None]:
+        """
+        Holds the lock, taken from the task firing rules at its next
+        preemption point.
+        """
+        start = monotonic()
+        self.waiting += 1
+        try:
+            await self.acquire(preempting=True)
+        finally:
+            self.waiting -= 1
+        self.stats.record('preemption_latency', monotonic() - start)
+        task = asyncio.current_task()
+        self.preemptors.add(task)
+        self.preempting += 1
+        self.resumed.clear()
+        try:
+            yield
+        finally:
+            self.preemptors.discard(task)
+            self.preempting -= 1
+            if not self.preempting:
+                self.resumed.set()
+            self.release()
+
+    async def checkpoint(self) -> None:
+        """
+        A preemption point. If a preemption is requested, the task holding
+        the lock gives it to the preempting tasks and waits to get it back
+        ahead of the tasks waiting in `hold`;
+        other tasks, e.g., the concurrent firings of a `Scheduler`, wait
+        until no task is preempting. It always yields to the event loop first,
+        so the tasks that want to preempt get to ask.
+        """
+        await asyncio.sleep(0)
+        if not self.waiting and not self.preempting:
+            return
+        task = asyncio.current_task()
+        if self.holder is task and self.waiting:
+            self.holder = None
+            # queued before the lock is given up, so it comes back here
+            # once the preempting tasks are done, or at once if none is
+            # left
+            future = asyncio.get_running_loop().create_future()
+            self.hold_queue.appendleft(future)
+            self.release()
+            await self.__handed(future, self.hold_queue)
+            self.holder = task
+        elif self.holder is not task:
+            await self.resumed.wait()
@@ -5,6 +5,7 @@ from functools import update_wrapper
 from itertools import product
 from typing import TYPE_CHECKING
 
+from reactive_deliberative.py_rete.codegen import compile_call
 from reactive_deliberative.py_rete.common import Token
 from reactive_deliberative.py_rete.common import V
 from reactive_deliberative.py_rete.conditions import AND
@@ -20,10 +21,18 @@ from reactive_deliberative.py_rete.conditions import OR
 from reactive_deliberative.py_rete.fact import Fact
 
 if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Dict
+    from typing import FrozenSet
+    from typing import Hashable
+    from typing import Iterable
     from typing import Optional
+    from typing import Tuple
     from typing import Callable
     from typing import List
     from typing import Union
+    from reactive_deliberative.py_rete.common import BindingLayout
+    from reactive_deliberative.py_rete.common import Match
     from reactive_deliberative.py_rete.pnode import PNode
 
 
@@ -94,20 +103,56 @@ class Production():
     """
     A production rule in py_rete. It is comprised of conditions and a function
     to execute once all conditions are bound.
+
+    Whether the function is a coroutine is checked once when it is decorated,
+    and the call with its arguments read from the slots of a binding is
+    compiled once per binding layout of its pnodes when the production is
+    added to a network (see `compile`). Besides the variables and `net`, the
+    function can take a `wmes` argument, the tuple of the wmes of the match;
+    the pattern then cannot bind a variable named wmes.
+
+    writes declares the attributes the function changes on the facts of its
+    match. It is used to fire matches concurrently (see `Scheduler`): two
+    matches whose write sets overlap never fire at the same time. Without
+    it, a match is assumed to write all the attributes of its facts. A
+    function that also changes facts outside its match (e.g., found through
+    `net.facts`) must declare them: writes is then a function of the match
+    that returns all the (fact id, attribute) pairs it may change, the
+    attribute None standing for the whole fact. Changes to facts that are
+    not declared are not protected.
+
+    The function of a blocking production (e.g., one that does file or
+    database I/O) runs in a thread of the executor of the network instead of
+    the event loop (see `Offloader`), on copies of the facts of its match.
+    It gets a `Changes` as `net`, its changes are applied when it returns.
+    The function of a process production, a CPU bound one, runs in a worker
+    process instead.
     """
     conditions: Union[ConditionalElement, ConditionalList]
 
     def __init__(self,
                  pattern: Optional[Union[ConditionalElement, ConditionalList]] = None,
                  priority: int = 1,
-                 timeout: float = 0):
+                 timeout: float = 0,
+                 writes: Optional[Union[
+                     Iterable[Hashable],
+                     Callable[[Match], Iterable[Tuple[Hashable, Hashable]]]
+                 ]] = None,
+                 blocking: bool = False,
+                 process: bool = False):
         self.__wrapped__: Optional[Callable] = None
         self._wrapped_args: List[str] = []
+        self._is_coroutine = False
+        self._calls: Dict[BindingLayout, Callable[[Token], Any]] = {}
         self._rete_net = None
         self.pattern: Optional[Union[ConditionalElement,
                                      ConditionalList]] = pattern
         self.priority = priority
         self.timeout = timeout
+        self.writes = (writes if writes is None or callable(writes)
+                       else frozenset(writes))
+        self.blocking = blocking
+        self.process = process
         self.id: Optional[str] = None
         self.p_nodes: List[PNode] = []
 
@@ -125,18 +170,57 @@ class Production():
                 if isinstance(disjunct, tuple) else
                 list(get_rete_conds(AND(disjunct))) for disjunct in disjuncts]
 
+    def compile(self) -> None:
+        """
+        Compiles the call of the wrapped function for the network the
+        production belongs to and the layout of the bindings of each of its
+        pnodes. Raises a ValueError if the function takes a `wmes` argument
+        and the pattern binds a variable of that name.
+        """
+        self._calls = {}
+        for node in self.p_nodes:
+            self.compile_call(node.layout)
+
+    def compile_call(self, layout: BindingLayout) -> Callable[[Token], Any]:
+        if 'wmes' in self._wrapped_args and V('wmes') in layout:
+            raise ValueError("The wmes argument of {} would shadow the "
+                             "variable wmes of its pattern, rename the "
+                             "variable.".format(self.__wrapped__.__name__))
+        call = self._calls[layout] = compile_call(
+            self.__wrapped__, self._wrapped_args, self._rete_net, layout,
+            match_args=True, deferred=self.blocking or self.process)
+        return call
+
+    def write_set(self, match: Match) -> FrozenSet[Tuple[Hashable, Hashable]]:
+        """
+        The (fact id, attribute) pairs firing the match may change, the
+        attribute is None for a whole fact.
+        """
+        if callable(self.writes):
+            return frozenset(self.writes(match))
+        ids = {wme.identifier for wme in match.wmes if wme is not None}
+        if self.writes is None:
+            return frozenset((i, None) for i in ids)
+        return frozenset((i, a) for i in ids for a in self.writes)
+
     async def fire(self, token: Token):
-        kwargs = {arg: self._rete_net if arg == 'net' else
-        self._rete_net.facts[token.binding[V(arg)]] if
-        token.binding[V(arg)] in self._rete_net.facts else
-        token.binding[V(arg)] for arg in self._wrapped_args}
-        return await self.call_async(**kwargs)
+        layout = token.binding.layout
+        call = self._calls.get(layout)
+        if call is None:
+            call = self.compile_call(layout)
+        result = call(token)
+        if self.blocking or self.process:
+            return await self._rete_net.offloader.call(*result,
+                                                       process=self.process)
+        if self._is_coroutine:
+            return await result
+        return result
 
     async def call_async(self, *args, **kwargs):
         if self._wrapped_args:
             kwargs = {k: v for k, v in kwargs.items()
                       if k in self._wrapped_args}
-        if inspect.iscoroutinefunction(self.__wrapped__):
+        if self._is_coroutine:
             return await self.__wrapped__(*args, **kwargs)
         return self.__wrapped__(*args, **kwargs)
 
@@ -151,6 +235,10 @@ class Production():
                 if not any(p.kind == inspect.Parameter.VAR_KEYWORD
                            for p in signature.parameters.values()):
                     self._wrapped_args = set(signature.parameters.keys())
+                self._is_coroutine = inspect.iscoroutinefunction(func)
+                if self._is_coroutine and (self.blocking or self.process):
+                    raise ValueError("A blocking or process production cannot"
+                                     " wrap a coroutine function.")
                 return update_wrapper(self, func)
 
     def __repr__(self) -> str:
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Callable
+    from typing import Dict
+    from typing import FrozenSet
+    from typing import Hashable
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import Match
+    from reactive_deliberative.py_rete.network import ReteNetwork
+
+
+class Scheduler:
+    """
+    Fires the matches of a network concurrently, up to limit at a time, so a
+    production that awaits (e.g., on I/O) does not hold up the others.
+
+    Matches are picked the way `ReteNetwork.run` picks them, by priority and
+    strategy. A match is held off the agenda while it fires, so it is not
+    picked twice, and goes back when it is done. A match whose write set
+    (see `Production.write_set`) overlaps the write set of a running one is
+    held until a running one it overlaps is done. Held matches are dropped
+    if their tokens are deleted meanwhile, so a match invalidated by the
+    changes of the ones that ran is never fired.
+
+    Nothing is started while a preemption of the network is requested (see
+    `Preemption`), but the firings run outside the network lock: their
+    changes are made between their awaits and can interleave with engine
+    transactions, forced reactive actions and triggers, which write sets do
+    not order. A production whose changes must not interleave with forced
+    actions awaits `net.checkpoint()` first, which waits while the network
+    is preempted, and makes its changes without awaiting in between.
+
+    on_done, if set, is called when a match is done firing. The exception
+    of a failed firing is raised by the next `start`.
+    """
+
+    def __init__(self, network: ReteNetwork, limit: int = 8) -> None:
+        self.network = network
+        self.limit = limit
+        self.running: Dict[asyncio.Future, Tuple[
+            Match, FrozenSet[Tuple[Hashable, Hashable]]]] = {}
+        # The attributes being written by fact id, None for whole facts.
+        self.writing: Dict[Hashable, Counter] = {}
+        self.blocked: List[Tuple[
+            Match, FrozenSet[Tuple[Hashable, Hashable]]]] = []
+        self.errors: List[BaseException] = []
+        self.on_done: Optional[Callable[[], None]] = None
+
+    def __len__(self) -> int:
+        return len(self.running)
+
+    def conflicts(self, writes: FrozenSet[Tuple[Hashable, Hashable]]
+                  ) -> bool:
+        writing = self.writing
+        for identifier, attribute in writes:
+            attributes = writing.get(identifier)
+            if attributes and (attribute is None or attributes[attribute] or
+                               attributes[None]):
+                return True
+        return False
+
+    @staticmethod
+    def overlap(writes: FrozenSet[Tuple[Hashable, Hashable]],
+                others: FrozenSet[Tuple[Hashable, Hashable]]) -> bool:
+        """
+        Returns whether two write sets write the same attribute of a fact.
+        """
+        attributes: Dict[Hashable, set] = {}
+        for identifier, attribute in others:
+            attributes.setdefault(identifier, set()).add(attribute)
+        for identifier, attribute in writes:
+            written = attributes.get(identifier)
+            if written and (attribute is None or attribute in written or
+                            None in written):
+                return True
+        return False
+
+    def start(self, n: Optional[int] = None) -> int:
+        """
+        Starts firing the matches that can fire, at most n of them and as
+        long as there are less than limit running, and returns how many
+        were started.
+        """
+        if self.errors:
+            error = self.errors[0]
+            self.errors.clear()
+            raise error
+
+        network = self.network
+        agenda = network.agenda
+        preemption = network.preemption
+        started = 0
+        while len(self.running) < self.limit and (n is None or started < n):
+            if preemption is not None and preemption.requested:
+                break
+            now = network.now
+            agenda.wake(now)
+            match = agenda.select()
+            if match is None:
+                network.ready_since = None
+                break
+
+            writes = match.pnode.production.write_set(match)
+            agenda.hold(match)
+            if self.conflicts(writes):
+                self.blocked.append((match, writes))
+                network.stats.counts['blocked'] += 1
+                continue
+
+            network.begin_firing(match, now)
+            for identifier, attribute in writes:
+                self.writing.setdefault(identifier, Counter())[attribute] += 1
+            task = asyncio.ensure_future(match.fire())
+            self.running[task] = (match, writes)
+            task.add_done_callback(self.__done)
+            started += 1
+        return started
+
+    def __done(self, task: asyncio.Future) -> None:
+        match, writes = self.running.pop(task)
+        writing = self.writing
+        for identifier, attribute in writes:
+            attributes = writing[identifier]
+            attributes[attribute] -= 1
+            if not attributes[attribute]:
+                del attributes[attribute]
+                if not attributes:
+                    del writing[identifier]
+
+        agenda = self.network.agenda
+        agenda.release(match)
+        # only the matches this firing may have blocked can start now
+        blocked = []
+        for other, other_writes in self.blocked:
+            if self.overlap(other_writes, writes):
+                agenda.release(other)
+            else:
+                blocked.append((other, other_writes))
+        self.blocked = blocked
+
+        if not task.cancelled() and task.exception() is not None:
+            self.errors.append(task.exception())
+        if self.on_done is not None:
+            self.on_done()
+
+    async def run(self, n: Optional[int] = None) -> None:
+        """
+        Fires n matches, or until none can fire if n is None, and waits for
+        them to be done.
+        """
+        while True:
+            started = self.start(n)
+            if n is not None:
+                n -= started
+            if not self.running:
+                break
+            await asyncio.wait(list(self.running),
+                               return_when=asyncio.FIRST_COMPLETED)
+
+    def cancel(self) -> None:
+        """
+        Cancels the running firings.
+        """
+        for task in list(self.running):
+            task.cancel()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import inspect
+import multiprocessing
+from copy import copy
+from itertools import groupby
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.codegen import compile_call
+from reactive_deliberative.py_rete.fact import Fact
+from reactive_deliberative.py_rete.network import ReteNetwork
+from reactive_deliberative.py_rete.offload import FunctionRef
+
+if TYPE_CHECKING:  # pragma: no cover
+    from multiprocessing.connection import Connection
+    from typing import Any
+    from typing import Callable
+    from typing import Dict
+    from typing import Hashable
+    from typing import Iterable
+    from typing import List
+    from typing import Optional
+    from typing import Tuple
+    from reactive_deliberative.py_rete.common import BindingLayout
+    from reactive_deliberative.py_rete.production import Production
+
+
+class FactRef:
+    """
+    A fact of a match sent back by a shard, by its id in the sharded
+    network.
+    """
+    __slots__ = ['id']
+
+    def __init__(self, fact_id: str) -> None:
+        self.id = fact_id
+
+    def __reduce__(self):
+        return FactRef, (self.id,)
+
+
+class Shard:
+    """
+    The network of one shard, served by `serve` in a worker process. Facts
+    are known by their ids in the sharded network (`facts`), their copies in
+    the network have ids of their own (mapped back by `global_ids`).
+    """
+
+    def __init__(self, productions: List[FunctionRef]) -> None:
+        self.network = ReteNetwork()
+        self.index: Dict[str, int] = {}
+        for i, ref in enumerate(productions):
+            production = ref.resolve(unwrap=False)
+            self.network.add_production(production)
+            self.index[production.id] = i
+        self.facts: Dict[str, Fact] = {}
+        self.global_ids: Dict[str, str] = {}
+        self.calls: Dict[Tuple[Production, BindingLayout], Callable] = {}
+        self.selected = None
+
+    def apply(self, changes: List[Tuple[str, str, Optional[Fact]]]) -> None:
+        """
+        Makes the changes, runs of adds are added with `add_facts`.
+        """
+        network = self.network
+        for method, run in groupby(changes, key=lambda change: change[0]):
+            run = list(run)
+            if method == 'add':
+                for _, fact_id, fact in run:
+                    fact.id = None
+                    self.facts[fact_id] = fact
+                network.add_facts([fact for _, _, fact in run])
+                for _, fact_id, fact in run:
+                    self.global_ids[fact.id] = fact_id
+                continue
+            for _, fact_id, snapshot in run:
+                fact = self.facts[fact_id]
+                if method == 'update':
+                    fact.clear()
+                    fact.update(snapshot)
+                    network.update_fact(fact)
+                else:
+                    del self.facts[fact_id]
+                    del self.global_ids[fact.id]
+                    network.remove_fact(fact)
+
+    def select(self) -> Optional[float]:
+        """
+        Selects the match the shard would fire and returns the priority of
+        its production, or None if no match can fire.
+        """
+        network = self.network
+        network.agenda.wake(network.now)
+        match = self.selected = network.agenda.select()
+        if match is None:
+            return None
+        return match.pnode.production.priority
+
+    def fire(self) -> Tuple[int, Dict[str, Any]]:
+        """
+        Starts firing the selected match and returns the index of its
+        production and the arguments of its function, with facts as
+        `FactRef`.
+        """
+        match, self.selected = self.selected, None
+        network = self.network
+        network.begin_firing(match, network.now)
+        production = match.pnode.production
+        layout = match.token.binding.layout
+        call = self.calls.get((production, layout))
+        if call is None:
+            call = self.calls[production, layout] = compile_call(
+                production.__wrapped__, production._wrapped_args, network,
+                layout, match_args=True, deferred=True)
+        _, kwargs = call(match.token)
+
+        global_ids = self.global_ids
+        for name, value in kwargs.items():
+            if name == 'net':
+                kwargs[name] = None
+            elif name == 'wmes':
+                kwargs[name] = tuple(
+                    None if wme is None else
+                    (global_ids.get(wme.identifier, wme.identifier),
+                     wme.attribute, wme.value)
+                    for wme in value)
+            elif isinstance(value, Fact) and value.id in global_ids:
+                kwargs[name] = FactRef(global_ids[value.id])
+        return self.index[production.id], kwargs
+
+    def size(self) -> int:
+        return len(self.network.agenda)
+
+    def seconds_until_ready(self) -> Optional[float]:
+        return self.network.seconds_until_ready()
+
+
+def serve(connection: Connection, productions: List[FunctionRef]) -> None:
+    """
+    Runs a shard in a worker process: answers each (method, args) request
+    with (True, result) or (False, exception), until it gets 'close'.
+    """
+    try:
+        shard = Shard(productions)
+    except Exception as error:
+        connection.send((False, error))
+        return
+    connection.send((True, None))
+    while True:
+        method, args = connection.recv()
+        if method == 'close':
+            break
+        try:
+            result = getattr(shard, method)(*args)
+        except Exception as error:
+            connection.send((False, error))
+        else:
+            connection.send((True, result))
+    connection.close()
+
+
+class ShardedNetwork:
+    """
+    A network whose facts are split over shards, each one a ReteNetwork in
+    a worker process, so the volume of facts and the work of matching are
+    spread over processes and cores.
+
+    partition maps a fact to a key (e.g., its instrument), a fact goes to the
+    shard given by the hash of its key. Every shard compiles the same
+    productions, so a production only matches facts of one shard: it must
+    only join facts with the same key, and facts must not contain facts.
+    There is no default partition, facts spread without a key would miss
+    the facts they join with. The productions must be defined at the top
+    level of a module, each worker imports them (see `FunctionRef`).
+
+    Changes are sent to the shards when the network is queried, all shards
+    at once. `run` asks every shard for the match it would fire, fires the
+    one of the highest priority (shards take turns on ties) and the function
+    of its production is called in this process, with the facts of this
+    network and this network as `net`. The timeout of a production only
+    keeps it off the agenda of the shard where it fired. Blocking and
+    process productions are not supported: there is no offloader, their
+    functions would run on the event loop.
+    """
+
+    def __init__(self, productions: Iterable[Production],
+                 partition: Callable[[Fact], Hashable], shards: int = 2,
+                 context: str = 'spawn') -> None:
+        self.productions = list(productions)
+        for production in self.productions:
+            if production.blocking or production.process:
+                raise ValueError("{} is a blocking or process production, "
+                                 "it cannot be sharded"
+                                 .format(production.__wrapped__.__name__))
+        self.partition = partition
+        refs = [FunctionRef(production.__wrapped__)
+                for production in self.productions]
+        mp_context = multiprocessing.get_context(context)
+        self.connections: List[Connection] = []
+        self.processes = []
+        for _ in range(shards):
+            connection, child = mp_context.Pipe()
+            process = mp_context.Process(target=serve, args=(child, refs),
+                                         daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+        for i in range(shards):
+            self.__receive(i)
+
+        self.facts: Dict[str, Fact] = {}
+        self.location: Dict[str, int] = {}
+        self.fact_counter = 0
+        self.pending: List[List[Tuple[str, str, Optional[Fact]]]] = [
+            [] for _ in range(shards)]
+        self.turn = 0
+
+    def __enter__(self) -> ShardedNetwork:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        The number of matches on the agendas of the shards.
+        """
+        return sum(self.__ask_all('size'))
+
+    def __receive(self, shard: int) -> Any:
+        ok, result = self.connections[shard].recv()
+        if not ok:
+            raise result
+        return result
+
+    def __ask(self, shard: int, method: str, *args) -> Any:
+        self.connections[shard].send((method, args))
+        return self.__receive(shard)
+
+    def __ask_all(self, method: str) -> List[Any]:
+        self.flush()
+        for connection in self.connections:
+            connection.send((method, ()))
+        return [self.__receive(i) for i in range(len(self.connections))]
+
+    def shard_of(self, fact: Fact) -> int:
+        return hash(self.partition(fact)) % len(self.connections)
+
+    def flush(self) -> None:
+        """
+        Sends the pending changes to the shards, which apply them in
+        parallel, and waits for them.
+        """
+        shards = [i for i, changes in enumerate(self.pending) if changes]
+        for i in shards:
+            self.connections[i].send(('apply', (self.pending[i],)))
+            self.pending[i] = []
+        for i in shards:
+            self.__receive(i)
+
+    def add_fact(self, fact: Fact) -> None:
+        if fact.id is not None:
+            raise ValueError("Fact already has an id, cannot add")
+        fact.id = "f-{}".format(self.fact_counter)
+        self.fact_counter += 1
+        self.facts[fact.id] = fact
+        shard = self.location[fact.id] = self.shard_of(fact)
+        self.pending[shard].append(('add', fact.id, copy(fact)))
+
+    def add_facts(self, facts: Iterable[Fact]) -> None:
+        for fact in facts:
+            self.add_fact(fact)
+        self.flush()
+
+    def update_fact(self, fact: Fact) -> None:
+        """
+        Updates a fact, it moves to another shard if its key changed.
+        """
+        if fact.id is None or fact.id not in self.facts:
+            raise ValueError("Fact has no id or does not exist in network.")
+        self.facts[fact.id] = fact
+        old = self.location[fact.id]
+        new = self.location[fact.id] = self.shard_of(fact)
+        if new == old:
+            self.pending[new].append(('update', fact.id, copy(fact)))
+        else:
+            self.pending[old].append(('remove', fact.id, None))
+            self.pending[new].append(('add', fact.id, copy(fact)))
+
+    def remove_fact(self, fact: Fact) -> None:
+        if fact.id is None or fact.id not in self.facts:
+            raise ValueError("Fact has no id or does not exist in network.")
+        del self.facts[fact.id]
+        shard = self.location.pop(fact.id)
+        self.pending[shard].append(('remove', fact.id, None))
+        fact.id = None
+
+    async def run(self, n: int = 1) -> None:
+        """
+        Fires n rules, picked among the matches the shards would fire.
+        """
+        count = len(self.connections)
+        while n > 0:
+            priorities = self.__ask_all('select')
+            best = None
+            for k in range(count):
+                i = (self.turn + k) % count
+                if priorities[i] is not None and (
+                        best is None or priorities[i] > priorities[best]):
+                    best = i
+            if best is None:
+                break
+            self.turn = (best + 1) % count
+
+            index, kwargs = self.__ask(best, 'fire')
+            for name, value in kwargs.items():
+                if isinstance(value, FactRef):
+                    kwargs[name] = self.facts[value.id]
+            if 'net' in kwargs:
+                kwargs['net'] = self
+            result = self.productions[index].__wrapped__(**kwargs)
+            if inspect.isawaitable(result):
+                await result
+            n -= 1
+
+    def seconds_until_ready(self) -> Optional[float]:
+        """
+        Like `ReteNetwork.seconds_until_ready`, over all the shards.
+        """
+        delays = [delay for delay in self.__ask_all('seconds_until_ready')
+                  if delay is not None]
+        return min(delays) if delays else None
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        for connection in self.connections:
+            try:
+                connection.send(('close', ()))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []
@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+import gc
+import mmap
+import pickle
+import struct
+import sys
+from array import array
+from itertools import chain
+from time import time
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.beta import BetaMemory
+from reactive_deliberative.py_rete.beta import ReteNode
+from reactive_deliberative.py_rete.common import Binding
+from reactive_deliberative.py_rete.common import EMPTY_BINDING
+from reactive_deliberative.py_rete.common import Match
+from reactive_deliberative.py_rete.common import NO_ITEMS
+from reactive_deliberative.py_rete.common import NegativeJoinResult
+from reactive_deliberative.py_rete.common import Token
+from reactive_deliberative.py_rete.common import WME
+from reactive_deliberative.py_rete.join_node import JoinNode
+from reactive_deliberative.py_rete.ncc_node import NccNode
+from reactive_deliberative.py_rete.ncc_node import NccPartnerNode
+from reactive_deliberative.py_rete.negative_node import NegativeNode
+from reactive_deliberative.py_rete.ordered_set import LinkedSet
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
+from reactive_deliberative.py_rete.pnode import PNode
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Dict
+    from typing import Iterable
+    from typing import List
+    from typing import Tuple
+    from typing import Union
+    from reactive_deliberative.py_rete.alpha import AlphaMemory
+    from reactive_deliberative.py_rete.common import BindingLayout
+    from reactive_deliberative.py_rete.network import ReteNetwork
+
+MAGIC = b'RETESNAP'
+VERSION = 1
+
+# The integer arrays of a snapshot, after the pickled header. Nodes are
+# numbered in the order of `ReteNetwork.beta_nodes`, alpha memories in the
+# order of `ReteNetwork.alpha_hash` and wmes in the order of working memory,
+# -1 stands for none. Lists of lists are stored flat with the offsets at
+# which each list starts.
+ARRAYS = (
+    'wme_timetags',
+    'amem_offsets', 'amem_items',
+    'successor_offsets', 'successors',
+    'children_offsets', 'children',
+    # node, parent token, wme, binding, owner token, seq of the match
+    'tokens',
+    # parent binding (-1 for the empty binding), layout
+    'bindings',
+    # token, wme
+    'join_results',
+    'new',
+    'agenda',
+)
+TOKEN_FIELDS = 6
+
+# The kinds of nodes that hold tokens.
+MEMORY, NEGATIVE, NCC, PRODUCTION, PARTNER = range(5)
+
+
+def node_kind(node: Union[ReteNode, NccPartnerNode]) -> int:
+    if isinstance(node, PNode):
+        return PRODUCTION
+    if isinstance(node, NegativeNode):
+        return NEGATIVE
+    if isinstance(node, NccNode):
+        return NCC
+    if isinstance(node, BetaMemory):
+        return MEMORY
+    if isinstance(node, NccPartnerNode):
+        return PARTNER
+    return -1
+
+
+def signature(nodes: List[Union[ReteNode, NccPartnerNode]],
+              amems: List[AlphaMemory]) -> List[Tuple[Any, ...]]:
+    """
+    Describes the nodes of a network, to check that a snapshot is restored
+    into a network built from the same productions.
+    """
+    amem_index = {id(amem): i for i, amem in enumerate(amems)}
+    described = []
+    for node in nodes:
+        if isinstance(node, PNode):
+            described.append((type(node).__name__, node.production.id))
+        elif isinstance(node, JoinNode):
+            described.append((type(node).__name__, amem_index[id(node.amem)]))
+        else:
+            described.append((type(node).__name__,))
+    return described
+
+
+def layouts_of(nodes: List[Union[ReteNode, NccPartnerNode]]
+               ) -> List[BindingLayout]:
+    """
+    The layouts of the bindings of the nodes, each after its parent.
+    """
+    layouts = []
+    seen = set()
+    for node in nodes:
+        layout = getattr(node, 'layout', None)
+        chain = []
+        while layout is not None and id(layout) not in seen:
+            seen.add(id(layout))
+            chain.append(layout)
+            layout = layout.parent
+        layouts.extend(reversed(chain))
+    return layouts
+
+
+def tokens_of(node: Union[ReteNode, NccPartnerNode]) -> Iterable[Token]:
+    """
+    The tokens of a node, the results of an ncc partner are grouped by owner
+    in the order of their ncc_results, then come the unowned ones.
+    """
+    if isinstance(node, BetaMemory):
+        return node.items
+    if isinstance(node, NccPartnerNode):
+        results = [result for token in node.ncc_node.items
+                   for result in token.ncc_results]
+        results.extend(node.new_result_buffer)
+        return results
+    return ()
+
+
+def creation_order(count: int, chains: Iterable[Iterable[int]]
+                   ) -> List[int]:
+    """
+    Orders the items 0 to count - 1 so that the items of each chain keep
+    their order in it.
+    """
+    following: List[List[int]] = [[] for _ in range(count)]
+    waiting = [0] * count
+    for items in chains:
+        previous = -1
+        for i in items:
+            if previous >= 0:
+                following[previous].append(i)
+                waiting[i] += 1
+            previous = i
+    ready = [i for i in reversed(range(count)) if not waiting[i]]
+    order = []
+    while ready:
+        i = ready.pop()
+        order.append(i)
+        for j in following[i]:
+            waiting[j] -= 1
+            if not waiting[j]:
+                ready.append(j)
+    if len(order) != count:
+        raise ValueError("The chains are not consistent with any order.")
+    return order
+
+
+def write_snapshot(network: ReteNetwork, path: str) -> None:
+    """
+    Writes the state of a network to a file: a pickled header with the
+    facts, the wmes, the values of the bindings and the times of the agenda,
+    then the rest as arrays of 64-bit integers. See `ReteNetwork.snapshot`.
+    """
+    if network.pending is not None:
+        raise ValueError("Cannot snapshot a network in a transaction.")
+
+    nodes = network.beta_nodes()
+    node_index = {node: i for i, node in enumerate(nodes)}
+    amems = list(network.alpha_hash.values())
+    arrays = {name: array('q') for name in ARRAYS}
+
+    wmes = list(network.working_memory)
+    wme_index = {id(wme): i for i, wme in enumerate(wmes)}
+    arrays['wme_timetags'].extend(wme.timetag for wme in wmes)
+
+    offsets, items = arrays['amem_offsets'], arrays['amem_items']
+    successor_offsets = arrays['successor_offsets']
+    successors = arrays['successors']
+    for amem in amems:
+        offsets.append(len(items))
+        items.extend(wme_index[id(wme)] for wme in amem.items)
+        successor_offsets.append(len(successors))
+        successors.extend(node_index[node] for node in amem.successors)
+    offsets.append(len(items))
+    successor_offsets.append(len(successors))
+
+    offsets, children = arrays['children_offsets'], arrays['children']
+    for node in nodes:
+        offsets.append(len(children))
+        if isinstance(node, ReteNode):
+            children.extend(node_index[child] for child in node.children)
+    offsets.append(len(children))
+
+    layout_index = {id(layout): i
+                    for i, layout in enumerate(layouts_of(nodes))}
+    binding_index = {id(EMPTY_BINDING): -1}
+    bindings = arrays['bindings']
+    values = []
+
+    def index_binding(binding: Binding) -> int:
+        index = binding_index.get(id(binding))
+        if index is None:
+            parent = index_binding(binding.parent)
+            index = binding_index[id(binding)] = len(values)
+            bindings.append(parent)
+            bindings.append(layout_index[id(binding.layout)])
+            values.append(binding.values)
+        return index
+
+    # tokens and negative join results are written in an order in which
+    # they could have been created, so the sets that keep them in creation
+    # order (memories, children, tokens of a wme, ...) come back the same
+    found = [token for node in nodes for token in tokens_of(node)]
+    found_index = {id(token): i for i, token in enumerate(found)}
+    chains = [[found_index[id(token)] for token in tokens] for tokens in
+              chain((node.items for node in nodes
+                     if isinstance(node, BetaMemory)),
+                    (node.new_result_buffer for node in nodes
+                     if isinstance(node, NccPartnerNode)),
+                    ((token, *token.children) for token in found),
+                    (token.ncc_results for token in found),
+                    (wme.tokens for wme in wmes))]
+    token_index = {}
+    for i in creation_order(len(found), chains):
+        token_index[id(found[i])] = len(token_index)
+    found = sorted(found, key=lambda token: token_index[id(token)])
+
+    tokens = arrays['tokens']
+    for token in found:
+        parent = token.parent
+        wme = token.wme
+        owner = token.owner
+        node = token.node
+        tokens.append(node_index[node])
+        tokens.append(-1 if parent is None else token_index[id(parent)])
+        tokens.append(-1 if wme is None else wme_index[id(wme)])
+        tokens.append(index_binding(token.binding))
+        tokens.append(-1 if owner is None else token_index[id(owner)])
+        tokens.append(node.matches[token].seq if isinstance(node, PNode)
+                      else 0)
+
+    results = [result for token in found for result in token.join_results]
+    result_index = {id(result): i for i, result in enumerate(results)}
+    chains = [[result_index[id(result)] for result in results] for results in
+              chain((token.join_results for token in found),
+                    (wme.negative_join_results for wme in wmes))]
+    join_results = arrays['join_results']
+    for i in creation_order(len(results), chains):
+        join_results.append(token_index[id(results[i].owner)])
+        join_results.append(wme_index[id(results[i].wme)])
+
+    for pnode in network.pnodes:
+        arrays['new'].extend(token_index[id(token)] for token in pnode.new)
+    arrays['agenda'].extend(token_index[id(match.token)]
+                            for match in network.agenda)
+
+    agenda = network.agenda
+    now = network.now
+    header = {
+        'byteorder': sys.byteorder,
+        'nodes': signature(nodes, amems),
+        'alpha_keys': [amem.key for amem in amems],
+        'facts': network.facts,
+        'fact_counter': network.fact_counter,
+        'timetag_counter': network.timetag_counter,
+        'wmes': [(wme.identifier, wme.attribute, wme.value)
+                 for wme in wmes],
+        'values': values,
+        'counter': agenda.counter,
+        # times are kept as seconds from the snapshot, monotonic time does
+        # not carry over to another process
+        'cooling': {prod_id: agenda.ready_at[prod_id] - now
+                    for prod_id in agenda.cooling},
+        'executed': {prod_id: now - timestamp for prod_id, timestamp
+                     in network.execution_timestamps.items()},
+        'time': time(),
+    }
+
+    sections = [pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)]
+    sections.extend(arrays[name].tobytes() for name in ARRAYS)
+    position = len(MAGIC) + 8 + 16 * len(sections)
+    table = []
+    for section in sections:
+        position += -position % 8
+        table.append((position, len(section)))
+        position += len(section)
+
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(struct.pack('<Q', VERSION))
+        for offset, length in table:
+            file.write(struct.pack('<QQ', offset, length))
+        for (offset, _), section in zip(table, sections):
+            file.write(b'\0' * (offset - file.tell()))
+            file.write(section)
+
+
+def read_snapshot(network: ReteNetwork, path: str) -> None:
+    """
+    Restores the state written by `write_snapshot` into a network built from
+    the same productions, that has no facts. See `ReteNetwork.restore`. The
+    header is unpickled, the file must be trusted.
+    """
+    if network.pending is not None or network.working_memory or \
+            network.facts:
+        raise ValueError("Can only restore a snapshot into a network "
+                         "without facts.")
+
+    # the collector is paused while the objects are created, they are all
+    # kept and collections would only walk them
+    paused = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            arrays = {}
+            try:
+                if view[:len(MAGIC)] != MAGIC:
+                    raise ValueError("{} is not a snapshot".format(path))
+                version, = struct.unpack_from('<Q', view, len(MAGIC))
+                if version != VERSION:
+                    raise ValueError("Unsupported snapshot version {}"
+                                     .format(version))
+                table = [struct.unpack_from('<QQ', view,
+                                            len(MAGIC) + 8 + 16 * i)
+                         for i in range(1 + len(ARRAYS))]
+                offset, length = table[0]
+                header = pickle.loads(view[offset:offset + length])
+                if header['byteorder'] != sys.byteorder:
+                    raise ValueError("The snapshot was written on a machine "
+                                     "with another byte order.")
+                for name, (offset, length) in zip(ARRAYS, table[1:]):
+                    arrays[name] = view[offset:offset + length].cast('q')
+                load(network, header, arrays)
+            finally:
+                for values in arrays.values():
+                    values.release()
+                view.release()
+    finally:
+        if paused:
+            gc.enable()
+
+
+def load(network: ReteNetwork, header: Dict[str, Any],
+         arrays: Dict[str, memoryview]) -> None:
+    nodes = network.beta_nodes()
+    amems = list(network.alpha_hash.values())
+    if (header['nodes'] != signature(nodes, amems) or
+            header['alpha_keys'] != [amem.key for amem in amems]):
+        raise ValueError("The snapshot was taken from a network with other "
+                         "productions.")
+
+    # the tokens the productions got from an empty working memory are
+    # deleted with the children detached, so nothing is propagated
+    for node in nodes:
+        if isinstance(node, ReteNode):
+            node.children = LinkedSet()
+    for node in nodes:
+        if isinstance(node, BetaMemory):
+            while node.items:
+                node.items.first().delete_token_and_descendents()
+        elif isinstance(node, NccPartnerNode):
+            while node.new_result_buffer:
+                node.new_result_buffer.first().delete_token_and_descendents()
+
+    working_memory = network.working_memory
+    wmes = []
+    for (identifier, attribute, value), timetag in zip(
+            header['wmes'], arrays['wme_timetags']):
+        wme = WME(identifier, attribute, value)
+        wme.timetag = timetag
+        working_memory.add(wme)
+        wmes.append(wme)
+
+    offsets = arrays['amem_offsets']
+    items = arrays['amem_items']
+    successor_offsets = arrays['successor_offsets']
+    successors = arrays['successors']
+    for i, amem in enumerate(amems):
+        members = [wmes[j] for j in items[offsets[i]:offsets[i + 1]]]
+        amem.items.update(dict.fromkeys(members))
+        for index in amem.indexes.values():
+            index.extend(members)
+        for wme in members:
+            wme.amems.append(amem)
+        amem.successors = LinkedSet(
+            nodes[j] for j in successors[
+                successor_offsets[i]:successor_offsets[i + 1]])
+
+    offsets, children = arrays['children_offsets'], arrays['children']
+    for i, node in enumerate(nodes):
+        if isinstance(node, ReteNode):
+            node.children = LinkedSet(
+                nodes[j] for j in children[offsets[i]:offsets[i + 1]])
+
+    layouts = layouts_of(nodes)
+    bindings = []
+    parents = iter(arrays['bindings'])
+    for parent, layout, values in zip(parents, parents, header['values']):
+        bindings.append(Binding(
+            bindings[parent] if parent >= 0 else EMPTY_BINDING,
+            layouts[layout], values))
+
+    # tokens are created and linked inline rather than through Token and
+    # BetaMemory.add, the memories and their indexes are filled once all the
+    # tokens exist
+    kinds = [node_kind(node) for node in nodes]
+    members = [[] for _ in nodes]
+    tokens = []
+    owned = []
+    create = Token.__new__
+    fields = iter(arrays['tokens'])
+    for i, parent, wme, binding, owner, seq in zip(
+            *[fields] * TOKEN_FIELDS):
+        node = nodes[i]
+        token = create(Token)
+        token.node = node
+        token.children = NO_ITEMS
+        token.join_results = NO_ITEMS
+        token.ncc_results = NO_ITEMS
+        token.owner = None
+        token.binding = (bindings[binding] if binding >= 0
+                         else EMPTY_BINDING)
+        token._wmes = None
+        if parent >= 0:
+            parent = token.parent = tokens[parent]
+            siblings = parent.children
+            if siblings is NO_ITEMS:
+                siblings = parent.children = OrderedSet()
+            siblings[token] = None
+        else:
+            token.parent = None
+        if wme >= 0:
+            wme = token.wme = wmes[wme]
+            wme.tokens[token] = None
+        else:
+            token.wme = None
+        tokens.append(token)
+        kind = kinds[i]
+        if kind == PARTNER:
+            if owner >= 0:
+                owned.append((token, owner))
+            else:
+                node.new_result_buffer[token] = None
+            continue
+        if kind == NEGATIVE:
+            token.join_results = OrderedSet()
+        elif kind == NCC:
+            token.ncc_results = OrderedSet()
+        members[i].append(token)
+        if kind == PRODUCTION:
+            match = node.matches[token] = Match(node, token)
+            match.seq = seq
+    for node, items in zip(nodes, members):
+        if items:
+            node.items.update(dict.fromkeys(items))
+            for index in node.indexes.values():
+                index.extend(items)
+    # an owner can come after its results, when they were buffered
+    for token, owner in owned:
+        token.owner = tokens[owner]
+        token.owner.ncc_results.append(token)
+    # the ncc results in owned and the buffers are plain tokens, which the
+    # stats do not count
+    network.stats.counts['tokens'] += sum(map(len, members))
+
+    fields = iter(arrays['join_results'])
+    for owner, wme in zip(fields, fields):
+        result = NegativeJoinResult(tokens[owner], wmes[wme])
+        result.owner.join_results.append(result)
+        result.wme.negative_join_results.append(result)
+
+    for i in arrays['new']:
+        token = tokens[i]
+        token.node.new.append(token)
+
+    # times from the snapshot carry on from now, minus the time spent
+    # between the snapshot and the restore
+    now = network.now - (time() - header['time'])
+    productions = {production.id: production
+                   for production in network.productions}
+    network.agenda.restore(
+        (tokens[i].node.matches[tokens[i]] for i in arrays['agenda']),
+        header['counter'],
+        ((productions[prod_id], now + remaining)
+         for prod_id, remaining in header['cooling'].items()))
+    network.execution_timestamps = {
+        prod_id: now - age for prod_id, age in header['executed'].items()}
+
+    network.facts = header['facts']
+    network.fact_counter = header['fact_counter']
+    network.timetag_counter = header['timetag_counter']
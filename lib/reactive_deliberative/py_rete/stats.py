@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict
+    from typing import List
+    from typing import Tuple
+
+
+class Histogram:
+    """
+    Counts durations in buckets whose upper bounds double from a
+    microsecond, up to about half a minute. Longer durations go in a last,
+    unbounded bucket.
+    """
+    bounds = [2 ** i / 1e6 for i in range(25)]
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.total = 0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Returns the upper bound of the bucket that holds the p-th percentile
+        (0 < p <= 100), infinity if it is the last one, 0 if it is empty.
+        """
+        if not self.total:
+            return 0.0
+        rank = p / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                break
+        return self.bounds[i] if i < len(self.bounds) else float('inf')
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        Returns the (upper bound, count) of the buckets that are not empty.
+        """
+        bounds = self.bounds + [float('inf')]
+        return [(bounds[i], count) for i, count in enumerate(self.counts)
+                if count]
+
+    def __repr__(self) -> str:
+        return "Histogram({})".format(", ".join(
+            "<={:g}s: {}".format(bound, count)
+            for bound, count in self.buckets()))
+
+
+class Stats:
+    """
+    Counters of the work done by a network, by name (e.g., 'filter' counts
+    the filter function calls). Counts are always kept. The time spent is
+    only measured when timing is on, since measuring it has a cost of its
+    own. Durations that are always measured, like latencies, are recorded
+    with `record`, which also keeps the longest one and their histogram.
+    """
+
+    def __init__(self, timing: bool = False) -> None:
+        self.timing = timing
+        self.counts: Counter = Counter()
+        self.seconds: Counter = Counter()
+        self.longest: Counter = Counter()
+        self.histograms: Dict[str, Histogram] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Counts one occurrence of name that lasted the given seconds.
+        """
+        self.counts[name] += 1
+        self.seconds[name] += seconds
+        if seconds > self.longest[name]:
+            self.longest[name] = seconds
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+
+    def per_call(self, name: str) -> float:
+        """
+        Returns the average number of seconds spent per call, or 0 if there
+        was no timed call.
+        """
+        if not self.counts[name]:
+            return 0.0
+        return self.seconds[name] / self.counts[name]
+
+    def reset(self) -> None:
+        self.counts.clear()
+        self.seconds.clear()
+        self.longest.clear()
+        self.histograms.clear()
+
+    def __repr__(self) -> str:
+        return "Stats(counts={}, seconds={})".format(dict(self.counts),
+                                                     dict(self.seconds))
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import random
+from abc import ABC
+from abc import abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any
+    from typing import Dict
+    from typing import List
+    from typing import Optional
+    from reactive_deliberative.py_rete.agenda import Activations
+    from reactive_deliberative.py_rete.common import Match
+
+
+class Strategy(ABC):
+    """
+    A conflict resolution strategy. The agenda always restricts the choice to
+    the ready matches with the highest production priority (salience), the
+    strategy picks one of them.
+
+    Ordered strategies give each match a key when it enters the agenda;
+    smaller keys fire first and ties go to the older match. Every production
+    keeps its matches in a heap on those keys, so a selection costs one heap
+    peek per production in the priority level. Unordered strategies override
+    select instead.
+    """
+    ordered = True
+
+    @abstractmethod
+    def key(self, match: Match) -> Any:
+        """
+        The key of a match of an ordered strategy.
+        """
+
+    def select(self, level: Dict[str, Activations]) -> Optional[Match]:
+        best = None
+        for activations in level.values():
+            entry = activations.best()
+            if entry is not None and (best is None or entry < best):
+                best = entry
+        return best[2] if best is not None else None
+
+
+class RecencyStrategy(Strategy):
+    """
+    Salience, then recency: the most recent activation fires first (LIFO).
+    """
+
+    def key(self, match: Match) -> Any:
+        return -match.seq
+
+
+class LexStrategy(Strategy):
+    """
+    The OPS5 LEX strategy: matches are compared on the time tags of their
+    wmes, most recent first, in lexicographic order (a match that extends
+    another one wins). Ties go to the more specific production.
+    """
+
+    @staticmethod
+    def timetags(match: Match) -> List[int]:
+        return sorted((wme.timetag for wme in match.wmes
+                       if wme is not None), reverse=True)
+
+    def key(self, match: Match) -> Any:
+        lex = tuple(-tag for tag in self.timetags(match)) + (float('inf'),)
+        return lex, -match.pnode.specificity
+
+
+class MeaStrategy(LexStrategy):
+    """
+    The OPS5 MEA strategy: matches are first compared on the time tag of the
+    wme matching the first condition, then as in LEX.
+    """
+
+    def key(self, match: Match) -> Any:
+        first = match.wmes[0]
+        return (-(first.timetag if first is not None else 0),
+                ) + super().key(match)
+
+
+class RandomStrategy(Strategy):
+    """
+    Picks uniformly at random among the matches of the highest priority
+    level. With a seed the choices are reproducible, otherwise the global
+    random module is used.
+    """
+    ordered = False
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.random = random if seed is None else random.Random(seed)
+
+    def key(self, match: Match) -> Any:
+        # matches get no key, the strategy is not ordered
+        return None
+
+    def select(self, level: Dict[str, Activations]) -> Optional[Match]:
+        total = sum(len(activations) for activations in level.values())
+        if not total:
+            return None
+        pick = self.random.randrange(total)
+        for activations in level.values():
+            if pick < len(activations):
+                return activations.matches[pick]
+            pick -= len(activations)
+        return None
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.common import Token
+from reactive_deliberative.py_rete.stats import Stats
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import List
+    from typing import Optional
+    from reactive_deliberative.py_rete.beta import ReteNode
+    from reactive_deliberative.py_rete.common import Binding
+    from reactive_deliberative.py_rete.common import WME
+
+
+class TokenFactory:
+    """
+    Creates the tokens of the beta memories of a network. With pool set,
+    deleted tokens are kept on a free list (up to max_size of them) and
+    reused for new tokens instead of being left to the garbage collector.
+
+    A reused token is a different match than the one it was: with pooling
+    on, tokens and matches must not be kept after they are deleted.
+
+    The stats count the tokens created ('tokens'), the ones of them that
+    were reused ('tokens_reused') and the tokens deleted
+    ('tokens_released').
+    """
+
+    def __init__(self, stats: Optional[Stats] = None, pool: bool = False,
+                 max_size: int = 100000) -> None:
+        self.stats = stats if stats is not None else Stats()
+        self.pool = pool
+        self.max_size = max_size
+        self.free: List[Token] = []
+
+    def __len__(self) -> int:
+        return len(self.free)
+
+    def token(self, parent: Optional[Token], wme: Optional[WME],
+              node: ReteNode, binding: Optional[Binding]) -> Token:
+        """
+        Returns a new token, reused from the free list if possible.
+        """
+        counts = self.stats.counts
+        counts['tokens'] += 1
+        if self.free:
+            counts['tokens_reused'] += 1
+            token = self.free.pop()
+            token.__init__(parent, wme, node, binding)
+            return token
+        return Token(parent, wme, node, binding)
+
+    def release(self, token: Token) -> None:
+        """
+        Called when a token has been deleted, puts it on the free list if
+        pooling is on and the list is not full.
+        """
+        self.stats.counts['tokens_released'] += 1
+        if self.pool and len(self.free) < self.max_size:
+            token.clear()
+            self.free.append(token)
+
+    def clear(self) -> None:
+        """
+        Empties the free list.
+        """
+        self.free.clear()
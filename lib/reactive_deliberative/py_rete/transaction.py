@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from reactive_deliberative.py_rete.working_memory import WorkingMemory
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict
+    from typing import Hashable
+    from typing import Iterator
+    from reactive_deliberative.py_rete.common import WME
+
+
+class Transaction:
+    """
+    The pending changes of a network transaction: the wmes to assert and the
+    stored wmes to retract. Asserting a wme that is pending retraction, or
+    retracting one that is pending assertion, cancels both, so only the net
+    delta reaches the network on commit. Membership and lookups by identifier
+    see working memory as it will be after the commit.
+    """
+
+    def __init__(self, working_memory: WorkingMemory) -> None:
+        self.working_memory = working_memory
+        self.adds = WorkingMemory(by_attribute=False)
+        self.removes: Dict[WME, WME] = {}
+
+    def __contains__(self, wme: object) -> bool:
+        if wme in self.adds:
+            return True
+        return wme in self.working_memory and wme not in self.removes
+
+    def __len__(self) -> int:
+        return len(self.adds) + len(self.removes)
+
+    def add(self, wme: WME) -> None:
+        """
+        Adds the wme, does nothing if an equal wme will already be stored.
+        A retraction is only cancelled by a wme whose value has the same type,
+        otherwise both are kept so a change from 1 to True is propagated.
+        """
+        removed = self.removes.get(wme)
+        if removed is not None:
+            if type(removed.value) is type(wme.value):
+                del self.removes[wme]
+            else:
+                self.adds.add(wme)
+        elif wme not in self.working_memory:
+            self.adds.add(wme)
+
+    def remove(self, wme: WME) -> None:
+        """
+        Removes the wme equal to the given one. Raises a KeyError if there
+        will be no such wme.
+        """
+        if wme in self.adds:
+            self.adds.remove(wme)
+            return
+        stored = self.working_memory.get(wme)
+        if stored is None or stored in self.removes:
+            raise KeyError(wme)
+        self.removes[stored] = stored
+
+    def by_identifier(self, identifier: Hashable) -> Iterator[WME]:
+        """
+        Iterates over the wmes with the given identifier.
+        """
+        for wme in self.working_memory.by_identifier(identifier):
+            if wme not in self.removes:
+                yield wme
+        yield from self.adds.by_identifier(identifier)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict
+    from typing import Hashable
+    from typing import Iterator
+    from typing import Optional
+    from reactive_deliberative.py_rete.common import WME
+
+
+class WorkingMemory:
+    """
+    Stores the WMEs that are currently asserted in the network. WMEs are kept
+    in insertion order and indexed by identifier, so all the WMEs of a fact
+    can be found without scanning the whole working memory, and by attribute
+    then value, so a new alpha memory only tests the WMEs that can match it
+    (the latter index can be turned off, e.g., for pending changes). Lookups
+    by value return the stored WME instance (the one alpha memories and
+    tokens point to) rather than an equal copy.
+    """
+
+    def __init__(self, by_attribute: bool = True) -> None:
+        self._wmes: Dict[WME, WME] = {}
+        self._by_identifier: Dict[Hashable, Dict[WME, None]] = {}
+        # attribute -> value -> {id(wme): wme}
+        self._by_attribute: Optional[Dict[Hashable, Dict[
+            Hashable, Dict[int, WME]]]] = {} if by_attribute else None
+
+    def __contains__(self, wme: object) -> bool:
+        return wme in self._wmes
+
+    def __iter__(self) -> Iterator[WME]:
+        return iter(self._wmes)
+
+    def __len__(self) -> int:
+        return len(self._wmes)
+
+    def add(self, wme: WME) -> None:
+        """
+        Adds the wme, does nothing if an equal wme is already stored.
+        """
+        if wme in self._wmes:
+            return
+        self._wmes[wme] = wme
+        ids = self._by_identifier.get(wme.identifier)
+        if ids is None:
+            ids = self._by_identifier[wme.identifier] = {}
+        ids[wme] = None
+        if self._by_attribute is None:
+            return
+        values = self._by_attribute.get(wme.attribute)
+        if values is None:
+            values = self._by_attribute[wme.attribute] = {}
+        same = values.get(wme.value)
+        if same is None:
+            same = values[wme.value] = {}
+        same[id(wme)] = wme
+
+    def remove(self, wme: WME) -> None:
+        """
+        Removes the stored wme equal to the given one. Raises a KeyError if
+        there is no such wme.
+        """
+        stored = self._wmes.pop(wme)
+        ids = self._by_identifier[stored.identifier]
+        del ids[stored]
+        if not ids:
+            del self._by_identifier[stored.identifier]
+        if self._by_attribute is None:
+            return
+        values = self._by_attribute[stored.attribute]
+        same = values[stored.value]
+        del same[id(stored)]
+        if not same:
+            del values[stored.value]
+            if not values:
+                del self._by_attribute[stored.attribute]
+
+    def get(self, wme: WME) -> Optional[WME]:
+        """
+        Returns the stored instance of a wme equal to the given one, or None.
+        """
+        return self._wmes.get(wme)
+
+    def by_identifier(self, identifier: Hashable) -> Iterator[WME]:
+        """
+        Iterates over the stored wmes with the given identifier.
+        """
+        return iter(self._by_identifier.get(identifier, ()))
+
+    def by_attribute(self, attribute: Hashable) -> Iterator[WME]:
+        """
+        Iterates over the stored wmes with the given attribute, grouped by
+        value.
+        """
+        for same in self._by_attribute.get(attribute, {}).values():
+            yield from same.values()
+
+    def by_attribute_value(self, attribute: Hashable,
+                           value: Hashable) -> Iterator[WME]:
+        """
+        Iterates over the stored wmes with the given attribute and value.
+        """
+        return iter(self._by_attribute.get(attribute, {}).get(
+            value, {}).values())
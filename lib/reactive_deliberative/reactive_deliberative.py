@@ -1,30 +1,128 @@
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from time import monotonic
 
-from reactive_deliberative.py_rete import Fact, ReteNetwork
+from reactive_deliberative.py_rete import Fact, ReteNetwork, Scheduler
+from reactive_deliberative.py_rete.preemption import Preemption
+from reactive_deliberative.triggers import PollTrigger
 
 
 class ReactiveDeliberative:
-    def __init__(self, loop_delay=0):
+    """
+    With concurrency above 1, the network loop fires up to that many matches
+    at a time (see `Scheduler`), so a rule waiting on I/O does not hold up
+    the others. Rules that write different facts, or declare that they write
+    different attributes (`Production(writes=...)`), then run side by side.
+
+    The functions of blocking productions (`Production(blocking=True)`) run
+    in a pool of threads owned by the engine, threads is its size (see
+    `ThreadPoolExecutor` for the default). The offloader of the network
+    keeps the depth of its queue. The functions of process productions
+    (`Production(process=True)`) run in a pool of processes owned by the
+    engine, processes is its size (the number of CPUs by default). Each pool
+    is only created when the first such function runs, an engine without
+    them has nothing to shut down; `close` shuts down the ones created.
+
+    Forced reactive actions preempt the network loop (see `Preemption`):
+    they take the network lock between two firings, or at a checkpoint of a
+    long firing (`net.checkpoint()`), and the loop goes on once they are
+    done.
+    """
+
+    def __init__(self, loop_delay=0, strategy=None, concurrency=1,
+                 threads=None, processes=None):
         self.fact = Fact()
-        self.network = ReteNetwork()
+        self.network = ReteNetwork(strategy=strategy)
         self.network.add_fact(self.fact)
         self.loop_delay = loop_delay
         self.network_lock = asyncio.Lock()
+        self.preemption = Preemption(self.network_lock, self.network.stats)
+        self.network.preemption = self.preemption
+        self.facts_changed = asyncio.Event()
+        self.network.on_ready = self.facts_changed.set
+        self.threads = threads
+        self.executor = None
+        self.network.offloader.make_executor = self._make_executor
+        self.workers = processes
+        self.processes = None
+        self.network.offloader.make_processes = self._make_processes
+        self.scheduler = None
+        if concurrency > 1:
+            self.scheduler = Scheduler(self.network, concurrency)
+            self.scheduler.on_done = self.facts_changed.set
         self.loop = asyncio.get_event_loop()
         self.task = self.loop.create_task(self._network_loop())
         self.reactive_tasks = []
+        self.triggers = {}
 
     def run(self):
         self.loop.run_forever()
 
+    def close(self):
+        """
+        Cancels the network loop and the reactive actions and shuts the
+        thread and process pools down, if they were created.
+        """
+        self.task.cancel()
+        for task in self.reactive_tasks:
+            task.cancel()
+        if self.scheduler is not None:
+            self.scheduler.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False)
+
+    def _make_executor(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.threads,
+            thread_name_prefix='reactive-deliberative')
+        return self.executor
+
+    def _make_processes(self):
+        self.processes = ProcessPoolExecutor(max_workers=self.workers)
+        return self.processes
+
     def _get_fact_last_int_idx(self):
         return max([key for key in self.fact.keys() if isinstance(key, int)])
 
     async def _network_loop(self):
+        """
+        Fires one rule at a time while there are matches that can fire. When
+        there are none, sleeps until there are (see `_wait_for_facts`)
+        instead of polling the network. With a scheduler, starts the rules
+        that can fire and sleeps until one of them is done or new matches
+        come.
+        """
         while 1:
-            async with self.network_lock:
-                await self.network.run()
-                await asyncio.sleep(0)
+            async with self.preemption.hold():
+                if self.scheduler is None:
+                    await self.network.run()
+                    delay = self.network.seconds_until_ready()
+                else:
+                    self.scheduler.start()
+                    delay = self.network.seconds_until_ready()
+                    if delay == 0:
+                        # the scheduler is full
+                        delay = None
+            if delay == 0:
+                await asyncio.sleep(self.loop_delay)
+            else:
+                await self._wait_for_facts(delay)
+
+    async def _wait_for_facts(self, timeout=None):
+        """
+        Sleeps until a fact is changed through this object, the agenda of
+        the network gets a match that can fire, or the timeout (if any)
+        expires, whichever comes first.
+        """
+        self.facts_changed.clear()
+        try:
+            await asyncio.wait_for(self.facts_changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
 
     def add_fact(self, value, parameter=None):
         if parameter is None:
@@ -34,24 +132,87 @@ class ReactiveDeliberative:
             self.fact[parameter] = value
 
         self.network.update_fact(self.fact)
+        self.facts_changed.set()
 
     def remove_fact(self, parameter):
         del self.fact[parameter]
 
         self.network.update_fact(self.fact)
+        self.facts_changed.set()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Holds the network lock and batches the fact changes made in the
+        block into one network transaction, committed when the block exits.
+        Productions fired by the network already run under the lock and
+        should use `net.transaction()` instead.
+        """
+        async with self.preemption.hold():
+            with self.network.transaction():
+                yield self
+        self.facts_changed.set()
+
+    def restore(self, path):
+        """
+        Restores a snapshot of the network of an engine built with the same
+        productions (see `ReteNetwork.restore`), before the engine runs. The
+        fact of the engine is the one of the snapshot afterwards.
+        """
+        fact_id = self.fact.id
+        self.network.remove_fact(self.fact)
+        try:
+            self.network.restore(path)
+        except Exception:
+            self.network.add_fact(self.fact)
+            raise
+        self.fact = self.network.facts[fact_id]
+        self.facts_changed.set()
 
     def add_production(self, production):
         self.network.add_production(production)
 
-    async def __reactive_action(self, predicate, callback, force):
+    async def __dispatch(self, trigger, force):
         while True:
-            if await predicate():
-                if force:
-                    self.task.cancel()
-                await callback()
-                if force:
-                    self.task = self.loop.create_task(self._network_loop())
-
-    def add_reactive_action(self, predicate, callback, force=True):
-        task = asyncio.get_event_loop().create_task(self.__reactive_action(predicate, callback, force))
+            since, args = await trigger.wait()
+            if not force:
+                self.network.stats.record('dispatch_latency',
+                                          monotonic() - since)
+                await trigger.fire(args)
+                continue
+            async with self.preemption.preempt():
+                self.network.stats.record('dispatch_latency',
+                                          monotonic() - since)
+                await trigger.fire(args)
+            # the loop may be waiting for a running firing to finish
+            self.facts_changed.set()
+
+    def add_trigger(self, trigger, callback, force=False):
+        """
+        Calls callback each time the trigger fires (see `triggers`), instead
+        of polling a predicate. With force, the callback preempts the
+        deliberative loop and no rule fires while it runs. The time from the
+        change to the call is recorded in the network stats as
+        'dispatch_latency'.
+        """
+        trigger.attach(self, callback)
+        task = self.loop.create_task(self.__dispatch(trigger, force))
+        self.triggers[trigger] = task
         self.reactive_tasks.append(task)
+        return trigger
+
+    def remove_trigger(self, trigger):
+        task = self.triggers.pop(trigger)
+        task.cancel()
+        self.reactive_tasks.remove(task)
+        trigger.detach(self)
+
+    def add_reactive_action(self, predicate, callback, force=True,
+                            interval=0.1):
+        """
+        Polls the predicate, at most once every interval seconds, and calls
+        callback when it returns True. Prefer `add_trigger` when the change
+        can be subscribed to.
+        """
+        return self.add_trigger(PollTrigger(predicate, interval), callback,
+                                force)
@@ -0,0 +1,193 @@
+import asyncio
+import os
+from abc import ABC
+from abc import abstractmethod
+from time import monotonic
+
+from reactive_deliberative.py_rete import Production
+
+
+class Trigger(ABC):
+    """
+    Something a reactive action waits for (see
+    `ReactiveDeliberative.add_trigger`). `wait` returns once the trigger
+    fires, with the monotonic time at which the change was seen (the
+    dispatch latency is measured from it) and the arguments of the callback.
+    `attach` and `detach` are called when the trigger is added to and
+    removed from an engine.
+    """
+
+    def __init__(self):
+        self.callback = None
+
+    def attach(self, rd, callback):
+        self.callback = callback
+
+    def detach(self, rd):
+        pass
+
+    @abstractmethod
+    async def wait(self):
+        pass
+
+    async def fire(self, args):
+        result = self.callback(*args)
+        if asyncio.iscoroutine(result):
+            await result
+
+
+class FactTrigger(Trigger):
+    """
+    Fires for each new match of a pattern of facts. The pattern is added to
+    the network of the engine like the conditions of a production, but its
+    matches are handed to the trigger instead of the agenda, and the callback
+    is called like the function of a production: with the variables of the
+    pattern, `net` and `wmes`. A match that goes away before it is dispatched
+    is dropped, so the callback only sees changes that still hold.
+    """
+
+    def __init__(self, pattern):
+        super().__init__()
+        self.pattern = pattern
+        self.production = None
+        self.pending = {}
+        self.changed = asyncio.Event()
+
+    def attach(self, rd, callback):
+        super().attach(rd, callback)
+        self.production = Production(self.pattern)(callback)
+        rd.network.add_production(self.production, agenda=self)
+
+    def detach(self, rd):
+        rd.network.remove_production(self.production)
+        self.production = None
+        self.pending.clear()
+
+    def add(self, match):
+        self.pending[match] = monotonic()
+        self.changed.set()
+
+    def remove(self, match):
+        self.pending.pop(match, None)
+
+    async def wait(self):
+        while not self.pending:
+            self.changed.clear()
+            await self.changed.wait()
+        match = next(iter(self.pending))
+        return self.pending.pop(match), (match,)
+
+    async def fire(self, args):
+        match, = args
+        if match.pnode.matches.get(match.token) is match:
+            await match.fire()
+
+
+class EventTrigger(Trigger):
+    """
+    Fires when an asyncio.Event is set, and clears it.
+    """
+
+    def __init__(self, event):
+        super().__init__()
+        self.event = event
+
+    async def wait(self):
+        await self.event.wait()
+        self.event.clear()
+        return monotonic(), ()
+
+
+class QueueTrigger(Trigger):
+    """
+    Fires for each item put in an asyncio.Queue, which is passed to the
+    callback. The item is marked done once the callback returns.
+    """
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    async def wait(self):
+        item = await self.queue.get()
+        return monotonic(), (item,)
+
+    async def fire(self, args):
+        try:
+            await super().fire(args)
+        finally:
+            self.queue.task_done()
+
+
+class FileTrigger(Trigger):
+    """
+    Fires when a file, or a file in a directory, is created or modified, and
+    passes the sorted list of their paths to the callback. The standard
+    library has no file notifications, so the modification times and sizes
+    are compared every interval seconds: a few stat calls, rather than the
+    predicate of a reactive action running in a loop. With existing, the
+    files already there when the trigger starts are reported first.
+    """
+
+    def __init__(self, path, interval=1.0, existing=False):
+        super().__init__()
+        self.path = path
+        self.interval = interval
+        self.existing = existing
+        self.seen = None
+
+    def scan(self):
+        if os.path.isdir(self.path):
+            paths = [entry.path for entry in os.scandir(self.path)
+                     if entry.is_file()]
+        elif os.path.exists(self.path):
+            paths = [self.path]
+        else:
+            paths = []
+        state = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    async def wait(self):
+        if self.seen is None:
+            self.seen = {} if self.existing else self.scan()
+        while True:
+            state = self.scan()
+            changed = sorted(path for path, stat in state.items()
+                             if self.seen.get(path) != stat)
+            self.seen = state
+            if changed:
+                return monotonic(), (changed,)
+            await asyncio.sleep(self.interval)
+
+
+class PollTrigger(Trigger):
+    """
+    Fires when an asynchronous predicate returns True. Each call of the
+    predicate, whatever it returns, is at least interval seconds after the
+    previous one, so polling costs at most one call per interval even while
+    the predicate stays True. The interval must be positive, a predicate
+    called in a loop would keep a core busy.
+    """
+
+    def __init__(self, predicate, interval=0.1):
+        if interval <= 0:
+            raise ValueError("The polling interval must be positive.")
+        super().__init__()
+        self.predicate = predicate
+        self.interval = interval
+        self.next_call = 0.0
+
+    async def wait(self):
+        while True:
+            delay = self.next_call - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_call = monotonic() + self.interval
+            if await self.predicate():
+                return monotonic(), ()
@@ -0,0 +1,130 @@
+from reactive_deliberative import Fact, Filter, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.beta import BetaMemory
+from reactive_deliberative.py_rete.ncc_node import NccNode
+from reactive_deliberative.py_rete.ncc_node import NccPartnerNode
+from reactive_deliberative.py_rete.negative_node import NegativeNode
+
+
+def describe(token, ids=None):
+    """
+    The wmes and the binding of a token, as sorted plain values. ids maps
+    fact ids to the names to use instead.
+    """
+    ids = ids or {}
+    wmes = tuple(None if wme is None else
+                 (ids.get(wme.identifier, wme.identifier), wme.attribute,
+                  repr(wme.value))
+                 for wme in token.wmes)
+    # generated variables are named per network, their values are the ids
+    # of facts already in the wmes
+    binding = tuple(sorted((v.name, repr(value))
+                           for v, value in token.binding.items()
+                           if not v.name.startswith('genvar')))
+    return wmes, binding
+
+
+def network_state(net, ids=None):
+    """
+    The tokens of every memory of the beta network, with their join and ncc
+    results, and the matches on the agenda. Two networks built from the
+    same productions and given the same facts have the same state, whatever
+    the order the nodes saw the changes in. ids maps fact ids to the names
+    to use instead, e.g., to compare networks that gave facts other ids.
+    """
+    state = []
+    for node in net.beta_nodes():
+        if isinstance(node, NccPartnerNode):
+            items = node.new_result_buffer
+        elif isinstance(node, BetaMemory):
+            items = node.items
+        else:
+            continue
+        tokens = []
+        for token in items:
+            extra = ()
+            if isinstance(node, NegativeNode):
+                extra = tuple(sorted(
+                    (ids or {}).get(result.wme.identifier,
+                                    result.wme.identifier)
+                    for result in token.join_results))
+            elif isinstance(node, NccNode):
+                extra = tuple(sorted(describe(result, ids)
+                                     for result in token.ncc_results))
+            tokens.append((describe(token, ids), extra))
+        state.append((type(node).__name__, sorted(tokens)))
+    matches = sorted((match.pnode.production.id, describe(match.token, ids))
+                     for match in net.agenda)
+    return state, matches
+
+
+def live_tokens(net):
+    """
+    The number of tokens in the memories of the beta network.
+    """
+    return sum(len(node.items) for node in net.beta_nodes()
+               if isinstance(node, BetaMemory))
+
+
+def productions():
+    """
+    New productions with a join, a negation and an ncc, for one network.
+    """
+    @Production(Fact(kind='order', item=V('item'), qty=V('qty')) &
+                Fact(kind='stock', item=V('item'), qty=V('have')) &
+                Filter(lambda qty, have: qty <= have))
+    def fillable(item, qty, have):
+        pass
+
+    @Production(Fact(kind='order', item=V('item'), shop=V('shop')) &
+                ~Fact(kind='stock', item=V('item'), shop=V('shop')))
+    def missing(item, shop):
+        pass
+
+    @Production(Fact(kind='order', item=V('item'), shop=V('shop')) &
+                Fact(kind='stock', item=V('item'), shop=V('shop')) &
+                ~(Fact(kind='hold', item=V('item')) &
+                  Fact(kind='stock', item=V('item'), shop='main')))
+    def shippable(item, shop):
+        pass
+
+    return [fillable, missing, shippable]
+
+
+def build(**options):
+    net = ReteNetwork(**options)
+    for production in productions():
+        net.add_production(production)
+    return net
+
+
+def random_facts(rng, size):
+    kinds = ['order', 'stock', 'hold']
+    return [Fact(kind=rng.choice(kinds), item=rng.randrange(5),
+                 shop=rng.choice(['main', 'north']), qty=rng.randrange(4))
+            for _ in range(size)]
+
+
+def random_changes(rng, size, count):
+    """
+    count random (action, index, values) changes to facts made by
+    random_facts(rng, size).
+    """
+    return [(rng.choice(['update', 'remove', 'add']), rng.randrange(size),
+             dict(item=rng.randrange(5), qty=rng.randrange(4)))
+            for _ in range(count)]
+
+
+def apply_change(net, facts, change):
+    """
+    Makes a change from random_changes to the facts of a network. A removed
+    fact is added back by its next change.
+    """
+    action, i, values = change
+    fact = facts[i]
+    if fact.id is None:
+        net.add_fact(fact)
+    elif action == 'update':
+        fact.update(values)
+        net.update_fact(fact)
+    elif action == 'remove':
+        net.remove_fact(fact)
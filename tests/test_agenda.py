@@ -0,0 +1,135 @@
+import asyncio
+
+from reactive_deliberative import Fact, Production, RecencyStrategy, ReteNetwork
+from reactive_deliberative import V
+
+
+def build(size):
+    @Production(Fact(n=V('n')))
+    def rule(n):
+        pass
+
+    net = ReteNetwork(strategy=RecencyStrategy())
+    net.add_production(rule)
+    for n in range(size):
+        net.add_fact(Fact(n=n))
+    return net, rule
+
+
+def number(match):
+    return next(wme.value for wme in match.wmes if wme.attribute == 'n')
+
+
+def test_hold_and_release_keep_one_heap_entry_per_match():
+    net, rule = build(20)
+    agenda = net.agenda
+    activations = agenda.levels[rule.priority][rule.id]
+    for _ in range(100):
+        match = agenda.select()
+        agenda.hold(match)
+        agenda.release(match)
+    assert len(activations.heap) <= len(activations.matches)
+    assert number(agenda.select()) == 19
+
+
+def test_released_matches_keep_their_order():
+    net, rule = build(10)
+    agenda = net.agenda
+    held = [agenda.select()]
+    agenda.hold(held[0])
+    held.append(agenda.select())
+    agenda.hold(held[1])
+    for match in reversed(held):
+        agenda.release(match)
+    order = []
+    while agenda.has_ready():
+        match = agenda.select()
+        order.append(number(match))
+        agenda.remove(match)
+    assert order == list(reversed(range(10)))
+
+
+def test_released_match_survives_its_activations_emptying():
+    net, rule = build(1)
+    agenda = net.agenda
+    match = agenda.select()
+    agenda.hold(match)
+    assert not agenda.has_ready()
+    agenda.release(match)
+    assert agenda.select() is match
+
+
+class ClockedNetwork(ReteNetwork):
+    """
+    A network whose monotonic clock only moves when the test sets it.
+    """
+    clock = 100.0
+
+    @property
+    def now(self):
+        return self.clock
+
+
+def cooling(timeout):
+    fired = []
+
+    @Production(Fact(n=V('n')), timeout=timeout)
+    def rule(n):
+        fired.append(n)
+
+    net = ClockedNetwork()
+    net.add_production(rule)
+    net.add_fact(Fact(n=1))
+    return net, fired
+
+
+def test_cooling_production_leaves_and_returns_to_the_agenda():
+    net, fired = cooling(5)
+    assert net.seconds_until_ready() == 0
+
+    asyncio.run(net.run())
+    assert fired == [1]
+    assert not net.agenda.has_ready()
+    # the match is kept while the production cools down
+    assert len(net.agenda) == 1
+    assert net.seconds_until_ready() == 5
+
+    net.clock += 3
+    asyncio.run(net.run())
+    assert fired == [1]
+    assert net.seconds_until_ready() == 2
+
+    net.clock += 2
+    assert net.seconds_until_ready() == 0
+    assert net.agenda.has_ready()
+    asyncio.run(net.run())
+    assert fired == [1, 1]
+    assert net.seconds_until_ready() == 5
+
+
+def test_seconds_until_ready_reports_the_next_cooldown():
+    net, fired = cooling(5)
+    assert net.seconds_until_ready() == 0
+
+    @Production(Fact(m=V('m')), timeout=2)
+    def short(m):
+        fired.append(m)
+
+    net.add_production(short)
+    net.add_fact(Fact(m=2))
+    asyncio.run(net.run(2))
+    assert sorted(fired) == [1, 2]
+    assert net.seconds_until_ready() == 2
+    net.clock += 2
+    asyncio.run(net.run())
+    assert sorted(fired) == [1, 2, 2]
+    assert net.seconds_until_ready() == 2
+    net.clock += 2
+    assert net.seconds_until_ready() == 0
+
+
+def test_nothing_to_wait_for_without_matches():
+    net, fired = cooling(5)
+    net.remove_fact(next(iter(net.facts.values())))
+    assert net.seconds_until_ready() is None
+    assert net.agenda.next_ready_time() is None
@@ -0,0 +1,59 @@
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.common import WME
+
+CONSTANT = (False, True, True)
+VARIABLE = (False, True, False)
+
+
+def test_removing_a_production_drops_the_masks_it_used():
+    @Production(Fact(kind='a'))
+    def constant():
+        pass
+
+    @Production(Fact(kind='b', n=V('n')))
+    def variable(n):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(constant)
+    keys = net.alpha_keys
+    net.add_production(variable)
+    assert net.alpha_masks == {CONSTANT: 3, VARIABLE: 1}
+    # a mask coming into use compiles the keys again
+    assert net.alpha_keys is not keys
+    assert len(net.alpha_keys(WME('f', 'n', 1))) == 2
+
+    keys = net.alpha_keys
+    net.remove_production(variable)
+    assert net.alpha_masks == {CONSTANT: 2}
+    assert net.alpha_keys is not keys
+    assert net.alpha_keys(WME('f', 'n', 1)) == (('#*#', 'n', 1),)
+
+    # the remaining alpha memories still get their wmes
+    net.add_fact(Fact(kind='a'))
+    net.add_fact(Fact(kind='b', n=1))
+    assert [match.pnode.production for match in net.matches] == [constant]
+    for amem in net.alpha_hash.values():
+        assert amem.items
+
+
+def test_masks_still_in_use_keep_the_compiled_keys():
+    @Production(Fact(kind='a', n=V('n')))
+    def first(n):
+        pass
+
+    @Production(Fact(kind='b', m=V('m')))
+    def second(m):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(first)
+    net.add_production(second)
+    keys = net.alpha_keys
+    net.remove_production(second)
+    assert net.alpha_masks == {CONSTANT: 2, VARIABLE: 1}
+    assert net.alpha_keys is keys
+
+    net.remove_production(first)
+    assert net.alpha_masks == {}
+    assert net.alpha_keys(WME('f', 'n', 1)) == ()
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from helpers import apply_change
+from helpers import build
+from helpers import network_state
+from helpers import random_changes
+from helpers import random_facts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_add_facts_matches_add_fact(seed):
+    sequential, bulk = build(), build()
+    facts = [random_facts(random.Random(seed), 60) for _ in range(2)]
+    for fact in facts[0]:
+        sequential.add_fact(fact)
+    bulk.add_facts(facts[1])
+    assert [fact.id for fact in facts[0]] == [fact.id for fact in facts[1]]
+    assert network_state(sequential) == network_state(bulk)
+
+    # the join nodes are linked and unlinked as if the facts had been
+    # added one by one
+    for change in random_changes(random.Random(seed), 60, 40):
+        apply_change(sequential, facts[0], change)
+        apply_change(bulk, facts[1], change)
+    assert network_state(sequential) == network_state(bulk)
+
+
+def test_add_facts_to_a_network_with_facts():
+    sequential, bulk = build(), build()
+    facts = [random_facts(random.Random(0), 40) for _ in range(2)]
+    for fact in facts[0]:
+        sequential.add_fact(fact)
+    bulk.add_facts(facts[1][:20])
+    bulk.add_facts(facts[1][20:])
+    assert network_state(sequential) == network_state(bulk)
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from helpers import network_state
+from reactive_deliberative import Fact, Production, ReactiveDeliberative, V
+
+
+def engine():
+    rd = ReactiveDeliberative()
+
+    @Production(Fact(level=V('level')) & Fact(kind='limit', max=V('max')))
+    def check(level, max):
+        pass
+
+    rd.add_production(check)
+    return rd
+
+
+def test_restore_into_engine(tmp_path):
+    path = str(tmp_path / 'engine.snapshot')
+
+    async def main():
+        saved = engine()
+        saved.network.add_fact(Fact(kind='limit', max=10))
+        saved.add_fact(5, 'level')
+        saved.network.snapshot(path)
+
+        restored = engine()
+        restored.restore(path)
+        assert restored.network.facts[restored.fact.id] is restored.fact
+        assert restored.fact['level'] == 5
+        assert network_state(restored.network) == network_state(saved.network)
+
+        saved.add_fact(7, 'level')
+        restored.add_fact(7, 'level')
+        assert network_state(restored.network) == network_state(saved.network)
+
+        # a network with facts of its own keeps them, and the engine fact
+        other = engine()
+        other.network.add_fact(Fact(kind='limit', max=3))
+        with pytest.raises(ValueError):
+            other.restore(path)
+        assert other.network.facts[other.fact.id] is other.fact
+        other.add_fact(2, 'level')
+        assert len(list(other.network.matches)) == 1
+        for rd in (saved, restored, other):
+            rd.close()
+
+    asyncio.run(main())
+
+
+def counting(rd):
+    """
+    Counts the passes of the network loop of rd.
+    """
+    calls = []
+    run = rd.network.run
+
+    async def counted(n=1):
+        calls.append(n)
+        await run(n)
+
+    rd.network.run = counted
+    return calls
+
+
+def test_network_loop_waits_instead_of_spinning():
+    async def main():
+        rd = ReactiveDeliberative()
+        fired = []
+
+        @Production(Fact(level=V('level')), timeout=0.2)
+        def watch(level):
+            fired.append(level)
+
+        rd.add_production(watch)
+        calls = counting(rd)
+
+        # nothing to fire: the loop blocks on its event
+        await asyncio.sleep(0.2)
+        assert len(calls) <= 1
+        assert not rd.facts_changed.is_set()
+        assert not rd.task.done()
+
+        # a new fact wakes it up
+        rd.add_fact(1, 'level')
+        await asyncio.sleep(0.05)
+        assert fired == [1]
+        passes = len(calls)
+
+        # while watch cools down the loop sleeps, then it wakes up on its
+        # own when the cooldown expires
+        await asyncio.sleep(0.1)
+        assert fired == [1]
+        assert len(calls) == passes
+        await asyncio.sleep(0.2)
+        assert fired == [1, 1]
+        assert len(calls) <= passes + 2
+        rd.close()
+
+    asyncio.run(main())
+
+
+def test_pools_are_made_when_first_needed():
+    async def main():
+        rd = ReactiveDeliberative()
+        done = asyncio.Event()
+
+        @Production(V('job') << Fact(kind='job'), blocking=True)
+        def work(net, job):
+            net.remove_fact(job)
+
+        @Production(Fact(kind='result'))
+        def report():
+            done.set()
+
+        rd.add_production(work)
+        rd.add_production(report)
+        await asyncio.sleep(0.01)
+        # nothing offloaded yet, no pool to shut down
+        assert rd.executor is None and rd.processes is None
+
+        rd.network.add_fact(Fact(kind='job'))
+        rd.facts_changed.set()
+        for _ in range(100):
+            if not list(rd.network.matches):
+                break
+            await asyncio.sleep(0.01)
+        assert not list(rd.network.matches)
+        executor = rd.executor
+        assert executor is not None and rd.processes is None
+        rd.close()
+        assert executor._shutdown
+
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from helpers import apply_change
+from helpers import build
+from helpers import network_state
+from helpers import random_changes
+from helpers import random_facts
+from reactive_deliberative import Fact
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_joins_match_scanning_joins(seed):
+    nets = [build(indexing=True), build(indexing=False)]
+    facts = [random_facts(random.Random(seed), 40) for _ in nets]
+    for net, net_facts in zip(nets, facts):
+        for fact in net_facts:
+            net.add_fact(fact)
+    assert network_state(nets[0]) == network_state(nets[1])
+
+    changes = random_changes(random.Random(seed), 40, 60)
+    for step, change in enumerate(changes):
+        for net, net_facts in zip(nets, facts):
+            apply_change(net, net_facts, change)
+        if step % 10 == 9:
+            assert network_state(nets[0]) == network_state(nets[1])
+
+
+def test_indexed_join_finds_every_pair():
+    net = build(indexing=True)
+    orders = [Fact(kind='order', item=i % 7, qty=1, shop='main')
+              for i in range(30)]
+    stocks = [Fact(kind='stock', item=i % 5, qty=1, shop='north')
+              for i in range(20)]
+    for fact in orders + stocks:
+        net.add_fact(fact)
+    fillable = {(match.wmes[0].identifier, match.wmes[-1].identifier)
+                for match in net.agenda
+                if match.pnode.production.__name__ == 'fillable'}
+    # the wmes of a match are the ones of its conditions, the last joined
+    # one is the qty of the stock
+    expected = {(order.id, stock.id) for order in orders for stock in stocks
+                if order['item'] == stock['item']}
+    assert fillable == expected
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from helpers import apply_change
+from helpers import build
+from helpers import network_state
+from helpers import productions
+from helpers import random_changes
+from helpers import random_facts
+from reactive_deliberative import ReteNetwork
+
+
+@pytest.mark.parametrize('indexing', [True, False])
+@pytest.mark.parametrize('seed', range(4))
+def test_productions_added_after_facts_match_as_if_added_before(seed,
+                                                                indexing):
+    early = build(indexing=indexing)
+    late = ReteNetwork(indexing=indexing)
+    # the first production shares the join of the others, which are added
+    # once the network is populated
+    first, *rest = productions()
+    late.add_production(first)
+    facts = [random_facts(random.Random(seed), 60) for _ in range(2)]
+    for fact in facts[0]:
+        early.add_fact(fact)
+    for fact in facts[1]:
+        late.add_fact(fact)
+    # churn, so memories hold the tokens of facts changed in place
+    for change in random_changes(random.Random(seed), 60, 40):
+        apply_change(early, facts[0], change)
+        apply_change(late, facts[1], change)
+    for production in rest:
+        late.add_production(production)
+    assert network_state(late) == network_state(early)
+
+    # the new nodes are linked and unlinked as if they had been there
+    for change in random_changes(random.Random(seed + 100), 60, 40):
+        apply_change(early, facts[0], change)
+        apply_change(late, facts[1], change)
+    assert network_state(late) == network_state(early)
+
+
+def test_productions_added_to_a_bulk_loaded_network():
+    early, late = build(), ReteNetwork()
+    facts = [random_facts(random.Random(9), 80) for _ in range(2)]
+    early.add_facts(facts[0])
+    late.add_facts(facts[1])
+    for production in productions():
+        late.add_production(production)
+    assert network_state(late) == network_state(early)
@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+@Production(V('order') << Fact(kind='order', state='new'), process=True)
+def ship(net, order):
+    order['state'] = 'shipped'
+    net.update_fact(order)
+    customer = order['customer']
+    customer['orders'] += 1
+    net.update_fact(customer)
+
+
+def test_process_changes_keep_nested_facts():
+    net = ReteNetwork()
+    net.add_production(ship)
+    customer = Fact(kind='customer', orders=0)
+    order = Fact(kind='order', state='new', customer=customer)
+    net.add_fact(order)
+    with ProcessPoolExecutor(1) as processes:
+        net.offloader.processes = processes
+        asyncio.run(net.run())
+    net.remove_production(ship)
+
+    assert order['state'] == 'shipped'
+    assert order['customer'] is customer
+    assert customer['orders'] == 1
+    assert net.facts[customer.id] is customer
+    assert {(wme.attribute, wme.value)
+            for wme in net.working_memory.by_identifier(customer.id)} >= {
+        ('orders', 1)}
+
+
+def test_blocking_functions_change_copies():
+    net = ReteNetwork()
+    seen = {}
+
+    @Production(V('order') << Fact(kind='order', state='new'), blocking=True)
+    def pack(net, order):
+        seen['copy'] = order
+        order['state'] = 'packed'
+        seen['state'] = live['state']
+        net.update_fact(order)
+        try:
+            net.facts
+        except AttributeError:
+            seen['read'] = False
+
+    live = Fact(kind='order', state='new')
+    net.add_production(pack)
+    net.add_fact(live)
+    asyncio.run(net.run())
+
+    assert seen == {'copy': seen['copy'], 'state': 'new', 'read': False}
+    assert seen['copy'] is not live
+    assert live['state'] == 'packed'
+    assert not list(net.matches)
+
+
+def test_process_pool_is_made_when_first_needed():
+    net = ReteNetwork()
+    made = []
+
+    def make_processes():
+        made.append(ProcessPoolExecutor(1))
+        return made[-1]
+
+    net.offloader.make_processes = make_processes
+    net.add_production(ship)
+    try:
+        customer = Fact(kind='customer', orders=0)
+        net.add_fact(Fact(kind='order', state='done', customer=customer))
+        asyncio.run(net.run())
+        assert made == []
+
+        net.add_fact(Fact(kind='order', state='new', customer=customer))
+        net.add_fact(Fact(kind='order', state='new', customer=customer))
+        asyncio.run(net.run(2))
+        assert len(made) == 1
+        assert net.offloader.processes is made[0]
+        assert customer['orders'] == 2
+    finally:
+        net.remove_production(ship)
+        for processes in made:
+            processes.shutdown()
@@ -0,0 +1,73 @@
+import pytest
+
+from reactive_deliberative.py_rete.ordered_set import LinkedSet
+from reactive_deliberative.py_rete.ordered_set import OrderedSet
+
+
+def test_ordered_set_keeps_insertion_order():
+    items = OrderedSet([3, 1, 2])
+    items.append(1)
+    items.append(4)
+    assert list(items) == [3, 1, 2, 4]
+    assert items.first() == 3
+    items.remove(3)
+    items.discard(3)
+    assert items.first() == 1
+    assert items.pop_last() == 4
+    assert list(items) == [1, 2]
+    with pytest.raises(KeyError):
+        items.remove(5)
+    with pytest.raises(IndexError):
+        OrderedSet().first()
+
+
+def test_linked_set_inserts_first_and_after():
+    items = LinkedSet([1, 2, 3])
+    items.insert_first(0)
+    items.insert_after(1, 'a')
+    # appending or inserting an item already there does nothing
+    items.append(2)
+    items.insert_first(3)
+    assert list(items) == [0, 1, 'a', 2, 3]
+    assert list(reversed(items)) == [3, 2, 'a', 1, 0]
+    assert items.first() == 0
+    with pytest.raises(KeyError):
+        items.remove('b')
+    with pytest.raises(IndexError):
+        LinkedSet().first()
+
+
+def test_linked_set_insert_after_a_missing_anchor_inserts_first():
+    items = LinkedSet([1, 2])
+    items.insert_after('missing', 0)
+    items.insert_after(None, -1)
+    assert list(items) == [-1, 0, 1, 2]
+
+
+def test_linked_set_iteration_tolerates_removing_the_current_item():
+    items = LinkedSet(range(5))
+    seen = []
+    for item in items:
+        seen.append(item)
+        items.remove(item)
+    assert seen == [0, 1, 2, 3, 4]
+    assert not items
+
+    items = LinkedSet(range(5))
+    seen = []
+    for item in reversed(items):
+        seen.append(item)
+        if item % 2:
+            items.remove(item)
+    assert seen == [4, 3, 2, 1, 0]
+    assert list(items) == [0, 2, 4]
+
+
+def test_linked_set_iteration_visits_appended_items():
+    items = LinkedSet([0])
+    seen = []
+    for item in items:
+        seen.append(item)
+        if item < 3:
+            items.append(item + 1)
+    assert seen == [0, 1, 2, 3]
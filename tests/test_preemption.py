@@ -0,0 +1,95 @@
+import asyncio
+
+from reactive_deliberative.py_rete.preemption import Preemption
+
+
+def test_preemptors_go_ahead_of_holders():
+    order = []
+
+    async def main():
+        preemption = Preemption()
+        started = asyncio.Event()
+
+        async def fire():
+            async with preemption.hold():
+                started.set()
+                for _ in range(5):
+                    await preemption.checkpoint()
+                order.append('fire')
+
+        async def hold():
+            async with preemption.hold():
+                order.append('hold')
+
+        async def preempt():
+            async with preemption.preempt():
+                order.append('preempt')
+
+        firing = asyncio.create_task(fire())
+        await started.wait()
+        holding = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        await asyncio.wait_for(
+            asyncio.gather(firing, holding, preempt()), 5)
+        assert not preemption.lock.locked()
+
+    asyncio.run(main())
+    # the firing gets the lock back before the task waiting in hold
+    assert order == ['preempt', 'fire', 'hold']
+
+
+def test_holder_queued_during_a_checkpoint_waits_for_the_firing():
+    order = []
+
+    async def main():
+        preemption = Preemption()
+        started = asyncio.Event()
+
+        async def fire():
+            async with preemption.hold():
+                started.set()
+                for step in range(5):
+                    order.append(step)
+                    # a long step, other tasks get to run
+                    await asyncio.sleep(0.01)
+                    await preemption.checkpoint()
+
+        async def hold():
+            async with preemption.hold():
+                order.append('hold')
+
+        async def preempt(name, spawn=False):
+            async with preemption.preempt():
+                order.append(name)
+                if spawn:
+                    # queued while the firing is parked at its checkpoint
+                    return asyncio.create_task(hold())
+
+        firing = asyncio.create_task(fire())
+        await started.wait()
+        holding = await asyncio.wait_for(preempt('first', spawn=True), 5)
+        # the firing is preempted again with the holder still waiting
+        await asyncio.wait_for(preempt('second'), 5)
+        await asyncio.wait_for(asyncio.gather(firing, holding), 5)
+        assert not preemption.lock.locked()
+        assert not preemption.hold_queue
+
+    asyncio.run(main())
+    assert order[-1] == 'hold'
+    assert [step for step in order if isinstance(step, int)] == \
+        list(range(5))
+    assert order.index('first') < order.index('second') < order.index(4)
+
+
+def test_cancelled_waiters_leave_the_lock():
+    async def main():
+        preemption = Preemption()
+        async with preemption.hold():
+            waiter = asyncio.create_task(preemption.preempt().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+        assert not preemption.lock.locked()
+        assert not preemption.preempt_queue and not preemption.waiting
+
+    asyncio.run(main())
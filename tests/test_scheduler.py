@@ -0,0 +1,119 @@
+import asyncio
+
+from reactive_deliberative import Fact, Production, ReteNetwork, Scheduler, V
+
+
+def run(net, limit):
+    asyncio.run(asyncio.wait_for(Scheduler(net, limit).run(), 5))
+
+
+def counting_network(writes):
+    """
+    A production whose matches each handle an order and add one to a
+    counter fact that is not in their match, awaiting in between.
+    """
+    counter = Fact(kind='counter', count=0)
+    overlap = []
+    running = []
+
+    @Production(V('order') << Fact(kind='order', state='new'),
+                writes=writes(counter))
+    async def count(net, order):
+        running.append(order)
+        overlap.append(len(running))
+        count = counter['count']
+        await asyncio.sleep(0.001)
+        counter['count'] = count + 1
+        net.update_fact(counter)
+        order['state'] = 'done'
+        net.update_fact(order)
+        running.remove(order)
+
+    net = ReteNetwork()
+    net.add_production(count)
+    net.add_fact(counter)
+    for _ in range(5):
+        net.add_fact(Fact(kind='order', state='new'))
+    return net, counter, overlap
+
+
+def test_writes_to_facts_outside_the_match_can_be_declared():
+    def writes(counter):
+        return lambda match: [(match.wmes[0].identifier, 'state'),
+                              (counter.id, 'count')]
+
+    net, counter, overlap = counting_network(writes)
+    run(net, 5)
+    assert counter['count'] == 5
+    assert max(overlap) == 1
+
+
+def test_undeclared_writes_are_not_protected():
+    net, counter, overlap = counting_network(lambda counter: ('state',))
+    run(net, 5)
+    assert max(overlap) == 5
+    assert counter['count'] < 5
+
+
+def test_matches_writing_the_same_facts_do_not_overlap():
+    running = []
+    overlap = []
+
+    @Production(V('a') << Fact(kind='a', n=V('n'), state='new') &
+                V('b') << Fact(kind='b', n=V('n')), writes=('state',))
+    async def pair(net, a, b):
+        running.append(a)
+        overlap.append(len(running))
+        await asyncio.sleep(0.001)
+        a['state'] = 'done'
+        net.update_fact(a)
+        running.remove(a)
+
+    net = ReteNetwork()
+    net.add_production(pair)
+    net.add_fact(Fact(kind='b', n=0))
+    for _ in range(3):
+        net.add_fact(Fact(kind='a', n=0, state='new'))
+    run(net, 3)
+    assert overlap == [1, 1, 1]
+
+
+def test_done_firing_releases_only_the_matches_it_blocked():
+    gates = {'x': asyncio.Event(), 'y': asyncio.Event()}
+    fired = []
+
+    @Production(V('job') << Fact(kind='job', n=V('n'), target=V('target')),
+                writes=lambda match: [(match.token.binding[V('target')],
+                                       'value')])
+    async def work(net, job, n, target):
+        fired.append(n)
+        await gates[target].wait()
+        net.remove_fact(job)
+
+    async def main():
+        net = ReteNetwork()
+        net.add_production(work)
+        for n, target in enumerate('xxyy'):
+            net.add_fact(Fact(kind='job', n=n, target=target))
+        scheduler = Scheduler(net, 4)
+        scheduler.start()
+        assert len(scheduler) == 2
+        assert net.stats.counts['blocked'] == 2
+
+        # the jobs of y are done, the one waiting on x stays blocked
+        gates['y'].set()
+        while len(fired) < 3:
+            await asyncio.sleep(0)
+            scheduler.start()
+        await asyncio.sleep(0.01)
+        blocked = [match.token.binding[V('target')]
+                   for match, writes in scheduler.blocked]
+        assert blocked == ['x']
+        assert net.stats.counts['blocked'] == 2
+
+        gates['x'].set()
+        await asyncio.wait_for(scheduler.run(), 5)
+        assert sorted(fired) == [0, 1, 2, 3]
+        assert not scheduler.blocked
+
+    asyncio.run(main())
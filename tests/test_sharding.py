@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.sharding import ShardedNetwork
+
+PATTERN = (Fact(kind='a', k=V('k'), n=V('n')) &
+           Fact(kind='b', k=V('k'), m=V('m')))
+
+
+@Production(PATTERN)
+def pair(k, n, m):
+    pass
+
+
+@Production(V('order') << Fact(kind='order'), blocking=True)
+def save(order):
+    pass
+
+
+def facts():
+    return ([Fact(kind='a', k=i % 30, n=i) for i in range(60)] +
+            [Fact(kind='b', k=i % 45, m=i) for i in range(90)])
+
+
+def test_sharded_joins_match_one_network():
+    net = ReteNetwork()
+    net.add_production(Production(PATTERN)(pair.__wrapped__))
+    net.add_facts(facts())
+    expected = len(net.agenda)
+    assert expected == 30 * 2 * 2
+
+    with ShardedNetwork([pair], partition=lambda fact: fact['k'],
+                        shards=3) as sharded:
+        sharded.add_facts(facts())
+        assert len(sharded) == expected
+        asyncio.run(sharded.run(5))
+        assert len(sharded) == expected
+
+
+def test_offloaded_productions_are_rejected():
+    with pytest.raises(ValueError):
+        ShardedNetwork([save], partition=lambda fact: fact['kind'])
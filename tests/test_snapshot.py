@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from helpers import apply_change
+from helpers import build
+from helpers import describe
+from helpers import live_tokens
+from helpers import network_state
+from helpers import productions
+from helpers import random_changes
+from helpers import random_facts
+from reactive_deliberative import Fact, ReteNetwork
+
+
+def agenda(net):
+    return [(match.pnode.production.id, describe(match.token))
+            for match in net.agenda]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_restore_matches_saved_network(seed, tmp_path):
+    path = str(tmp_path / 'network.snapshot')
+    saved = build()
+    facts = random_facts(random.Random(seed), 40)
+    saved.add_facts(facts)
+    saved.snapshot(path)
+
+    restored = build()
+    restored.restore(path)
+    assert network_state(restored) == network_state(saved)
+    assert agenda(restored) == agenda(saved)
+
+    copies = [restored.facts[fact.id] for fact in facts]
+    for change in random_changes(random.Random(seed), 40, 80):
+        apply_change(saved, facts, change)
+        apply_change(restored, copies, change)
+    assert sorted(restored.facts) == sorted(saved.facts)
+    assert network_state(restored) == network_state(saved)
+    assert agenda(restored) == agenda(saved)
+
+
+def test_restore_counts_only_the_live_tokens(tmp_path):
+    path = str(tmp_path / 'network.snapshot')
+    saved = build()
+    saved.add_facts(random_facts(random.Random(3), 60))
+    saved.snapshot(path)
+
+    # shippable has an ncc, whose partner results are not counted
+    restored = build()
+    restored.restore(path)
+    counts = restored.stats.counts
+    assert counts['tokens'] - counts['tokens_released'] == \
+        live_tokens(restored)
+
+
+def test_restore_checks_the_network(tmp_path):
+    path = str(tmp_path / 'network.snapshot')
+    saved = build()
+    saved.add_facts(random_facts(random.Random(0), 10))
+    saved.snapshot(path)
+
+    other = ReteNetwork()
+    for production in productions()[:2]:
+        other.add_production(production)
+    with pytest.raises(ValueError):
+        other.restore(path)
+
+    used = build()
+    used.add_fact(Fact(kind='order', item=1, shop='main', qty=1))
+    with pytest.raises(ValueError):
+        used.restore(path)
@@ -0,0 +1,139 @@
+import pytest
+
+from reactive_deliberative import Fact, Filter, LexStrategy, MeaStrategy
+from reactive_deliberative import Production
+from reactive_deliberative import RandomStrategy, RecencyStrategy, ReteNetwork
+from reactive_deliberative import Strategy, V
+
+
+def pair_network(strategy):
+    """
+    A network matching every pair of an a fact and a b fact, given
+    a1, a2, b1, b2 in that order.
+    """
+    @Production(Fact(a=V('a')) & Fact(b=V('b')))
+    def pair(a, b):
+        pass
+
+    net = ReteNetwork(strategy=strategy)
+    net.add_production(pair)
+    for fact in (Fact(a=1), Fact(a=2), Fact(b=1), Fact(b=2)):
+        net.add_fact(fact)
+    return net
+
+
+def values(match):
+    return tuple(wme.value for wme in match.wmes
+                 if wme.attribute in ('a', 'b', 'n'))
+
+
+def drain(net):
+    """
+    Selects and removes every match of the agenda, returns their values in
+    the order they were selected.
+    """
+    order = []
+    while net.agenda.has_ready():
+        match = net.agenda.select()
+        order.append(values(match))
+        net.agenda.remove(match)
+    return order
+
+
+def test_strategy_needs_a_key():
+    class Unkeyed(Strategy):
+        pass
+
+    with pytest.raises(TypeError):
+        Unkeyed()
+
+
+def test_recency_fires_the_most_recent_match_first():
+    @Production(Fact(n=V('n')))
+    def rule(n):
+        pass
+
+    net = ReteNetwork(strategy=RecencyStrategy())
+    net.add_production(rule)
+    facts = [Fact(n=n) for n in range(5)]
+    for fact in facts:
+        net.add_fact(fact)
+    # a changed fact is a new match, and the most recent one
+    facts[1]['n'] = 10
+    net.update_fact(facts[1])
+    assert drain(net) == [(10,), (4,), (3,), (2,), (0,)]
+
+
+def test_lex_compares_the_sorted_timetags():
+    net = pair_network(LexStrategy())
+    # both matches of b2 come first, then a2 breaks the tie with a1
+    assert drain(net) == [(2, 2), (1, 2), (2, 1), (1, 1)]
+
+
+def test_lex_prefers_the_more_specific_of_equal_matches():
+    @Production(Fact(a=V('a')))
+    def general(a):
+        pass
+
+    @Production(Fact(a=V('a')) & Filter(lambda a: a > 0))
+    def specific(a):
+        pass
+
+    net = ReteNetwork(strategy=LexStrategy())
+    net.add_production(general)
+    net.add_fact(Fact(a=1))
+    net.add_production(specific)
+    first, second = sorted(net.agenda, key=lambda match: match.seq)
+    # same wmes, and the match of general is older
+    assert first.pnode.production is general
+    assert first.wmes == second.wmes
+    assert net.agenda.select() is second
+
+
+def test_mea_compares_the_first_condition_first():
+    net = pair_network(MeaStrategy())
+    # the matches of a2 come first, then LEX orders them
+    assert drain(net) == [(2, 2), (2, 1), (1, 2), (1, 1)]
+
+
+def test_seeded_random_strategy_is_reproducible():
+    orders = [drain(pair_network(RandomStrategy(seed)))
+              for seed in (7, 7, 8)]
+    assert orders[0] == orders[1]
+    assert sorted(orders[0]) == sorted(orders[2]) == \
+        [(1, 1), (1, 2), (2, 1), (2, 2)]
+
+
+def test_selection_follows_priority_levels_and_holds():
+    @Production(Fact(n=V('n')), priority=2)
+    def urgent(n):
+        pass
+
+    @Production(Fact(n=V('n')))
+    def normal(n):
+        pass
+
+    net = ReteNetwork(strategy=RecencyStrategy())
+    net.add_production(urgent)
+    net.add_production(normal)
+    net.add_fact(Fact(n=1))
+    net.add_fact(Fact(n=2))
+    agenda = net.agenda
+
+    # the higher priority level is drained first, most recent first
+    first = agenda.select()
+    assert first.pnode.production is urgent and values(first) == (2,)
+    agenda.hold(first)
+    second = agenda.select()
+    assert second.pnode.production is urgent and values(second) == (1,)
+    agenda.hold(second)
+    # with the level held, the lower one is used
+    third = agenda.select()
+    assert third.pnode.production is normal and values(third) == (2,)
+
+    # released matches get their place back
+    agenda.release(second)
+    assert agenda.select() is second
+    agenda.release(first)
+    assert agenda.select() is first
+    assert len(agenda) == 4
@@ -0,0 +1,170 @@
+import gc
+import random
+
+from helpers import apply_change
+from helpers import build
+from helpers import live_tokens
+from helpers import network_state
+from helpers import random_changes
+from helpers import random_facts
+from reactive_deliberative import Fact, Filter, Production, ReteNetwork, V
+from reactive_deliberative.py_rete.beta import BetaMemory
+from reactive_deliberative.py_rete.common import NO_ITEMS
+
+
+def test_churn_leaves_the_tokens_of_the_final_facts():
+    churned = build()
+    facts = random_facts(random.Random(1), 40)
+    for fact in facts:
+        churned.add_fact(fact)
+    for change in random_changes(random.Random(1), 40, 200):
+        apply_change(churned, facts, change)
+
+    fresh = build()
+    copies = [fact.duplicate() for fact in facts if fact.id is not None]
+    for copy in copies:
+        fresh.add_fact(copy)
+    # the facts get other ids in the fresh network
+    kept = [fact for fact in facts if fact.id is not None]
+    assert network_state(churned, {fact.id: i for i, fact in
+                                   enumerate(kept)}) == \
+        network_state(fresh, {copy.id: i for i, copy in enumerate(copies)})
+
+    counts = churned.stats.counts
+    assert counts['tokens'] - counts['tokens_released'] == live_tokens(churned)
+
+
+def test_tokens_allocate_their_sets_lazily():
+    net = build()
+    for fact in random_facts(random.Random(2), 30):
+        net.add_fact(fact)
+    for node in net.beta_nodes():
+        if isinstance(node, BetaMemory):
+            for token in node.items:
+                if not node.children:
+                    assert token.children is NO_ITEMS
+                assert (token.join_results is NO_ITEMS) == (
+                    type(node).__name__ != 'NegativeNode')
+
+
+def test_pooled_churn_matches_a_fresh_network():
+    pooled = build(pooling=True)
+    facts = random_facts(random.Random(3), 40)
+    for fact in facts:
+        pooled.add_fact(fact)
+    for change in random_changes(random.Random(3), 40, 200):
+        apply_change(pooled, facts, change)
+
+    counts = pooled.stats.counts
+    assert counts['tokens_reused'] > 0
+    assert counts['tokens'] - counts['tokens_released'] == live_tokens(pooled)
+
+    fresh = build()
+    copies = [fact.duplicate() for fact in facts if fact.id is not None]
+    for copy in copies:
+        fresh.add_fact(copy)
+    kept = [fact for fact in facts if fact.id is not None]
+    assert network_state(pooled, {fact.id: i for i, fact in
+                                  enumerate(kept)}) == \
+        network_state(fresh, {copy.id: i for i, copy in enumerate(copies)})
+
+
+def test_pooled_tokens_are_reused_without_stale_state():
+    net = build(pooling=True)
+    order = Fact(kind='order', item=1, shop='main', qty=1)
+    stock = Fact(kind='stock', item=1, shop='main', qty=2)
+    net.add_facts([order, stock])
+    deleted = [token for node in net.beta_nodes()
+               if isinstance(node, BetaMemory) for token in node.items
+               if order.id in {wme.identifier for wme in token.wmes
+                               if wme is not None}]
+    assert deleted
+    net.remove_fact(order)
+    free = net.token_factory.free
+    assert {id(token) for token in deleted} <= {id(token) for token in free}
+    for token in free:
+        assert token.children is NO_ITEMS
+        assert token.join_results is NO_ITEMS
+        assert token.ncc_results is NO_ITEMS
+        assert token.parent is token.wme is token.node is None
+        assert token.owner is token.binding is token._wmes is None
+
+    other = Fact(kind='order', item=1, shop='north', qty=9)
+    net.add_fact(other)
+    reused = [token for node in net.beta_nodes()
+              if isinstance(node, BetaMemory) for token in node.items
+              if any(token is old for old in deleted)]
+    assert reused
+    for token in reused:
+        # the cached wmes and the binding are those of the new match
+        wmes = []
+        t = token
+        while t.parent is not None:
+            wmes.append(t.wme)
+            t = t.parent
+        assert token.wmes == tuple(reversed(wmes))
+        assert order.id not in {wme.identifier for wme in token.wmes
+                                if wme is not None}
+        for v, value in token.binding.items():
+            if v.name == 'shop':
+                assert value == 'north'
+        if token.children is not NO_ITEMS:
+            assert all(child.parent is token for child in token.children)
+
+    fresh = build()
+    copies = [stock.duplicate(), other.duplicate()]
+    fresh.add_facts(copies)
+    assert network_state(net, {stock.id: 'stock', other.id: 'order'}) == \
+        network_state(fresh, {copies[0].id: 'stock', copies[1].id: 'order'})
+
+
+def test_turning_pooling_off_empties_the_free_list():
+    net = build(pooling=True)
+    fact = Fact(kind='order', item=1, shop='main', qty=1)
+    net.add_fact(fact)
+    net.remove_fact(fact)
+    assert len(net.token_factory)
+    net.pooling = False
+    assert not len(net.token_factory)
+
+
+def watching(seen, **options):
+    """
+    A network whose filter records whether the collector is enabled each
+    time a change reaches it.
+    """
+    @Production(Fact(kind='order', qty=V('qty')) &
+                Filter(lambda qty: seen.append(gc.isenabled()) or True))
+    def watched(qty):
+        pass
+
+    net = ReteNetwork(**options)
+    net.add_production(watched)
+    return net
+
+
+def test_collector_is_paused_while_changes_propagate():
+    assert gc.isenabled()
+    for pause_gc in (False, True):
+        seen = []
+        net = watching(seen, pause_gc=pause_gc)
+        fact = Fact(kind='order', qty=1)
+        net.add_facts([fact])
+        fact['qty'] = 2
+        net.update_fact(fact)
+        with net.transaction():
+            net.add_fact(Fact(kind='order', qty=3))
+        net.add_fact(Fact(kind='order', qty=4))
+        assert seen == [not pause_gc] * 4
+        assert gc.isenabled()
+
+    # an already disabled collector stays disabled
+    gc.disable()
+    try:
+        seen = []
+        net = watching(seen, pause_gc=True)
+        net.add_fact(Fact(kind='order', qty=1))
+        assert seen == [False]
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
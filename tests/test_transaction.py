@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from helpers import apply_change
+from helpers import build
+from helpers import network_state
+from helpers import random_changes
+from helpers import random_facts
+from reactive_deliberative import Fact
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_transaction_matches_plain_changes(seed):
+    plain, batched = build(), build()
+    facts = [random_facts(random.Random(seed), 30) for _ in range(2)]
+    for fact in facts[0]:
+        plain.add_fact(fact)
+    with batched.transaction():
+        for fact in facts[1]:
+            batched.add_fact(fact)
+    assert network_state(plain) == network_state(batched)
+
+    changes = random_changes(random.Random(seed), 30, 80)
+    for batch in range(0, len(changes), 20):
+        for change in changes[batch:batch + 20]:
+            apply_change(plain, facts[0], change)
+        with batched.transaction():
+            for change in changes[batch:batch + 20]:
+                apply_change(batched, facts[1], change)
+        assert network_state(plain) == network_state(batched)
+
+
+def test_add_and_remove_in_a_transaction_cancel_out():
+    net = build()
+    order = Fact(kind='order', item=1, shop='main', qty=1)
+    net.add_fact(order)
+    before = network_state(net)
+    tokens = net.stats.counts['tokens']
+    with net.transaction():
+        stock = Fact(kind='stock', item=1, shop='main', qty=2)
+        net.add_fact(stock)
+        net.remove_fact(stock)
+        with net.transaction():
+            order['qty'] = 3
+            net.update_fact(order)
+        order['qty'] = 1
+        net.update_fact(order)
+    assert network_state(net) == before
+    assert net.stats.counts['tokens'] == tokens
+
+
+def test_transaction_propagates_changes_made_before_an_error():
+    plain, batched = build(), build()
+    plain.add_fact(Fact(kind='order', item=1, shop='main', qty=1))
+    with pytest.raises(RuntimeError):
+        with batched.transaction():
+            batched.add_fact(Fact(kind='order', item=1, shop='main', qty=1))
+            raise RuntimeError
+    assert not batched.in_transaction
+    assert network_state(plain) == network_state(batched)
@@ -0,0 +1,251 @@
+import asyncio
+
+import pytest
+
+from reactive_deliberative import EventTrigger, Fact, FactTrigger
+from reactive_deliberative import FileTrigger, PollTrigger, QueueTrigger
+from reactive_deliberative import ReactiveDeliberative, Trigger, V
+
+
+def test_trigger_needs_a_wait():
+    class Waitless(Trigger):
+        pass
+
+    with pytest.raises(TypeError):
+        Waitless()
+
+
+def test_poll_trigger_needs_a_positive_interval():
+    async def predicate():
+        return False
+
+    assert PollTrigger(predicate).interval > 0
+    with pytest.raises(ValueError):
+        PollTrigger(predicate, interval=0)
+
+
+def test_reactive_action_polls_at_its_interval():
+    calls = []
+    done = []
+
+    async def predicate():
+        calls.append(1)
+        return len(calls) == 3
+
+    async def action():
+        done.append(1)
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            trigger = rd.add_reactive_action(predicate, action, force=False,
+                                             interval=0.02)
+            await asyncio.sleep(0.1)
+            assert trigger.interval == 0.02
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+    # about 5 calls in 0.1 s, a busy loop would make thousands
+    assert 3 <= len(calls) <= 8
+    assert done == [1]
+
+
+def test_predicate_that_stays_true_is_polled_at_its_interval():
+    calls = []
+    done = []
+
+    async def predicate():
+        calls.append(1)
+        # yields, so a busy loop fails the test instead of hanging it
+        await asyncio.sleep(0)
+        return True
+
+    async def action():
+        done.append(1)
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            rd.add_reactive_action(predicate, action, force=False,
+                                   interval=0.02)
+            await asyncio.sleep(0.1)
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+    # one call and one action per interval, not a busy loop
+    assert 3 <= len(calls) <= 8
+    assert len(done) == len(calls)
+
+
+def test_fact_trigger_fires_once_per_new_match():
+    calls = []
+
+    def alert(level, net, wmes):
+        calls.append((level, len(wmes)))
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            rd.add_trigger(FactTrigger(Fact(kind='alarm', level=V('level'))),
+                           alert)
+            alarm = Fact(kind='alarm', level=1, note='a')
+            rd.network.add_fact(alarm)
+            await asyncio.sleep(0.01)
+            assert calls == [(1, 3)]
+
+            # the match is kept, it does not fire again
+            alarm['note'] = 'b'
+            rd.network.update_fact(alarm)
+            await asyncio.sleep(0.01)
+            assert calls == [(1, 3)]
+
+            rd.network.add_fact(Fact(kind='alarm', level=2))
+            alarm['level'] = 3
+            rd.network.update_fact(alarm)
+            await asyncio.sleep(0.01)
+            assert sorted(calls) == [(1, 3), (2, 3), (3, 3)]
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+
+
+def test_fact_trigger_drops_matches_retracted_before_dispatch():
+    calls = []
+
+    def alert(level, net, wmes):
+        calls.append(level)
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            # retracted before the trigger waits for it
+            rd.add_trigger(FactTrigger(Fact(kind='alarm', level=V('level'))),
+                           alert)
+            alarm = Fact(kind='alarm', level=1)
+            rd.network.add_fact(alarm)
+            rd.network.remove_fact(alarm)
+            await asyncio.sleep(0.01)
+            assert calls == []
+
+            # retracted between the wait and the dispatch
+            trigger = FactTrigger(Fact(kind='alarm', level=V('level')))
+            trigger.attach(rd, alert)
+            alarm = Fact(kind='alarm', level=2)
+            rd.network.add_fact(alarm)
+            since, args = await trigger.wait()
+            rd.network.remove_fact(alarm)
+            await trigger.fire(args)
+            assert calls == []
+            trigger.detach(rd)
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+
+
+def test_event_trigger_fires_each_time_the_event_is_set():
+    calls = []
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            event = asyncio.Event()
+            rd.add_trigger(EventTrigger(event), lambda: calls.append(1))
+            await asyncio.sleep(0.01)
+            assert calls == []
+            for _ in range(2):
+                event.set()
+                await asyncio.sleep(0.01)
+            assert calls == [1, 1]
+            assert not event.is_set()
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+
+
+def test_queue_trigger_delivers_each_item():
+    items = []
+
+    async def handle(item):
+        items.append(item)
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            queue = asyncio.Queue()
+            rd.add_trigger(QueueTrigger(queue), handle)
+            for item in ('a', 'b', 'c'):
+                queue.put_nowait(item)
+            # every item is marked done once handled
+            await asyncio.wait_for(queue.join(), 1)
+            assert items == ['a', 'b', 'c']
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+
+
+def test_file_trigger_reports_existing_and_modified_files(tmp_path):
+    seen = {True: [], False: []}
+    old = tmp_path / 'old.txt'
+    old.write_text('a')
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            for existing in (True, False):
+                rd.add_trigger(FileTrigger(str(tmp_path), interval=0.01,
+                                           existing=existing),
+                               seen[existing].append)
+            await asyncio.sleep(0.05)
+            assert seen[True] == [[str(old)]]
+            assert seen[False] == []
+
+            new = tmp_path / 'new.txt'
+            new.write_text('b')
+            await asyncio.sleep(0.05)
+            old.write_text('changed')
+            await asyncio.sleep(0.05)
+            for existing in (True, False):
+                assert seen[existing][-2:] == [[str(new)], [str(old)]]
+        finally:
+            rd.close()
+
+    asyncio.run(main())
+
+
+def test_remove_trigger_detaches_it():
+    calls = []
+
+    def alert(level, net, wmes):
+        calls.append(level)
+
+    async def main():
+        rd = ReactiveDeliberative()
+        try:
+            facts = FactTrigger(Fact(kind='alarm', level=V('level')))
+            rd.add_trigger(facts, alert)
+            event = asyncio.Event()
+            rd.add_trigger(EventTrigger(event), lambda: calls.append('set'))
+            production = facts.production
+            assert production in rd.network.productions
+
+            rd.remove_trigger(facts)
+            assert production not in rd.network.productions
+            assert facts.production is None
+            rd.network.add_fact(Fact(kind='alarm', level=1))
+
+            trigger, = rd.triggers
+            rd.remove_trigger(trigger)
+            assert not rd.triggers and not rd.reactive_tasks
+            event.set()
+            await asyncio.sleep(0.01)
+            assert calls == []
+        finally:
+            rd.close()
+
+    asyncio.run(main())
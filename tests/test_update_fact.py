@@ -0,0 +1,111 @@
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def build():
+    @Production(Fact(kind='order', item=V('item')) &
+                Fact(kind='stock', item=V('item'), qty=V('qty')))
+    def stocked(item, qty):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(stocked)
+    order = Fact(kind='order', item=1, note='first')
+    stock = Fact(kind='stock', item=1, qty=3)
+    net.add_fact(order)
+    net.add_fact(stock)
+    return net, order, stock
+
+
+def tokens(net):
+    return [match.token for match in net.matches]
+
+
+def ancestors(token, fact):
+    """
+    The tokens above token that only hold wmes of fact.
+    """
+    found = []
+    while token is not None:
+        if all(wme is None or wme.identifier == fact.id
+               for wme in token.wmes):
+            found.append(token)
+        token = token.parent
+    return found
+
+
+def test_update_keeps_the_tokens_of_unchanged_attributes():
+    net, order, stock = build()
+    before = tokens(net)
+    assert len(before) == 1
+
+    order['note'] = 'second'
+    net.update_fact(order)
+    assert tokens(net) == before
+    assert tokens(net)[0] is before[0]
+
+    stock['qty'] = 4
+    net.update_fact(stock)
+    after = tokens(net)
+    assert len(after) == 1
+    assert after[0] is not before[0]
+    # the order half of the join was kept
+    kept = ancestors(before[0], order)
+    assert kept
+    assert list(map(id, ancestors(after[0], order))) == list(map(id, kept))
+    assert after[0].binding[V('qty')] == 4
+
+
+def test_update_with_identical_values_changes_nothing():
+    net, order, stock = build()
+    before = tokens(net)
+    counts = dict(net.stats.counts)
+    wmes = list(net.working_memory)
+
+    net.update_fact(order)
+    net.update_fact(stock)
+    assert net.stats.counts == counts
+    assert list(net.working_memory) == wmes
+    assert tokens(net)[0] is before[0]
+
+
+def test_update_keeps_the_fact_id():
+    net, order, stock = build()
+    fact_id = order.id
+    order['item'] = 2
+    net.update_fact(order)
+    assert order.id == fact_id
+    assert net.get_fact_by_id(fact_id) is order
+    assert not tokens(net)
+    assert all(wme.identifier == fact_id
+               for wme in net.working_memory.by_identifier(fact_id))
+
+
+def test_update_propagates_a_change_of_value_type():
+    net, order, stock = build()
+    stock['qty'] = 1
+    net.update_fact(stock)
+    # 1, True and 1.0 are equal but still changes
+    for qty in (True, 1.0, 1):
+        before = tokens(net)
+        stock['qty'] = qty
+        net.update_fact(stock)
+        after = tokens(net)
+        assert len(after) == 1 and after[0] is not before[0]
+        assert type(after[0].binding[V('qty')]) is type(qty)
+        wme, = [wme for wme in net.working_memory.by_identifier(stock.id)
+                if wme.attribute == 'qty']
+        assert type(wme.value) is type(qty)
+
+    with net.transaction():
+        stock['qty'] = True
+        net.update_fact(stock)
+    assert type(tokens(net)[0].binding[V('qty')]) is bool
+    before = tokens(net)
+
+    # changes within a transaction are kept or cancelled by type as well
+    with net.transaction():
+        stock['qty'] = 1.0
+        net.update_fact(stock)
+        stock['qty'] = True
+        net.update_fact(stock)
+    assert tokens(net)[0] is before[0]
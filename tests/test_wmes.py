@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from reactive_deliberative import Fact, Production, ReteNetwork, V
+
+
+def test_wmes_argument_gets_the_wmes_of_the_match():
+    seen = []
+
+    @Production(Fact(kind='order', item=V('item')) &
+                ~Fact(kind='hold', item=V('item')) &
+                Fact(kind='stock', item=V('item')))
+    def ship(item, wmes):
+        seen.append(wmes)
+
+    net = ReteNetwork()
+    net.add_production(ship)
+    order = Fact(kind='order', item=1)
+    stock = Fact(kind='stock', item=1)
+    net.add_fact(order)
+    net.add_fact(stock)
+    match, = net.matches
+    asyncio.run(match.fire())
+
+    wmes, = seen
+    assert isinstance(wmes, tuple)
+    assert wmes is match.wmes
+    ids = [None if wme is None else wme.identifier for wme in wmes]
+    # the wmes of the order, None for the negation, then those of the stock
+    assert ids == [order.id] * 3 + [None] + [stock.id] * 3
+
+
+def test_wmes_argument_cannot_shadow_a_variable():
+    @Production(Fact(kind='order', lines=V('wmes')))
+    def ship(wmes):
+        pass
+
+    net = ReteNetwork()
+    net.add_fact(Fact(kind='order', lines=2))
+    with pytest.raises(ValueError):
+        net.add_production(ship)
+    assert ship.id is None
+    assert not net.productions and not net.pnodes
+    assert not list(net.agenda)
+
+    # the variable is fine when the function does not take wmes
+    @Production(Fact(kind='order', lines=V('wmes')))
+    def count(**kwargs):
+        pass
+
+    net.add_production(count)
+    assert len(list(net.matches)) == 1
+
+
+def test_sibling_matches_share_the_cached_wmes_of_their_prefix():
+    @Production(Fact(kind='order', item=V('item')) &
+                Fact(kind='stock', item=V('item')))
+    def ship(item):
+        pass
+
+    net = ReteNetwork()
+    net.add_production(ship)
+    order = Fact(kind='order', item=1)
+    net.add_fact(order)
+    for _ in range(3):
+        net.add_fact(Fact(kind='stock', item=1))
+    tokens = [match.token for match in net.matches]
+    assert len(tokens) == 3
+
+    def prefix(token):
+        # the last token of the chain built from the order alone
+        while token.wme.identifier != order.id:
+            token = token.parent
+        return token
+
+    shared = prefix(tokens[0])
+    assert all(prefix(token) is shared for token in tokens)
+
+    def suffix(token):
+        wmes = []
+        while token is not shared:
+            wmes.append(token.wme)
+            token = token.parent
+        return tuple(reversed(wmes))
+
+    # the wmes are read up to the first ancestor that has them cached
+    marker = ('prefix',)
+    shared._wmes = marker
+    for token in tokens:
+        assert token._wmes is None
+        assert token.wmes == marker + suffix(token)
+        assert token.wmes is token.wmes
+
+    shared._wmes = None
+    wmes = tokens[0].parent.wmes
+    assert wmes[:len(shared.wmes)] == shared.wmes
@@ -0,0 +1,55 @@
+import pytest
+
+from reactive_deliberative.py_rete.common import WME
+from reactive_deliberative.py_rete.working_memory import WorkingMemory
+
+
+def test_working_memory_indexes_follow_adds_and_removes():
+    memory = WorkingMemory()
+    wmes = [WME('f-0', 'kind', 'order'), WME('f-0', 'qty', 1),
+            WME('f-1', 'kind', 'order'), WME('f-1', 'qty', 2)]
+    for wme in wmes:
+        memory.add(wme)
+    assert list(memory) == wmes
+    assert list(memory.by_identifier('f-0')) == wmes[:2]
+    assert list(memory.by_attribute('qty')) == [wmes[1], wmes[3]]
+    assert list(memory.by_attribute_value('kind', 'order')) == \
+        [wmes[0], wmes[2]]
+
+    memory.remove(WME('f-0', 'qty', 1))
+    memory.remove(WME('f-1', 'qty', 2))
+    assert len(memory) == 2
+    assert list(memory.by_identifier('f-0')) == [wmes[0]]
+    assert list(memory.by_attribute('qty')) == []
+    assert list(memory.by_attribute_value('qty', 1)) == []
+    assert list(memory.by_identifier('f-2')) == []
+    with pytest.raises(KeyError):
+        memory.remove(WME('f-0', 'qty', 1))
+
+
+def test_working_memory_keeps_the_stored_instance():
+    memory = WorkingMemory()
+    stored = WME('f-0', 'kind', 'order')
+    memory.add(stored)
+    copy = WME('f-0', 'kind', 'order')
+    memory.add(copy)
+    assert len(memory) == 1
+    assert copy in memory
+    assert memory.get(copy) is stored
+    assert memory.get(WME('f-0', 'kind', 'stock')) is None
+    assert next(memory.by_attribute_value('kind', 'order')) is stored
+
+    # removing an equal copy removes the stored instance from every index
+    memory.remove(copy)
+    assert stored not in memory
+    assert list(memory.by_identifier('f-0')) == []
+    assert list(memory.by_attribute('kind')) == []
+
+
+def test_working_memory_without_attribute_index():
+    memory = WorkingMemory(by_attribute=False)
+    wme = WME('f-0', 'kind', 'order')
+    memory.add(wme)
+    assert list(memory.by_identifier('f-0')) == [wme]
+    memory.remove(wme)
+    assert not memory